@@ -1,6 +1,39 @@
+import base64
+import contextlib
+import functools
+import math
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
+
+from src.bootstrap import RESAMPLES, bootstrap_fits
+from src.cross_validation import MAX_LEAVE_ONE_OUT, fold_stats
+from src.data_sources import (DATA_DIR, SUPPORTED_SUFFIXES, content_key, evict, load_columns, remove_stale_scratch,
+                              resolve_data_path, split_train_test, store_columns)
+from src.datasets import generate_design, generate_target, train_test_streams
+from src.figure_cache import FigureCache, PanelCache, dataset_fingerprint
+from src.figures import (FIGURE_SIZE, MAEvsBPlot, MainPlot, PlotData, SSRSurfacePlot, SSRvsAPlot, SSRvsBPlot,
+                         render_image)
+from src.mae_curve import cached_curves
+from src.panel_registry import PanelRegistry
+from src.metrics import compute_metrics
+from src.metrics_index import MAX_POINTS, MetricsIndex
+from src.multiple_regression import GramFactor, GramStats, fit_ols, predict, predict_chunks
+from src.optimizers import OPTIMIZERS, gradient_descent, minibatch_sgd, sample_frames
+from src.session_memory import SessionMemory, SessionRegistry, SharedArrays, deep_nbytes, freeze, resident_bytes
+from src.tracing import (NULL_TRACER, TRACE_JSONL_PATH, TRACE_PROMETHEUS_PATH, TraceTotals, Tracer, append_jsonl,
+                         payload_bytes)
+from src import vega_specs
+
+# Select the non-interactive Agg backend explicitly, so no GUI toolkit is ever probed for
+matplotlib.use("Agg")
 
 # Set page title and description
 st.markdown("<h1 style='text-align: center;'>Interactive Linear Regression Visualization</h1>", unsafe_allow_html=True)
@@ -9,9 +42,33 @@ st.markdown("<p style='text-align: center;'>Explore how parameters affect the li
 # Add a title to the sidebar
 st.sidebar.header("Control Parameters")
 
-# Create sliders for parameters a and b in the sidebar
-a = st.sidebar.slider("Parameter a (y-intercept)", min_value=-10.0, max_value=10.0, value=-2.0, step=0.1)
-b = st.sidebar.slider("Parameter b (slope)", min_value=-10.0, max_value=10.0, value=1.0, step=0.1)
+# Count the full runs of the script in this session; slider moves only rerun the panel fragment below
+rerun_counts = st.session_state.setdefault('rerun_counts', {"full": 0, "fragment": 0})
+rerun_counts["full"] += 1
+script_running = True
+
+# The sliders' initial (a, b). The sliders take their values from Session State only, so that the optimizer
+# playback and the OLS button can move them without a default competing with the state
+st.session_state.setdefault('slider_a', -2.0)
+st.session_state.setdefault('slider_b', 1.0)
+
+# Time the stages of this run when tracing is switched on in the debug panel at the bottom of the sidebar
+tracer = Tracer("full") if st.session_state.get('trace_reruns') else NULL_TRACER
+
+# The st.cache_resource factories below create one object per server process, shared by every session. Sessions
+# run their scripts in threads of their own, so the caches, registries and totals made here take a lock on every
+# operation
+
+
+@st.cache_resource
+def get_session_registry():
+    # The memory records of the live sessions, for the memory report in the debug panel
+    return SessionRegistry()
+
+
+# What this session keeps of its own, measured at the end of every full run against its budget
+session_memory = st.session_state.setdefault('session_memory', SessionMemory())
+get_session_registry().add(session_memory)
 
 # Add checkbox to toggle the visibility of scatter plot data points and SSR
 show_data_points = st.sidebar.checkbox("Show Train Set", value=False)
@@ -28,943 +85,894 @@ eval_metrics = st.sidebar.checkbox("Show Evaluation Metrics", value=False)
 # Add checkbox to toggle the visibility of MAE vs b plot
 show_mae_vs_b = st.sidebar.checkbox("Show MAE vs. b plot", value=False)
 
-# Generate scatter plot data with fixed parameters a=1, b=1 and Gaussian noise
-# Set seed for reproducibility
-np.random.seed(42)
-scatter_x = np.linspace(-8, 8, 30)
-scatter_y = 1 + 1 * scatter_x + np.random.normal(0, 1, size=len(scatter_x))
-
-# Generate test set data with fixed parameters a=1, b=1 and Gaussian noise (std=2)
-# Set seed for reproducibility
-np.random.seed(24)
-test_x = np.linspace(-8, 8, 30)
-test_y = 1 + 1 * test_x + np.random.normal(0, 2, size=len(test_x))
-
-# Calculate Sum of Squared Residuals (SSR)
-predicted_y = a + b * scatter_x
-residuals = scatter_y - predicted_y
-ssr = np.sum(residuals**2)
-
-# Calculate evaluation metrics
-from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
-
-# Calculate R-squared
-r2_train = r2_score(scatter_y, predicted_y)
-r2_test = r2_score(test_y, a + b * test_x)
-
-# Calculate Adjusted R-squared
-n_train = len(scatter_y)
-p_train = 1  # number of predictors
-adj_r2_train = 1 - (1 - r2_train) * (n_train - 1) / (n_train - p_train - 1)
-
-n_test = len(test_y)
-p_test = 1  # number of predictors
-adj_r2_test = 1 - (1 - r2_test) * (n_test - 1) / (n_test - p_test - 1)
-
-# Calculate Mean Absolute Error (MAE)
-mae_train = mean_absolute_error(scatter_y, predicted_y)
-mae_test = mean_absolute_error(test_y, a + b * test_x)
-
-# Calculate Root Mean Squared Error (RMSE)
-rmse_train = np.sqrt(mean_squared_error(scatter_y, predicted_y))
-rmse_test = np.sqrt(mean_squared_error(test_y, a + b * test_x))
-
-# Display the current equation with parameter values
-st.markdown(f"<h4 style='text-align: center;'>y = <span style='color:red'>a</span> + <span style='color:green'>b</span> x</h4>", unsafe_allow_html=True)
-st.markdown(f"<h4 style='text-align: center;'>y = <span style='color:red'>{a:.1f}</span> + <span style='color:green'>{b:.1f}</span> x</h4>", unsafe_allow_html=True)
-
-# Display SSR value only if the show_ssr checkbox is checked
-if show_ssr:
-    st.markdown(f"<h4 style='text-align: center;'>Sum of Squared Residuals (SSR): <span style='color:blue'>{ssr:.2f}</span></h4>", unsafe_allow_html=True)
-
-
-# Create plots - use columns if SSR vs. b plot, SSR vs. a plot, or MAE vs. b plot is enabled
-if show_ssr_vs_b and show_ssr_vs_a and show_mae_vs_b:
-    col1, col2, col3, col4 = st.columns(4)
-
-    # Create the main regression plot in left column
-    with col1:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        # Generate x values for the line
-        x = np.linspace(-10, 10, 100)
-        
-        # Calculate y values based on the linear equation
-        y = a + b * x
-        
-        # Plot the line
-        ax.plot(x, y, 'b-', linewidth=2, label='Interactive Line')
-        
-        # Plot the scatter points only if the checkbox is checked
-        if show_data_points:
-            ax.scatter(scatter_x, scatter_y, color='red', alpha=0.7, label='Train Set Points (a=1, b=1, noise σ=1)')
-            
-            # Plot residuals as vertical lines if SSR is being shown
-            if show_ssr:
-                for i in range(len(scatter_x)):
-                    ax.plot([scatter_x[i], scatter_x[i]], [scatter_y[i], predicted_y[i]], 'g-', alpha=0.5)
-        
-        # Plot the test set points only if the checkbox is checked
-        if show_test_set:
-            ax.scatter(test_x, test_y, color='purple', alpha=0.7, label='Test Set Points (a=1, b=1, noise σ=2)')
-        
-        # Add gridlines
-        ax.grid(True, linestyle='--', alpha=0.7)
-        
-        # Set fixed axis limits
-        ax.set_xlim(-10, 10)
-        ax.set_ylim(-10, 10)
-        
-        # Add labels and title
-        plot_title = f'Linear Equation: y = {a:.1f} + {b:.1f}x'
-        if show_ssr:
-            plot_title += f' with SSR = {ssr:.2f}'
-        ax.set_title(plot_title)
-        
-        # Add the x and y axes
-        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-        
-        # Add a legend
-        ax.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig)
-
-    # Create the SSR vs. b plot in second column
-    with col2:
-        # Calculate SSR for different values of b
-        b_range = np.linspace(-10, 10, 100)
-        ssr_values = []
-        
-        # Current value of a
-        current_a = a
-        
-        # Calculate SSR for each b value
-        for b_val in b_range:
-            pred_y = current_a + b_val * scatter_x
-            res = scatter_y - pred_y
-            ssr_values.append(np.sum(res**2))
-        
-        # Create the SSR vs. b plot
-        fig2, ax2 = plt.subplots(figsize=(8, 6))
-        ax2.plot(b_range, ssr_values, 'r-', linewidth=2)
-        
-        # Highlight the current b value
-        ax2.axvline(x=b, color='g', linestyle='--', label=f'Current b = {b}')
-        ax2.plot(b, ssr, 'go', markersize=8)
-        
-        # Add gridlines
-        ax2.grid(True, linestyle='--', alpha=0.7)
-        
-        # Add labels and title
-        ax2.set_xlabel('Parameter b (slope)')
-        ax2.set_ylabel('Sum of Squared Residuals (SSR)')
-        ax2.set_title('SSR vs. Parameter b (with fixed a)')
-        
-        # Add a legend
-        ax2.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig2)
-
-    # Create the SSR vs. a plot in third column
-    with col3:
-        # Calculate SSR for different values of a
-        a_range = np.linspace(-10, 10, 100)
-        ssr_values_a = []
-        
-        # Current value of b
-        current_b = b
-        
-        # Calculate SSR for each a value
-        for a_val in a_range:
-            pred_y = a_val + current_b * scatter_x
-            res = scatter_y - pred_y
-            ssr_values_a.append(np.sum(res**2))
-        
-        # Create the SSR vs. a plot
-        fig3, ax3 = plt.subplots(figsize=(8, 6))
-        ax3.plot(a_range, ssr_values_a, 'b-', linewidth=2)
-        
-        # Highlight the current a value
-        ax3.axvline(x=a, color='r', linestyle='--', label=f'Current a = {a}')
-        ax3.plot(a, ssr, 'ro', markersize=8)
-        
-        # Add gridlines
-        ax3.grid(True, linestyle='--', alpha=0.7)
-        
-        # Add labels and title
-        ax3.set_xlabel('Parameter a (y-intercept)')
-        ax3.set_ylabel('Sum of Squared Residuals (SSR)')
-        ax3.set_title('SSR vs. Parameter a (with fixed b)')
-        
-        # Add a legend
-        ax3.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig3)
-
-    # Create the MAE vs. b plot in fourth column
-    with col4:
-        # Calculate MAE for different values of b
-        mae_values = []
-        for b_val in b_range:
-            pred_y = current_a + b_val * scatter_x
-            mae_values.append(mean_absolute_error(scatter_y, pred_y))
-
-        # Create the MAE vs. b plot
-        fig4, ax4 = plt.subplots(figsize=(8, 6))
-        ax4.plot(b_range, mae_values, 'g-', linewidth=2)
-
-        # Highlight the current b value
-        ax4.axvline(x=b, color='r', linestyle='--', label=f'Current b = {b}')
-        ax4.plot(b, mae_train, 'ro', markersize=8)
-
-        # Add gridlines
-        ax4.grid(True, linestyle='--', alpha=0.7)
-
-        # Add labels and title
-        ax4.set_xlabel('Parameter b (slope)')
-        ax4.set_ylabel('Mean Absolute Error (MAE)')
-        ax4.set_title('MAE vs. Parameter b (with fixed a)')
-
-        # Add a legend
-        ax4.legend()
-
-        # Display the plot in Streamlit
-        st.pyplot(fig4)
-
-elif show_ssr_vs_b and show_ssr_vs_a:
-    col1, col2, col3 = st.columns(3)
-
-    # Create the main regression plot in left column
-    with col1:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        # Generate x values for the line
-        x = np.linspace(-10, 10, 100)
-        
-        # Calculate y values based on the linear equation
-        y = a + b * x
-        
-        # Plot the line
-        ax.plot(x, y, 'b-', linewidth=2, label='Interactive Line')
-        
-        # Plot the scatter points only if the checkbox is checked
-        if show_data_points:
-            ax.scatter(scatter_x, scatter_y, color='red', alpha=0.7, label='Train Set Points (a=1, b=1, noise σ=1)')
-            
-            # Plot residuals as vertical lines if SSR is being shown
-            if show_ssr:
-                for i in range(len(scatter_x)):
-                    ax.plot([scatter_x[i], scatter_x[i]], [scatter_y[i], predicted_y[i]], 'g-', alpha=0.5)
-        
-        # Plot the test set points only if the checkbox is checked
-        if show_test_set:
-            ax.scatter(test_x, test_y, color='purple', alpha=0.7, label='Test Set Points (a=1, b=1, noise σ=2)')
-        
-        # Add gridlines
-        ax.grid(True, linestyle='--', alpha=0.7)
-        
-        # Set fixed axis limits
-        ax.set_xlim(-10, 10)
-        ax.set_ylim(-10, 10)
-        
-        # Add labels and title
-        plot_title = f'Linear Equation: y = {a:.1f} + {b:.1f}x'
-        if show_ssr:
-            plot_title += f' with SSR = {ssr:.2f}'
-        ax.set_title(plot_title)
-        
-        # Add the x and y axes
-        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-        
-        # Add a legend
-        ax.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig)
-
-    # Create the SSR vs. b plot in middle column
-    with col2:
-        # Calculate SSR for different values of b
-        b_range = np.linspace(-10, 10, 100)
-        ssr_values = []
-        
-        # Current value of a
-        current_a = a
-        
-        # Calculate SSR for each b value
-        for b_val in b_range:
-            pred_y = current_a + b_val * scatter_x
-            res = scatter_y - pred_y
-            ssr_values.append(np.sum(res**2))
-        
-        # Create the SSR vs. b plot
-        fig2, ax2 = plt.subplots(figsize=(8, 6))
-        ax2.plot(b_range, ssr_values, 'r-', linewidth=2)
-        
-        # Highlight the current b value
-        ax2.axvline(x=b, color='g', linestyle='--', label=f'Current b = {b}')
-        ax2.plot(b, ssr, 'go', markersize=8)
-        
-        # Add gridlines
-        ax2.grid(True, linestyle='--', alpha=0.7)
-        
-        # Add labels and title
-        ax2.set_xlabel('Parameter b (slope)')
-        ax2.set_ylabel('Sum of Squared Residuals (SSR)')
-        ax2.set_title('SSR vs. Parameter b (with fixed a)')
-        
-        # Add a legend
-        ax2.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig2)
-
-    # Create the SSR vs. a plot in right column
-    with col3:
-        # Calculate SSR for different values of a
-        a_range = np.linspace(-10, 10, 100)
-        ssr_values_a = []
-        current_b = b
-        for a_val in a_range:
-            pred_y = a_val + current_b * scatter_x
-            res = scatter_y - pred_y
-            ssr_values_a.append(np.sum(res**2))
-
-        # Create the SSR vs. a plot
-        fig3, ax3 = plt.subplots(figsize=(8, 6))
-        ax3.plot(a_range, ssr_values_a, 'b-', linewidth=2)
-
-        # Highlight the current a value
-        ax3.axvline(x=a, color='r', linestyle='--', label=f'Current a = {a}')
-        ax3.plot(a, ssr, 'ro', markersize=8)
-
-        # Add gridlines
-        ax3.grid(True, linestyle='--', alpha=0.7)
-
-        # Add labels and title
-        ax3.set_xlabel('Parameter a (y-intercept)')
-        ax3.set_ylabel('Sum of Squared Residuals (SSR)')
-        ax3.set_title('SSR vs. Parameter a (with fixed b)')
-
-        # Add a legend
-        ax3.legend()
-
-        # Display the plot in Streamlit
-        st.pyplot(fig3)
-
-elif show_ssr_vs_b and show_mae_vs_b:
-    col1, col2, col3 = st.columns(3)
-
-    # Create the main regression plot in left column
-    with col1:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        # Generate x values for the line
-        x = np.linspace(-10, 10, 100)
-        
-        # Calculate y values based on the linear equation
-        y = a + b * x
-        
-        # Plot the line
-        ax.plot(x, y, 'b-', linewidth=2, label='Interactive Line')
-        
-        # Plot the scatter points only if the checkbox is checked
-        if show_data_points:
-            ax.scatter(scatter_x, scatter_y, color='red', alpha=0.7, label='Train Set Points (a=1, b=1, noise σ=1)')
-            
-            # Plot residuals as vertical lines if SSR is being shown
-            if show_ssr:
-                for i in range(len(scatter_x)):
-                    ax.plot([scatter_x[i], scatter_x[i]], [scatter_y[i], predicted_y[i]], 'g-', alpha=0.5)
-        
-        # Plot the test set points only if the checkbox is checked
-        if show_test_set:
-            ax.scatter(test_x, test_y, color='purple', alpha=0.7, label='Test Set Points (a=1, b=1, noise σ=2)')
-        
-        # Add gridlines
-        ax.grid(True, linestyle='--', alpha=0.7)
-        
-        # Set fixed axis limits
-        ax.set_xlim(-10, 10)
-        ax.set_ylim(-10, 10)
-        
-        # Add labels and title
-        plot_title = f'Linear Equation: y = {a:.1f} + {b:.1f}x'
-        if show_ssr:
-            plot_title += f' with SSR = {ssr:.2f}'
-        ax.set_title(plot_title)
-        
-        # Add the x and y axes
-        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-        
-        # Add a legend
-        ax.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig)
-
-    # Create the SSR vs. b plot in middle column
-    with col2:
-        # Calculate SSR for different values of b
-        b_range = np.linspace(-10, 10, 100)
-        ssr_values = []
-        
-        # Current value of a
-        current_a = a
-        
-        # Calculate SSR for each b value
-        for b_val in b_range:
-            pred_y = current_a + b_val * scatter_x
-            res = scatter_y - pred_y
-            ssr_values.append(np.sum(res**2))
-        
-        # Create the SSR vs. b plot
-        fig2, ax2 = plt.subplots(figsize=(8, 6))
-        ax2.plot(b_range, ssr_values, 'r-', linewidth=2)
-        
-        # Highlight the current b value
-        ax2.axvline(x=b, color='g', linestyle='--', label=f'Current b = {b}')
-        ax2.plot(b, ssr, 'go', markersize=8)
-        
-        # Add gridlines
-        ax2.grid(True, linestyle='--', alpha=0.7)
-        
-        # Add labels and title
-        ax2.set_xlabel('Parameter b (slope)')
-        ax2.set_ylabel('Sum of Squared Residuals (SSR)')
-        ax2.set_title('SSR vs. Parameter b (with fixed a)')
-        
-        # Add a legend
-        ax2.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig2)
-
-    # Create the MAE vs. b plot in right column
-    with col3:
-        # Calculate MAE for different values of b
-        mae_values = []
-        for b_val in b_range:
-            pred_y = current_a + b_val * scatter_x
-            mae_values.append(mean_absolute_error(scatter_y, pred_y))
-
-        # Create the MAE vs. b plot
-        fig4, ax4 = plt.subplots(figsize=(8, 6))
-        ax4.plot(b_range, mae_values, 'g-', linewidth=2)
-
-        # Highlight the current b value
-        ax4.axvline(x=b, color='r', linestyle='--', label=f'Current b = {b}')
-        ax4.plot(b, mae_train, 'ro', markersize=8)
-
-        # Add gridlines
-        ax4.grid(True, linestyle='--', alpha=0.7)
-
-        # Add labels and title
-        ax4.set_xlabel('Parameter b (slope)')
-        ax4.set_ylabel('Mean Absolute Error (MAE)')
-        ax4.set_title('MAE vs. Parameter b (with fixed a)')
-
-        # Add a legend
-        ax4.legend()
-
-        # Display the plot in Streamlit
-        st.pyplot(fig4)
-
-elif show_ssr_vs_a and show_mae_vs_b:
-    col1, col2, col3 = st.columns(3)
-
-    # Create the main regression plot in left column
-    with col1:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        # Generate x values for the line
-        x = np.linspace(-10, 10, 100)
-        
-        # Calculate y values based on the linear equation
-        y = a + b * x
-        
-        # Plot the line
-        ax.plot(x, y, 'b-', linewidth=2, label='Interactive Line')
-        
-        # Plot the scatter points only if the checkbox is checked
-        if show_data_points:
-            ax.scatter(scatter_x, scatter_y, color='red', alpha=0.7, label='Train Set Points (a=1, b=1, noise σ=1)')
-            
-            # Plot residuals as vertical lines if SSR is being shown
-            if show_ssr:
-                for i in range(len(scatter_x)):
-                    ax.plot([scatter_x[i], scatter_x[i]], [scatter_y[i], predicted_y[i]], 'g-', alpha=0.5)
-        
-        # Plot the test set points only if the checkbox is checked
-        if show_test_set:
-            ax.scatter(test_x, test_y, color='purple', alpha=0.7, label='Test Set Points (a=1, b=1, noise σ=2)')
-        
-        # Add gridlines
-        ax.grid(True, linestyle='--', alpha=0.7)
-        
-        # Set fixed axis limits
-        ax.set_xlim(-10, 10)
-        ax.set_ylim(-10, 10)
-        
-        # Add labels and title
-        plot_title = f'Linear Equation: y = {a:.1f} + {b:.1f}x'
-        if show_ssr:
-            plot_title += f' with SSR = {ssr:.2f}'
-        ax.set_title(plot_title)
-        
-        # Add the x and y axes
-        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-        
-        # Add a legend
-        ax.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig)
-
-    # Create the SSR vs. a plot in middle column
-    with col2:
-        # Calculate SSR for different values of a
-        a_range = np.linspace(-10, 10, 100)
-        ssr_values_a = []
-        
-        # Current value of b
-        current_b = b
-        
-        # Calculate SSR for each a value
-        for a_val in a_range:
-            pred_y = a_val + current_b * scatter_x
-            res = scatter_y - pred_y
-            ssr_values_a.append(np.sum(res**2))
-        
-        # Create the SSR vs. a plot
-        fig3, ax3 = plt.subplots(figsize=(8, 6))
-        ax3.plot(a_range, ssr_values_a, 'b-', linewidth=2)
-        
-        # Highlight the current a value
-        ax3.axvline(x=a, color='r', linestyle='--', label=f'Current a = {a}')
-        ax3.plot(a, ssr, 'ro', markersize=8)
-        
-        # Add gridlines
-        ax3.grid(True, linestyle='--', alpha=0.7)
-        
-        # Add labels and title
-        ax3.set_xlabel('Parameter a (y-intercept)')
-        ax3.set_ylabel('Sum of Squared Residuals (SSR)')
-        ax3.set_title('SSR vs. Parameter a (with fixed b)')
-        
-        # Add a legend
-        ax3.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig3)
-
-    # Create the MAE vs. b plot in right column
-    with col3:
-        # Calculate MAE for different values of b
-        mae_values = []
-        for b_val in b_range:
-            pred_y = current_a + b_val * scatter_x
-            mae_values.append(mean_absolute_error(scatter_y, pred_y))
-
-        # Create the MAE vs. b plot
-        fig4, ax4 = plt.subplots(figsize=(8, 6))
-        ax4.plot(b_range, mae_values, 'g-', linewidth=2)
-
-        # Highlight the current b value
-        ax4.axvline(x=b, color='r', linestyle='--', label=f'Current b = {b}')
-        ax4.plot(b, mae_train, 'ro', markersize=8)
-
-        # Add gridlines
-        ax4.grid(True, linestyle='--', alpha=0.7)
-
-        # Add labels and title
-        ax4.set_xlabel('Parameter b (slope)')
-        ax4.set_ylabel('Mean Absolute Error (MAE)')
-        ax4.set_title('MAE vs. Parameter b (with fixed a)')
-
-        # Add a legend
-        ax4.legend()
-
-        # Display the plot in Streamlit
-        st.pyplot(fig4)
-
-elif show_ssr_vs_b:
-    col1, col2 = st.columns(2)
-
-    # Create the main regression plot in left column
-    with col1:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        # Generate x values for the line
-        x = np.linspace(-10, 10, 100)
-        
-        # Calculate y values based on the linear equation
-        y = a + b * x
-        
-        # Plot the line
-        ax.plot(x, y, 'b-', linewidth=2, label='Interactive Line')
-        
-        # Plot the scatter points only if the checkbox is checked
-        if show_data_points:
-            ax.scatter(scatter_x, scatter_y, color='red', alpha=0.7, label='Train set Points (a=1, b=1, noise σ=1)')
-            
-            # Plot residuals as vertical lines if SSR is being shown
-            if show_ssr:
-                for i in range(len(scatter_x)):
-                    ax.plot([scatter_x[i], scatter_x[i]], [scatter_y[i], predicted_y[i]], 'g-', alpha=0.5)
-        
-        # Plot the test set points only if the checkbox is checked
-        if show_test_set:
-            ax.scatter(test_x, test_y, color='purple', alpha=0.7, label='Test Set Points (a=1, b=1, noise σ=2)')
-        
-        # Add gridlines
-        ax.grid(True, linestyle='--', alpha=0.7)
-        
-        # Set fixed axis limits
-        ax.set_xlim(-10, 10)
-        ax.set_ylim(-10, 10)
-        
-        # Add labels and title
-        plot_title = f'Linear Equation: y = {a:.1f} + {b:.1f}x'
-        if show_ssr:
-            plot_title += f' with SSR = {ssr:.2f}'
-        ax.set_title(plot_title)
-        
-        # Add the x and y axes
-        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-        
-        # Add a legend
-        ax.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig)
-
-    # Create the SSR vs. b plot in right column
-    with col2:
-        # Calculate SSR for different values of b
-        b_range = np.linspace(-10, 10, 100)
-        ssr_values = []
-        
-        # Current value of a
-        current_a = a
-        
-        # Calculate SSR for each b value
-        for b_val in b_range:
-            pred_y = current_a + b_val * scatter_x
-            res = scatter_y - pred_y
-            ssr_values.append(np.sum(res**2))
-        
-        # Create the SSR vs. b plot
-        fig2, ax2 = plt.subplots(figsize=(8, 6))
-        ax2.plot(b_range, ssr_values, 'r-', linewidth=2)
-        
-        # Highlight the current b value
-        ax2.axvline(x=b, color='g', linestyle='--', label=f'Current b = {b}')
-        ax2.plot(b, ssr, 'go', markersize=8)
-        
-        # Add gridlines
-        ax2.grid(True, linestyle='--', alpha=0.7)
-        
-        # Add labels and title
-        ax2.set_xlabel('Parameter b (slope)')
-        ax2.set_ylabel('Sum of Squared Residuals (SSR)')
-        ax2.set_title('SSR vs. Parameter b (with fixed a)')
-        
-        # Add a legend
-        ax2.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig2)
-
-elif show_ssr_vs_a:
-    col1, col2 = st.columns(2)
-
-    # Create the main regression plot in left column
-    with col1:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        # Generate x values for the line
-        x = np.linspace(-10, 10, 100)
-        
-        # Calculate y values based on the linear equation
-        y = a + b * x
-        
-        # Plot the line
-        ax.plot(x, y, 'b-', linewidth=2, label='Interactive Line')
-        
-        # Plot the scatter points only if the checkbox is checked
-        if show_data_points:
-            ax.scatter(scatter_x, scatter_y, color='red', alpha=0.7, label='Train set Points (a=1, b=1, noise σ=1)')
-            
-            # Plot residuals as vertical lines if SSR is being shown
-            if show_ssr:
-                for i in range(len(scatter_x)):
-                    ax.plot([scatter_x[i], scatter_x[i]], [scatter_y[i], predicted_y[i]], 'g-', alpha=0.5)
-        
-        # Plot the test set points only if the checkbox is checked
-        if show_test_set:
-            ax.scatter(test_x, test_y, color='Purple', alpha=0.7, label='Test Set Points (a=1, b=1, noise σ=2)')
-        
-        # Add gridlines
-        ax.grid(True, linestyle='--', alpha=0.7)
-        
-        # Set fixed axis limits
-        ax.set_xlim(-10, 10)
-        ax.set_ylim(-10, 10)
-        
-        # Add labels and title
-        plot_title = f'Linear Equation: y = {a:.1f} + {b:.1f}x'
-        if show_ssr:
-            plot_title += f' with SSR = {ssr:.2f}'
-        ax.set_title(plot_title)
-        
-        # Add the x and y axes
-        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-        
-        # Add a legend
-        ax.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig)
-
-    # Create the SSR vs. a plot in right column
-    with col2:
-        # Calculate SSR for different values of a
-        a_range = np.linspace(-10, 10, 100)
-        ssr_values_a = []
-        
-        # Current value of b
-        current_b = b
-        
-        # Calculate SSR for each a value
-        for a_val in a_range:
-            pred_y = a_val + current_b * scatter_x
-            res = scatter_y - pred_y
-            ssr_values_a.append(np.sum(res**2))
-        
-        # Create the SSR vs. a plot
-        fig3, ax3 = plt.subplots(figsize=(8, 6))
-        ax3.plot(a_range, ssr_values_a, 'b-', linewidth=2)
-        
-        # Highlight the current a value
-        ax3.axvline(x=a, color='r', linestyle='--', label=f'Current a = {a}')
-        ax3.plot(a, ssr, 'ro', markersize=8)
-        
-        # Add gridlines
-        ax3.grid(True, linestyle='--', alpha=0.7)
-        
-        # Add labels and title
-        ax3.set_xlabel('Parameter a (y-intercept)')
-        ax3.set_ylabel('Sum of Squared Residuals (SSR)')
-        ax3.set_title('SSR vs. Parameter a (with fixed b)')
-        
-        # Add a legend
-        ax3.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig3)
-
-elif show_mae_vs_b:
-    col1, col2 = st.columns(2)
-
-    # Create the main regression plot in left column
-    with col1:
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        # Generate x values for the line
-        x = np.linspace(-10, 10, 100)
-        
-        # Calculate y values based on the linear equation
-        y = a + b * x
-        
-        # Plot the line
-        ax.plot(x, y, 'b-', linewidth=2, label='Interactive Line')
-        
-        # Plot the scatter points only if the checkbox is checked
-        if show_data_points:
-            ax.scatter(scatter_x, scatter_y, color='red', alpha=0.7, label='Train set Points (a=1, b=1, noise σ=1)')
-            
-            # Plot residuals as vertical lines if SSR is being shown
-            if show_ssr:
-                for i in range(len(scatter_x)):
-                    ax.plot([scatter_x[i], scatter_x[i]], [scatter_y[i], predicted_y[i]], 'g-', alpha=0.5)
-        
-        # Plot the test set points only if the checkbox is checked
-        if show_test_set:
-            ax.scatter(test_x, test_y, color='purple', alpha=0.7, label='Test Set Points (a=1, b=1, noise σ=2)')
-        
-        # Add gridlines
-        ax.grid(True, linestyle='--', alpha=0.7)
-        
-        # Set fixed axis limits
-        ax.set_xlim(-10, 10)
-        ax.set_ylim(-10, 10)
-        
-        # Add labels and title
-        plot_title = f'Linear Equation: y = {a:.1f} + {b:.1f}x'
-        if show_ssr:
-            plot_title += f' with SSR = {ssr:.2f}'
-        ax.set_title(plot_title)
-        
-        # Add the x and y axes
-        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-        
-        # Add a legend
-        ax.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig)
-
-    # Create the MAE vs. b plot in right column
-    with col2:
-        # Calculate MAE for different values of b
-        b_range = np.linspace(-10, 10, 100)
-        mae_values = []
-        current_a = a
-        for b_val in b_range:
-            pred_y = current_a + b_val * scatter_x
-            mae_values.append(mean_absolute_error(scatter_y, pred_y))
-
-        # Create the MAE vs. b plot
-        fig4, ax4 = plt.subplots(figsize=(8, 6))
-        ax4.plot(b_range, mae_values, 'g-', linewidth=2)
-
-        # Highlight the current b value
-        ax4.axvline(x=b, color='r', linestyle='--', label=f'Current b = {b}')
-        ax4.plot(b, mae_train, 'ro', markersize=8)
-
-        # Add gridlines
-        ax4.grid(True, linestyle='--', alpha=0.7)
-
-        # Add labels and title
-        ax4.set_xlabel('Parameter b (slope)')
-        ax4.set_ylabel('Mean Absolute Error (MAE)')
-        ax4.set_title('MAE vs. Parameter b (with fixed a)')
-
-        # Add a legend
-        ax4.legend()
-
-        # Display the plot in Streamlit
-        st.pyplot(fig4)
+# Add checkbox to toggle the visibility of the SSR surface over (a, b)
+show_ssr_surface = st.sidebar.checkbox("Show SSR surface over (a, b)", value=False)
+
+# Add checkbox and input for the bootstrap band of the fitted line and the intervals of its metrics
+show_bootstrap = st.sidebar.checkbox("Show bootstrap intervals", value=False)
+bootstrap_resamples = 0
+if show_bootstrap:
+    bootstrap_resamples = st.sidebar.number_input("Bootstrap resamples", min_value=100, max_value=10_000,
+                                                  value=RESAMPLES, step=100)
+
+# Add checkbox and inputs for the cross-validation table; k is at most MAX_FOLDS
+MAX_FOLDS = 20
+show_cross_validation = st.sidebar.checkbox("Show cross-validation", value=False)
+cv_folds = 0
+if show_cross_validation:
+    leave_one_out = st.sidebar.checkbox("Leave-one-out", value=False,
+                                        help=f"Up to {MAX_LEAVE_ONE_OUT:,} train points; above that, {MAX_FOLDS} folds are used")
+    if not leave_one_out:
+        cv_folds = st.sidebar.number_input("Folds (k)", min_value=2, max_value=MAX_FOLDS, value=5, step=1)
+
+# Add input for the point count above which the data is drawn as binned density
+density_threshold = st.sidebar.number_input("Density rendering above (points)", min_value=1000, value=50000, step=1000)
+
+# Add checkbox to keep one figure per panel, shared by the sessions on the same data, and only move the
+# changing artists on reruns
+reuse_figures = st.sidebar.checkbox("Reuse figures between reruns and sessions", value=True)
+
+# Add checkbox to render the panels that changed concurrently
+parallel_rendering = st.sidebar.checkbox("Render panels in parallel", value=True)
+
+# Add radio buttons to choose between server-side images and browser-side charts
+render_backend = st.sidebar.radio("Rendering backend", ["Matplotlib (server)", "Vega-Lite (browser)"])
+client_side_rendering = render_backend == "Vega-Lite (browser)"
+
+# Encodings of the server-side images by label, and their resolutions by label: the image pixels per CSS pixel
+# of the panel's column, or None for a fixed dpi
+IMAGE_FORMAT_LABELS = {"PNG": "png", "WebP (lossless)": "webp", "SVG (data layers rasterized)": "svg"}
+IMAGE_RESOLUTIONS = {"Fit column, 2× pixel density": 2, "Fit column, 1× pixel density": 1, "Fixed 200 dpi": None}
+FIXED_DPI = 200
+
+# Width in CSS pixels of the main area of the centered page layout, which the panel columns divide
+PAGE_WIDTH = 704
+
+# Add choices of the encoding and the resolution of the server-side images
+image_format, image_resolution = "png", next(iter(IMAGE_RESOLUTIONS))
+if not client_side_rendering:
+    image_format = IMAGE_FORMAT_LABELS[st.sidebar.selectbox("Image format", list(IMAGE_FORMAT_LABELS))]
+    image_resolution = st.sidebar.selectbox("Image resolution", list(IMAGE_RESOLUTIONS))
+
+# Add a choice between synthetic data and a data file in the sidebar
+st.sidebar.subheader("Dataset")
+data_source = st.sidebar.radio("Data source", ["Synthetic", "File"])
+
+
+@st.cache_resource
+def get_shared_arrays():
+    # The buffers of everything the loaders below cache for all sessions, made read-only by freeze()
+    return SharedArrays()
+
+
+shared_arrays = get_shared_arrays()
+
+
+@st.cache_resource
+def clean_data_cache():
+    # Once per server process, delete the scratch directories of writes cut short by an earlier process and
+    # trim the data cache on disk to its size cap
+    remove_stale_scratch()
+    evict()
+
+
+clean_data_cache()
+
+
+@st.cache_resource(max_entries=4)
+def load_design(n, predictors, seed):
+    # The predictors only depend on n, p and the seed. Their cross-products are accumulated and
+    # factorized once here, and reused for every target drawn on the same design
+    train_design_rng, test_design_rng = train_test_streams(seed)[2:]
+    train_columns = generate_design(n, predictors, train_design_rng)
+    test_columns = generate_design(n, predictors, test_design_rng)
+    design_stats = GramStats.from_columns(train_columns)
+    return freeze((train_columns, test_columns, design_stats, GramFactor(design_stats.sxx)), shared_arrays)
+
+
+@st.cache_resource(max_entries=4)
+def load_datasets(n, predictors, intercept, slope, train_noise, test_noise, seed):
+    # Generated once per parameter set and shared read-only by every session; the least recently
+    # used sets are evicted beyond four
+    train_columns, test_columns, design_stats, factor = load_design(n, predictors, seed)
+    train_rng, test_rng = train_test_streams(seed)[:2]
+    train_y = generate_target(train_columns, intercept, slope, train_noise, train_rng)
+    test_y = generate_target(test_columns, intercept, slope, test_noise, test_rng)
+
+    # Fingerprint the datasets so cached figures are never reused across different data
+    fingerprint = dataset_fingerprint(*train_columns, train_y, *test_columns, test_y)
+
+    # Fit the train set from its Gram statistics; only their O(n p) part with y is recomputed here
+    train_gram = GramStats.from_columns(train_columns, train_y, design=design_stats)
+    return freeze((train_columns, train_y, test_columns, test_y, fingerprint, train_gram, fit_ols(train_gram, factor)),
+                  shared_arrays)
+
+
+@st.cache_resource(max_entries=4)
+def load_file_columns(file_name, file_id, _source):
+    # Converted to memory-mapped float64 columns once per file; file_id is the upload id or the path's
+    # size and modification time, so the contents are only hashed when the file changes
+    key = content_key(_source)
+    return key, load_columns(_source, file_name, key)
+
+
+def read_file_columns(file_name, file_id, source):
+    # Stop with the reason a file cannot be read instead of a traceback; pandas' and pyarrow's parse
+    # errors are ValueErrors as well
+    try:
+        return load_file_columns(file_name, file_id, source)
+    except (ValueError, OSError) as error:
+        st.error(f"Could not read {file_name}: {error}")
+        st.stop()
+
+
+@st.cache_resource(max_entries=4)
+def load_file_split(columns_key, x_columns, y_column, test_fraction, seed, _columns):
+    # The split is materialized as memory maps as well; its key doubles as the dataset fingerprint
+    fingerprint = content_key(repr((columns_key, x_columns, y_column, test_fraction, seed)).encode())
+    train_columns, train_y, test_columns, test_y = split_train_test(
+        [_columns[name] for name in x_columns], _columns[y_column], test_fraction, seed, fingerprint)
+    train_gram = GramStats.from_columns(train_columns, train_y)
+    return freeze((train_columns, train_y, test_columns, test_y, fingerprint, train_gram, fit_ols(train_gram)),
+                  shared_arrays)
+
+
+@st.cache_resource(max_entries=8)
+def load_partial(fingerprint, j, _dataset):
+    # With the other coefficients held at the OLS fit, the model is a simple regression of the partial
+    # residuals on predictor j; the panels show that one. The offsets are the held-fixed predictions,
+    # which the metrics add back to score the full model
+    train_columns, train_y, test_columns, test_y, _, train_gram, fit = _dataset
+    train_stats = train_gram.partial(j, fit.coef)
+    if len(fit.coef) == 1:
+        return freeze((train_columns[0], train_y, test_columns[0], test_y, None, None, fingerprint, train_stats),
+                      shared_arrays)
+    others = fit.coef.copy()
+    others[j] = 0.0
+    partial_fingerprint = content_key(repr((fingerprint, j)).encode())
+    if not isinstance(train_y, np.memmap):
+        train_offset = predict(train_columns, 0.0, others)
+        test_offset = predict(test_columns, 0.0, others)
+        return freeze((train_columns[j], train_y - train_offset, test_columns[j], test_y - test_offset,
+                       train_offset, test_offset, partial_fingerprint, train_stats), shared_arrays)
+
+    # Memory-mapped file data stays out of memory: the offsets and partial residuals are written to the data
+    # cache a chunk at a time and mapped like the split
+    def chunks(columns, y):
+        for start, offset in predict_chunks(columns, 0.0, others):
+            yield {"offset": offset, "residual": np.asarray(y[start:start + len(offset)], dtype=float) - offset}
+
+    train = store_columns(chunks(train_columns, train_y), f"{partial_fingerprint}-train")
+    test = store_columns(chunks(test_columns, test_y), f"{partial_fingerprint}-test")
+    return freeze((train_columns[j], train["residual"], test_columns[j], test["residual"],
+                   train["offset"], test["offset"], partial_fingerprint, train_stats), shared_arrays)
+
+
+# Largest n × p of the synthetic data: the train and test designs hold 2 n p float64 values, 160 MB at this
+# cap, the size of the largest single-predictor sets
+MAX_DESIGN_VALUES = 10_000_000
+
+if data_source == "Synthetic":
+    # Add inputs for the synthetic train and test sets
+    n_points = st.sidebar.number_input("Points per set (n)", min_value=3, max_value=10_000_000, value=30, step=1)
+    n_predictors = st.sidebar.number_input("Predictors (p)", min_value=1, max_value=1000, value=1, step=1)
+    true_intercept = st.sidebar.number_input("True intercept", value=1.0, step=0.5)
+    true_slope = st.sidebar.number_input("True slope", value=1.0, step=0.5)
+    train_noise = st.sidebar.number_input("Train set noise σ", min_value=0.0, value=1.0, step=0.5)
+    test_noise = st.sidebar.number_input("Test set noise σ", min_value=0.0, value=2.0, step=0.5)
+    seed = st.sidebar.number_input("Random seed", min_value=0, value=42, step=1)
+    if n_points * n_predictors > MAX_DESIGN_VALUES:
+        st.error(f"n × p may be at most {MAX_DESIGN_VALUES:,}: {n_points:,} × {n_predictors:,} points and "
+                 f"predictors would not fit in memory. Lower n or p.")
+        st.stop()
+
+    # Generate the train and test sets, or reuse them if these parameters were generated before
+    with tracer.span("load dataset"):
+        dataset = load_datasets(n_points, n_predictors, true_intercept, true_slope, train_noise, test_noise, seed)
+    predictor_names = [f"x{index + 1}" for index in range(n_predictors)]
+    train_description = f"a={true_intercept:g}, b={true_slope:g}, noise σ={train_noise:g}"
+    test_description = f"a={true_intercept:g}, b={true_slope:g}, noise σ={test_noise:g}"
 else:
-    col1 = st.columns(1)[0]
-    # Create just the main regression plot without columns
-    fig, ax = plt.subplots(figsize=(8, 6))
-    
-    # Generate x values for the line
-    x = np.linspace(-10, 10, 100)
-    
-    # Calculate y values based on the linear equation
-    y = a + b * x
-    
-    # Plot the line
-    ax.plot(x, y, 'b-', linewidth=2, label='Interactive Line')
-    
-    # Plot the scatter points only if the checkbox is checked
-    if show_data_points:
-        ax.scatter(scatter_x, scatter_y, color='red', alpha=0.7, label='Train set Points (a=1, b=1, noise σ=1)')
-        
-        # Plot residuals as vertical lines if SSR is being shown
-        if show_ssr:
-            for i in range(len(scatter_x)):
-                ax.plot([scatter_x[i], scatter_x[i]], [scatter_y[i], predicted_y[i]], 'g-', alpha=0.5)
-    
-    # Plot the test set points only if the checkbox is checked
-    if show_test_set:
-        ax.scatter(test_x, test_y, color='purple', alpha=0.7, label='Test Set Points (a=1, b=1, noise σ=2)')
-    
-    # Add gridlines
-    ax.grid(True, linestyle='--', alpha=0.7)
-    
-    # Set fixed axis limits
-    ax.set_xlim(-10, 10)
-    ax.set_ylim(-10, 10)
-    
-    # Add labels and title
-    plot_title = f'Linear Equation: y = {a:.1f} + {b:.1f}x'
+    # Add inputs for a CSV, Parquet or .npy file, either uploaded or already on the server
+    uploaded_file = st.sidebar.file_uploader("Upload a data file", type=[suffix.lstrip(".") for suffix in SUPPORTED_SUFFIXES])
+    # Files on the server can only be opened from the data directory the server is configured with
+    data_path = st.sidebar.text_input(f"Or a file in {DATA_DIR} on the server") if DATA_DIR else ""
+    if uploaded_file is not None:
+        file_name = uploaded_file.name
+        columns_key, columns = read_file_columns(file_name, uploaded_file.file_id, uploaded_file.getvalue())
+    elif data_path:
+        try:
+            data_path = str(resolve_data_path(data_path))
+        except ValueError as error:
+            st.error(str(error))
+            st.stop()
+        if not os.path.isfile(data_path):
+            st.error(f"File not found: {data_path}")
+            st.stop()
+        file_name = os.path.basename(data_path)
+        file_stat = os.stat(data_path)
+        columns_key, columns = read_file_columns(data_path, (file_stat.st_size, file_stat.st_mtime_ns), data_path)
+    else:
+        st.info("Upload a CSV, Parquet or .npy file" + (" or enter its path" if DATA_DIR else "")
+                + " in the sidebar to explore your own data.")
+        st.stop()
+    if len(columns) < 2:
+        st.error(f"{file_name} needs at least two numeric columns, found {len(columns)}.")
+        st.stop()
+
+    # Add inputs for the columns and the train/test split
+    column_names = list(columns)
+    x_columns = st.sidebar.multiselect("x columns", column_names, default=column_names[:1])
+    y_column = st.sidebar.selectbox("y column", column_names, index=1)
+    if not x_columns or y_column in x_columns:
+        st.error("Select at least one x column other than the y column.")
+        st.stop()
+    test_fraction = st.sidebar.slider("Test set fraction", min_value=0.05, max_value=0.95, value=0.2, step=0.05)
+    seed = st.sidebar.number_input("Random seed", min_value=0, value=42, step=1)
+
+    # Split the selected columns, or reuse the split if it was made before
+    with tracer.span("load dataset"):
+        dataset = load_file_split(columns_key, tuple(x_columns), y_column, test_fraction, seed, columns)
+    predictor_names = x_columns
+    train_description = test_description = f"{file_name}: {y_column}"
+    if len(dataset[1]) < 3 or len(dataset[3]) < 3:
+        st.error("The train and test sets need at least three rows each without missing values.")
+        st.stop()
+
+# With several predictors, add a choice of the one whose coefficient the panels and the slider b show
+train_target, test_target, fit = dataset[1], dataset[3], dataset[6]
+predictors = len(fit.coef)
+shown_predictor = 0
+if predictors > 1:
+    shown_predictor = st.sidebar.selectbox("Shown predictor", range(predictors),
+                                           format_func=lambda index: predictor_names[index])
+    held_fixed = f"{predictor_names[shown_predictor]}, others at OLS"
+    train_description = f"{train_description}; {held_fixed}"
+    test_description = f"{test_description}; {held_fixed}"
+elif data_source == "File":
+    train_description = test_description = f"{train_description} vs. {predictor_names[0]}"
+with tracer.span("partial residuals"):
+    (scatter_x, scatter_y, test_x, test_y, train_offset, test_offset, data_fingerprint,
+     train_stats) = load_partial(dataset[4], shown_predictor, dataset)
+
+
+
+@st.cache_resource(max_entries=8)
+def load_bootstrap(fingerprint, resamples, _data):
+    # The resamples only depend on the data, so they are drawn and refitted once per dataset and shared
+    # by every session; moving the sliders never touches them
+    train_x, train_y, test_x, test_y, train_target, test_target = _data
+    return freeze(bootstrap_fits(train_x, train_y, test_x, test_y, resamples,
+                                 train_target=train_target, test_target=test_target), shared_arrays)
+
+
+@st.cache_resource(max_entries=8)
+def load_folds(fingerprint, folds, _data):
+    # The per-fold sums only depend on the data and k, so they are added up once per dataset; the
+    # scores of any line then follow in closed form
+    train_x, train_y, train_target = _data
+    return freeze(fold_stats(train_x, train_y, folds or len(train_y), target=train_target), shared_arrays)
+
+
+folds = None
+if show_cross_validation:
+    # Leave-one-out keeps statistics for every row, so larger train sets fall back to the most folds offered
+    if not cv_folds and len(scatter_y) > MAX_LEAVE_ONE_OUT:
+        st.sidebar.warning(f"Leave-one-out is limited to {MAX_LEAVE_ONE_OUT:,} train points; using {MAX_FOLDS} folds.")
+        cv_folds = MAX_FOLDS
+    with tracer.span("cross-validation folds"):
+        folds = load_folds(data_fingerprint, cv_folds, (scatter_x, scatter_y, train_target))
+
+@st.cache_resource
+def get_metrics_index_builds():
+    # The indexes being built, weakly, so clearing the dataset cache can stop their threads
+    return weakref.WeakSet()
+
+
+@st.cache_resource(max_entries=8)
+def load_metrics_index(fingerprint, _start_a, _data):
+    # The SSR and MAE of every line on the slider lattice, built once per dataset in the background and
+    # stored as a memory map that later processes open; rows can be read as soon as they are filled. A
+    # build stops by itself once no cache or session references its index
+    index = MetricsIndex.build(fingerprint, *_data, start_a=_start_a)
+    if not index.complete:
+        get_metrics_index_builds().add(index)
+    return index
+
+
+metrics_index = None
+if max(len(scatter_y), len(test_y)) <= MAX_POINTS:
+    with tracer.span("metrics index"):
+        metrics_index = load_metrics_index(data_fingerprint, st.session_state['slider_a'],
+                                           ((scatter_x, scatter_y, train_target), (test_x, test_y, test_target)))
+
+bootstrap = None
+if show_bootstrap:
+    with tracer.span("bootstrap"):
+        bootstrap = load_bootstrap(data_fingerprint, bootstrap_resamples,
+                                   (scatter_x, scatter_y, test_x, test_y, train_target, test_target))
+
+@st.cache_resource
+def get_mae_curves():
+    # Sorted MAE breakpoints by dataset and intercept, shared by every session and by both backends
+    return FigureCache(sizeof=lambda curve: curve.nbytes)
+
+
+# Built outside this script, as the built panels keep the function and a function of the script would keep
+# the globals of the session that built them
+mae_curve = cached_curves(get_mae_curves(), data_fingerprint, scatter_x, scatter_y,
+                          functools.partial(freeze, shared=shared_arrays))
+
+
+@st.cache_resource
+def get_panel_cache():
+    # Built panels by their static layers, shared by every session on the same data
+    return PanelCache()
+
+
+# Everything the figure panels draw
+plot_data = PlotData(scatter_x, scatter_y, test_x, test_y, train_stats, train_description, test_description, bootstrap,
+                     mae_curve, metrics_index)
+
+# Add button to drop every cached dataset, e.g. after experimenting with very large n
+if st.sidebar.button("Clear dataset cache"):
+    load_design.clear()
+    load_datasets.clear()
+    load_file_columns.clear()
+    load_file_split.clear()
+    load_partial.clear()
+    load_bootstrap.clear()
+    load_folds.clear()
+    load_metrics_index.clear()
+    for index in list(get_metrics_index_builds()):
+        index.stop()
+    get_mae_curves().clear()
+    get_panel_cache().clear()
+
+
+@st.cache_resource
+def get_figure_cache():
+    # One cache of rendered figures shared by every session of the server
+    return FigureCache()
+
+
+figure_cache = get_figure_cache()
+
+
+def build_panel(panel_class, *options):
+    with tracer.span(f"build {panel_class.__name__}"):
+        return panel_class(plot_data, *options)
+
+
+def get_panel(panel_class, *options):
+    # Return (lock, panel). Without figure reuse every render builds a fresh figure of its own, released
+    # with the render; otherwise the figure is shared, built only when its static layers change, and a
+    # render holds its lock while it moves the artists
+    if not reuse_figures:
+        return contextlib.nullcontext(), build_panel(panel_class, *options)
+    static_key = (panel_class.__name__, options, data_fingerprint)
+    return get_panel_cache().get_or_build(static_key, lambda: build_panel(panel_class, *options))
+
+
+def render_shared(panel_class, options, frame_a, frame_b, *image_options):
+    lock, panel = get_panel(panel_class, *options)
+    with lock:
+        return render_image(panel, frame_a, frame_b, *image_options)
+
+
+def image_dpi(panel_name, density):
+    # Enough dots per inch for the panel's image to fill its column at the given pixel density
+    if density is None:
+        return FIXED_DPI
+    return math.ceil(PAGE_WIDTH * panel_inputs[f"{panel_name}_width"] * density / FIGURE_SIZE[0])
+
+
+def wire_bytes(output, format):
+    # Bytes of an image as sent to the browser; WebP and SVG travel base64-encoded in data URLs
+    nbytes = payload_bytes(output)
+    return nbytes if format == "png" else 4 * math.ceil(nbytes / 3)
+
+
+def bootstrap_band(resamples, points=100):
+    # The bootstrap band as (x, lower, upper) for the browser backend, or None when it is hidden
+    if not resamples:
+        return None
+    band_x = np.linspace(-10, 10, points)
+    return (band_x, *bootstrap.band(band_x), resamples)
+
+
+# Browser-side equivalents of the panels, built from the same options plus the current sliders
+VEGA_SPECS = {
+    MainPlot: lambda a, b, *options: vega_specs.main_plot(scatter_x, scatter_y, test_x, test_y, train_stats, *options[:-1],
+                                                       a, b, train_description, test_description,
+                                                       bootstrap_band(options[-1])),
+    SSRvsBPlot: lambda a, b: vega_specs.ssr_vs_b(train_stats, a, b),
+    SSRvsAPlot: lambda a, b: vega_specs.ssr_vs_a(train_stats, a, b),
+    MAEvsBPlot: lambda a, b: vega_specs.mae_vs_b(plot_data.mae_curve(a), a, b),
+    SSRSurfacePlot: lambda a, b: vega_specs.ssr_surface(train_stats, a, b),
+}
+
+
+# The class and options of each figure panel by name, for the comparison of image formats
+figure_options = {}
+
+
+def figure_panel(panel_class, *options):
+    # Build a figure panel as a Vega-Lite spec in the browser backend, otherwise as an image looked up by
+    # its class, its options, (a, b), its format and resolution and the dataset, rendering it only on a
+    # miss. (a, b) are the sliders unless a frame of the optimizer playback is given
+    playback_spec = {}
+    figure_options[panel_class.__name__] = (panel_class, options)
+
+    def render(frame=None):
+        frame_a, frame_b = (a, b) if frame is None else frame
+        if client_side_rendering:
+            # Between playback frames only the a and b parameters of a spec change, except for the MAE
+            # curve, which is sampled on the server for each a
+            if frame is None or panel_class is MAEvsBPlot:
+                return VEGA_SPECS[panel_class](frame_a, frame_b, *options)
+            if not playback_spec:
+                playback_spec.update(VEGA_SPECS[panel_class](frame_a, frame_b, *options))
+            return vega_specs.with_params(playback_spec, frame_a, frame_b)
+        dpi = image_dpi(panel_class.__name__, IMAGE_RESOLUTIONS[image_resolution])
+        if frame is not None:
+            # Playback frames are smaller and keep the full figure instead of a tight bounding box, which
+            # saves a draw per frame and keeps the frames from changing size while the title changes
+            dpi = min(dpi, PLAYBACK_DPI)
+        key = (panel_class.__name__, *options, frame_a, frame_b, frame is not None, image_format, dpi, data_fingerprint)
+        # The image is rendered for the (a, b) read into the key above, not the globals, which a newer
+        # fragment run may move while this render waits in the pool
+        if frame is None:
+            return figure_cache.get_or_render(
+                key, lambda: render_shared(panel_class, options, frame_a, frame_b, image_format, dpi))
+        return figure_cache.get_or_render(
+            key, lambda: render_shared(panel_class, options, frame_a, frame_b, image_format, dpi, None))
+    return render
+
+
+def show_figure(output):
+    # In the browser backend the server only sends the spec; the browser draws it from a and b
+    if client_side_rendering:
+        st.vega_lite_chart(output, use_container_width=True)
+    elif image_format == "webp":
+        # st.image converts raster formats other than PNG and JPEG to PNG, so WebP is passed as a data URL
+        st.image("data:image/webp;base64," + base64.b64encode(output).decode(), use_container_width=True)
+    else:
+        st.image(output, use_container_width=True)
+
+
+def figure_bytes(output):
+    # Bytes of a figure panel's output as sent to the browser
+    return payload_bytes(output) if client_side_rendering else wire_bytes(output, image_format)
+
+
+def compare_image_formats(names):
+    # Render the named figure panels at the current (a, b) in every format and resolution, bypassing the
+    # figure cache, and tabulate the bytes a rerun sends for them and the time they take to render
+    rows = []
+    for format_label, format in IMAGE_FORMAT_LABELS.items():
+        for resolution_label, density in IMAGE_RESOLUTIONS.items():
+            nbytes, start = 0, time.perf_counter()
+            for name in names:
+                panel_class, options = figure_options[name]
+                nbytes += wire_bytes(render_shared(panel_class, options, a, b, format, image_dpi(name, density)), format)
+            selected = (format, resolution_label) == (image_format, image_resolution)
+            rows.append(f"<tr><td>{'<b>' * selected}{format_label}{'</b>' * selected}</td><td>{resolution_label}</td>"
+                        f"<td>{nbytes / 1024:.0f}</td><td>{(time.perf_counter() - start) * 1e3:.0f}</td></tr>")
+    return ("<table style='width:100%'><tr><th>Format</th><th>Resolution</th><th>KB per rerun</th>"
+            f"<th>Render (ms)</th></tr>{''.join(rows)}</table>")
+
+
+def render_metrics_table():
+    # Look the evaluation metrics up in the index of the slider lattice. Until the row of a is filled, or
+    # between lattice points, calculate them in one fused pass per dataset. The data is read in fixed-size
+    # chunks, so memory stays bounded even for memory-mapped files larger than RAM. The full model is
+    # scored: the predictions of the predictors held fixed are added back to a + b * x
+    with tracer.span("metrics"):
+        train_metrics = test_metrics = None
+        if metrics_index is not None:
+            train_metrics = metrics_index.metrics("train", a, b, predictors)
+            test_metrics = metrics_index.metrics("test", a, b, predictors)
+        if train_metrics is None:
+            train_metrics = compute_metrics(scatter_x, train_target, a, b, predictors=predictors, offset=train_offset)
+            test_metrics = compute_metrics(test_x, test_target, a, b, predictors=predictors, offset=test_offset)
+    return ("<table style='width:100%; text-align: center;'>"
+            "<tr><th></th><th>Train Set</th><th>Test Set</th></tr>"
+            f"<tr><td>R-squared</td><td>{train_metrics.r2:.2f}</td><td>{test_metrics.r2:.2f}</td></tr>"
+            f"<tr><td>Adjusted R-squared</td><td>{train_metrics.adj_r2:.2f}</td><td>{test_metrics.adj_r2:.2f}</td></tr>"
+            f"<tr><td>MAE</td><td>{train_metrics.mae:.2f}</td><td>{test_metrics.mae:.2f}</td></tr>"
+            f"<tr><td>RMSE</td><td>{train_metrics.rmse:.2f}</td><td>{test_metrics.rmse:.2f}</td></tr>"
+            f"{bootstrap_rows()}</table>")
+
+
+def bootstrap_rows():
+    # 95% intervals of the metrics of the least-squares line over the cached resamples; they do not
+    # depend on the sliders
+    if bootstrap is None:
+        return ""
+    train_intervals, test_intervals = bootstrap.intervals("train"), bootstrap.intervals("test")
+    # On large data the resamples draw m < n points and the intervals are scaled to size n
+    drawn = "" if bootstrap.center is None else f" (m-out-of-n, m = {bootstrap.size:,})"
+    rows = f"<tr><th colspan='3'>OLS line, 95% bootstrap intervals{drawn}</th></tr>"
+    for name in train_intervals:
+        (train_low, train_high), (test_low, test_high) = train_intervals[name], test_intervals[name]
+        rows += (f"<tr><td>{name}</td><td>{train_low:.2f} – {train_high:.2f}</td>"
+                 f"<td>{test_low:.2f} – {test_high:.2f}</td></tr>")
+    return rows
+
+
+# Folds listed one by one in the cross-validation table; more folds (e.g. leave-one-out) are only summarized
+LISTED_FOLDS = 20
+
+
+def render_cv_table():
+    # Score the current line and each fold's own least-squares line on the held-out folds, in closed form
+    # from the cached per-fold sums
+    fold_a, fold_b = folds.ols()
+    current, refit = folds.scores(a, b), folds.scores(fold_a, fold_b)
+    names = ("SSR", "RMSE", "R-squared")
+
+    def cells(values):
+        return "".join(f"<td>{value:.2f}</td>" if np.isfinite(value) else "<td>–</td>" for value in values)
+
+    rows = []
+    if folds.folds <= LISTED_FOLDS:
+        for index in range(folds.folds):
+            rows.append(f"<tr><td>Fold {index + 1} (n={folds.held_out.n[index]:.0f})</td>"
+                        f"{cells(current[name][index] for name in names)}{cells(refit[name][index] for name in names)}</tr>")
+    # Leave-one-out folds have no spread of their own, so their R² is only meaningful pooled
+    rows.append(f"<tr><td>Mean</td>{cells(np.mean(current[name]) for name in names)}"
+                f"{cells(np.mean(refit[name]) for name in names)}</tr>")
+    pooled_current, pooled_refit = folds.pooled(a, b), folds.pooled(fold_a, fold_b)
+    rows.append(f"<tr><td>Pooled</td>{cells(pooled_current[name] for name in names)}"
+                f"{cells(pooled_refit[name] for name in names)}</tr>")
+    title = "Leave-one-out" if not cv_folds else f"{cv_folds}-fold"
+    return ("<table style='width:100%; text-align: center;'>"
+            f"<tr><th>{title}</th><th colspan='3'>Current line</th><th colspan='3'>OLS of each training part</th></tr>"
+            f"<tr><th></th>{''.join(f'<th>{name}</th>' for name in names * 2)}</tr>"
+            f"{''.join(rows)}</table>")
+
+
+def show_cv_table(table):
+    st.markdown("<h4 style='text-align: center;'>Cross-Validation</h4>", unsafe_allow_html=True)
+    st.markdown(table, unsafe_allow_html=True)
+
+
+def show_metrics_table(table):
+    st.markdown("<h4 style='text-align: center;'>Evaluation Metrics</h4>", unsafe_allow_html=True)
+    st.markdown(table, unsafe_allow_html=True)
+
+
+# The last output of each panel in this session with the key it was rendered for. Only small values like
+# these are kept per session; they are dropped when the session exceeds its memory budget
+panel_outputs = st.session_state.setdefault('panel_outputs', {})
+
+
+# Everything a panel can depend on, by name; the sliders are added by the panel fragment
+panel_inputs = {
+    "dataset": data_fingerprint,
+    "backend": render_backend,
+    "show_data_points": show_data_points,
+    "show_ssr": show_ssr,
+    "show_test_set": show_test_set,
+    "density_threshold": density_threshold,
+    "bootstrap_resamples": bootstrap_resamples,
+    "show_ssr_vs_b": show_ssr_vs_b,
+    "show_ssr_vs_a": show_ssr_vs_a,
+    "show_mae_vs_b": show_mae_vs_b,
+    "show_ssr_surface": show_ssr_surface,
+    "eval_metrics": eval_metrics,
+    "show_cross_validation": show_cross_validation,
+    "cv_folds": cv_folds,
+    "image_format": image_format,
+    "image_resolution": image_resolution,
+}
+
+# The panels with the inputs each one depends on; toggles that do not affect a panel are left out of its
+# inputs. The first row splits the width evenly between the main plot and the loss curves; the second
+# row keeps a third of the width for the metrics table next to the SSR surface, and the cross-validation
+# table has a third row to itself. The figure panels also depend on the width of their column, which
+# sets the resolution of their images
+figure_inputs = ("backend", "dataset", "a", "b", "image_format", "image_resolution")
+panels = PanelRegistry(row_widths={1: 3})
+panels.register("MainPlot", figure_panel(MainPlot, show_data_points, show_ssr, show_test_set, density_threshold,
+                                           bootstrap_resamples),
+                show_figure, inputs=(*figure_inputs, "MainPlot_width", "show_data_points", "show_ssr", "show_test_set",
+                                     "density_threshold", "bootstrap_resamples"))
+panels.register("SSRvsBPlot", figure_panel(SSRvsBPlot), show_figure, inputs=(*figure_inputs, "SSRvsBPlot_width"),
+                toggle="show_ssr_vs_b")
+panels.register("SSRvsAPlot", figure_panel(SSRvsAPlot), show_figure, inputs=(*figure_inputs, "SSRvsAPlot_width"),
+                toggle="show_ssr_vs_a")
+panels.register("MAEvsBPlot", figure_panel(MAEvsBPlot), show_figure, inputs=(*figure_inputs, "MAEvsBPlot_width"),
+                toggle="show_mae_vs_b")
+panels.register("SSRSurfacePlot", figure_panel(SSRSurfacePlot), show_figure,
+                inputs=(*figure_inputs, "SSRSurfacePlot_width"), toggle="show_ssr_surface", row=1, width=2)
+panels.register("EvaluationMetrics", render_metrics_table, show_metrics_table, inputs=("dataset", "a", "b", "bootstrap_resamples"),
+                toggle="eval_metrics", row=1)
+panels.register("CrossValidation", render_cv_table, show_cv_table, inputs=("dataset", "a", "b", "cv_folds"),
+                toggle="show_cross_validation", row=2)
+
+# The fraction of the page width each enabled panel's column takes
+panel_inputs.update({f"{name}_width": fraction for name, fraction in panels.column_fractions(panel_inputs).items()})
+
+
+@st.cache_resource
+def get_render_pool():
+    # One pool of render threads shared by every session of the server. Each panel draws on its own
+    # Figure object and never touches pyplot's global state, so panels can be rasterized concurrently
+    return ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="panel-render")
+
+
+# One lock per panel of this session, so a render left running by an interrupted rerun never overlaps
+# the next render of the same figure
+panel_locks = st.session_state.setdefault('panel_locks', {})
+
+
+def render_panel(panel):
+    with panel_locks.setdefault(panel.name, threading.Lock()), tracer.span(f"render {panel.name}"):
+        return panel.render()
+
+
+@st.cache_resource
+def get_trace_totals():
+    # Span totals of every session of the server, exported in the Prometheus format
+    return TraceTotals()
+
+
+# The latest traces of this session, for the debug panel
+session_traces = st.session_state.setdefault('traces', deque(maxlen=20))
+
+
+def finish_trace():
+    # Close the trace of this run, keep it for the debug panel and export it to the files set on the server
+    global tracer
+    if not tracer.enabled:
+        return
+    cache_stats = figure_cache.stats()
+    tracer.gauge("shared_figures", len(get_panel_cache()))
+    tracer.gauge("session_bytes", session_memory.nbytes)
+    tracer.gauge("shared_array_bytes", shared_arrays.nbytes())
+    tracer.gauge("resident_bytes", resident_bytes())
+    tracer.gauge("figure_cache_entries", cache_stats['entries'])
+    tracer.gauge("figure_cache_bytes", cache_stats['bytes'])
+    tracer.gauge("metrics_index_rows", metrics_index.rows_done if metrics_index is not None else 0)
+    session_traces.append(tracer.finish())
+    trace_totals = get_trace_totals()
+    trace_totals.add(tracer)
+    tracer = NULL_TRACER
+    try:
+        if TRACE_JSONL_PATH:
+            append_jsonl(TRACE_JSONL_PATH, session_traces[-1])
+        if TRACE_PROMETHEUS_PATH:
+            trace_totals.write_prometheus(TRACE_PROMETHEUS_PATH)
+    except OSError as error:
+        st.toast(f"Could not export the trace: {error}")
+
+
+def rerun():
+    # Rerun the fragment, or the whole script during a full run, keeping the trace the rerun cuts short
+    finish_trace()
+    st.rerun(scope="app" if script_running else "fragment")
+
+
+# Number of frames an optimizer path is played back in, and their resolution
+PLAYBACK_FRAMES = 40
+PLAYBACK_DPI = 100
+
+
+def play_optimizer(frames, placeholders, fps):
+    # The figure panels follow the (a, b) frames; the metrics table keeps showing the sliders
+    animated = [panel for panel in panels.enabled(panel_inputs) if panel.show is show_figure]
+
+    # Render every frame up front with one task per panel, since a panel's frames share its figure. Only
+    # the moving artists are redrawn, and replays or revisited positions are served by the figure cache
+    def render_frames(panel):
+        with panel_locks.setdefault(panel.name, threading.Lock()):
+            return [panel.render(frame) for frame in frames]
+
+    with st.spinner(f"Rendering {len(frames)} frames..."), tracer.span("render playback frames"):
+        if parallel_rendering:
+            panel_frames = [get_render_pool().submit(render_frames, panel) for panel in animated]
+            panel_frames = [render.result() for render in panel_frames]
+        else:
+            panel_frames = [render_frames(panel) for panel in animated]
+
+    # Swap the finished frames in at a steady rate, skipping frames that are already late
+    start = time.perf_counter()
+    with tracer.span("play frames"):
+        for index in range(len(frames)):
+            delay = start + index / fps - time.perf_counter()
+            if delay < -1 / fps and index < len(frames) - 1:
+                continue
+            time.sleep(max(delay, 0))
+            for panel, outputs in zip(animated, panel_frames):
+                with placeholders[panel.name].container():
+                    panel.show(outputs[index])
+
+    # Move the sliders to where the optimizer stopped
+    st.session_state['slider_target'] = tuple(float(np.clip(round(value, 1), -10, 10)) for value in frames[-1])
+    rerun()
+
+
+def move_sliders(values):
+    # Set the sliders to (a, b) rounded onto their range and step; as a button callback, before they are created
+    st.session_state['slider_a'], st.session_state['slider_b'] = (float(np.clip(round(value, 1), -10, 10))
+                                                                  for value in values)
+
+
+@st.fragment
+def interactive_panels():
+    # Moving a slider reruns only this function: the data, the toggles and the registry are kept from
+    # the last full run. While a render is in progress Streamlit interrupts it for the latest slider
+    # position, so intermediate positions of a drag are dropped instead of queued
+    global a, b, tracer
+    if not script_running:
+        rerun_counts["fragment"] += 1
+        tracer = Tracer("fragment") if st.session_state.get('trace_reruns') else NULL_TRACER
+
+    # Land the sliders on the last frame of a finished optimizer playback or on the OLS solution
+    if 'slider_target' in st.session_state:
+        st.session_state['slider_a'], st.session_state['slider_b'] = st.session_state.pop('slider_target')
+
+    # Create sliders for parameters a and b above the panels
+    a_column, b_column = st.columns(2)
+    a = a_column.slider("Parameter a (y-intercept)", min_value=-10.0, max_value=10.0, step=0.1, key='slider_a')
+    b = b_column.slider("Parameter b (slope)", min_value=-10.0, max_value=10.0, step=0.1, key='slider_b')
+    panel_inputs.update(a=a, b=b)
+
+    # Display the current equation with parameter values
+    st.markdown(f"<h4 style='text-align: center;'>y = <span style='color:red'>a</span> + <span style='color:green'>b</span> x</h4>", unsafe_allow_html=True)
+    st.markdown(f"<h4 style='text-align: center;'>y = <span style='color:red'>{a:.1f}</span> + <span style='color:green'>{b:.1f}</span> x</h4>", unsafe_allow_html=True)
+
+    # Display the train SSR value only if the show_ssr checkbox is checked; the residuals of the partial
+    # model are those of the full one, so it follows in closed form from the statistics
     if show_ssr:
-        plot_title += f' with SSR = {ssr:.2f}'
-    ax.set_title(plot_title)
-    
-    # Add the x and y axes
-    ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-    ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-    
-    # Add a legend
-    ax.legend()
-    
-    # Display the plot in Streamlit
-    st.pyplot(fig)
-
-
-# Display evaluation metrics only if the eval_metrics checkbox is checked
-if eval_metrics:
-    col1, col2 = st.columns([2, 1])
-    with col2:
-        st.markdown("<h4 style='text-align: center;'>Evaluation Metrics</h4>", unsafe_allow_html=True)
-        st.markdown("<table style='width:100%; text-align: center;'>"
-                    "<tr><th></th><th>Train Set</th><th>Test Set</th></tr>"
-                    f"<tr><td>R-squared</td><td>{r2_train:.2f}</td><td>{r2_test:.2f}</td></tr>"
-                    f"<tr><td>Adjusted R-squared</td><td>{adj_r2_train:.2f}</td><td>{adj_r2_test:.2f}</td></tr>"
-                    f"<tr><td>MAE</td><td>{mae_train:.2f}</td><td>{mae_test:.2f}</td></tr>"
-                    f"<tr><td>RMSE</td><td>{rmse_train:.2f}</td><td>{rmse_test:.2f}</td></tr>"
-                    "</table>", unsafe_allow_html=True)
-    with col1:
-        # Create the main regression plot in left column
-        fig, ax = plt.subplots(figsize=(8, 6))
-        # Generate x values for the line
-        x = np.linspace(-10, 10, 100)
-        
-        # Calculate y values based on the linear equation
-        y = a + b * x
-        
-        # Plot the line
-        ax.plot(x, y, 'b-', linewidth=2, label='Interactive Line')
-        
-        # Plot the scatter points only if the checkbox is checked
-        if show_data_points:
-            ax.scatter(scatter_x, scatter_y, color='red', alpha=0.7, label='Train Set Points (a=1, b=1, noise σ=1)')
-            
-            # Plot residuals as vertical lines if SSR is being shown
-            if show_ssr:
-                for i in range(len(scatter_x)):
-                    ax.plot([scatter_x[i], scatter_x[i]], [scatter_y[i], predicted_y[i]], 'g-', alpha=0.5)
-        
-        # Plot the test set points only if the checkbox is checked
-        if show_test_set:
-            ax.scatter(test_x, test_y, color='purple', alpha=0.7, label='Test Set Points (a=1, b=1, noise σ=2)')
-        
-        # Add gridlines
-        ax.grid(True, linestyle='--', alpha=0.7)
-        
-        # Set fixed axis limits
-        ax.set_xlim(-10, 10)
-        ax.set_ylim(-10, 10)
-        
-        # Add labels and title
-        plot_title = f'Linear Equation: y = {a:.1f} + {b:.1f}x'
-        if show_ssr:
-            plot_title += f' with SSR = {ssr:.2f}'
-        ax.set_title(plot_title)
-        
-        # Add the x and y axes
-        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
-        
-        # Add a legend
-        ax.legend()
-        
-        # Display the plot in Streamlit
-        st.pyplot(fig)
-else:
-    col1 = st.columns(1)[0]
\ No newline at end of file
+        ssr = float(train_stats.ssr(a, b))
+        st.markdown(f"<h4 style='text-align: center;'>Sum of Squared Residuals (SSR): <span style='color:blue'>{ssr:.2f}</span></h4>", unsafe_allow_html=True)
+
+    # Add a button that moves the sliders to the least-squares fit, which was solved with the dataset
+    ols_column, fit_column = st.columns([1, 4])
+    fit_column.caption(f"OLS fit: a = {fit.intercept:.3f}, b = {fit.coef[shown_predictor]:.3f}, "
+                       f"R² = {fit.r2:.3f}, adjusted R² = {fit.adj_r2:.3f} (p = {predictors})")
+    ols_column.button("Solve OLS", on_click=move_sliders, args=((fit.intercept, fit.coef[shown_predictor]),))
+
+    # Add controls to fit the line from the current (a, b) with an optimizer and play its steps back
+    with st.expander("Optimizer playback"):
+        method_column, rate_column, steps_column, speed_column = st.columns(4)
+        optimizer = method_column.selectbox("Optimizer", OPTIMIZERS)
+        learning_rate = rate_column.number_input("Learning rate", min_value=0.0001, max_value=1.0, value=0.02,
+                                                 step=0.005, format="%.4f")
+        steps = steps_column.number_input("Steps", min_value=1, max_value=10_000, value=200, step=10)
+        playback_fps = speed_column.number_input("Frames per second", min_value=1, max_value=30, value=10, step=1)
+        if optimizer == "Mini-batch SGD":
+            batch_size = st.number_input("Batch size", min_value=1, max_value=10_000, value=32, step=1)
+        if optimizer == "Momentum":
+            momentum = st.slider("Momentum", min_value=0.0, max_value=0.99, value=0.9, step=0.01)
+        play = st.button("Play")
+
+    # Re-render a panel only when one of its own inputs changed since its last output in this session
+    layout = panels.layout(panel_inputs)
+    panel_keys = {panel.name: panels.key(panel, panel_inputs) for row, _ in layout for panel in row}
+    stale_panels = [panel for row, _ in layout for panel in row
+                    if panel_outputs.get(panel.name, (None,))[0] != panel_keys[panel.name]]
+    stale_names = {panel.name for panel in stale_panels}
+
+    # Submit the stale panels to the pool all at once; a single panel is rendered on the script thread
+    renders = {}
+    if parallel_rendering and len(stale_panels) > 1:
+        render_pool = get_render_pool()
+        renders = {panel.name: render_pool.submit(render_panel, panel) for panel in stale_panels}
+
+    # Lay out the enabled panels in rows of columns, showing each one as soon as its render is done
+    placeholders = {}
+    sent_bytes, shown_bytes = 0, 0
+    try:
+        for row, widths in layout:
+            for panel, column in zip(row, st.columns(widths)):
+                if panel.name in stale_names:
+                    output = renders[panel.name].result() if panel.name in renders else render_panel(panel)
+                    panel_outputs[panel.name] = (panel_keys[panel.name], output)
+                placeholders[panel.name] = column.empty()
+                with placeholders[panel.name].container(), tracer.span(f"show {panel.name}"):
+                    panel.show(panel_outputs[panel.name][1])
+                # Unchanged images are not sent again: PNGs keep their media URL and the browser already
+                # has the messages that carry the data URLs
+                nbytes = (figure_bytes if panel.show is show_figure else payload_bytes)(panel_outputs[panel.name][1])
+                shown_bytes += nbytes
+                if panel.name in stale_names:
+                    sent_bytes += nbytes
+                if tracer.enabled:
+                    tracer.payload(panel.name, nbytes)
+    finally:
+        # When a newer slider position interrupts this run, drop the renders that have not started yet
+        for render in renders.values():
+            render.cancel()
+
+    if play:
+        if optimizer == "Mini-batch SGD":
+            path = minibatch_sgd(scatter_x, scatter_y, a, b, learning_rate, steps, batch_size, seed=0)
+        else:
+            path = gradient_descent(train_stats, a, b, learning_rate, steps, momentum if optimizer == "Momentum" else 0.0)
+        play_optimizer(sample_frames(path, PLAYBACK_FRAMES).tolist(), placeholders, playback_fps)
+
+    st.caption(f"Reruns in this session: {rerun_counts['full']} full script, {rerun_counts['fragment']} panels only. "
+               f"Panels: {sent_bytes / 1024:.0f} KB sent in this rerun, {shown_bytes / 1024:.0f} KB on screen")
+
+    # Add a comparison of what a rerun sends for the figure panels on screen in every image format and resolution
+    if not client_side_rendering:
+        with st.expander("Image formats"):
+            if st.button("Compare formats at the current (a, b)"):
+                figure_names = [panel.name for row, _ in layout for panel in row if panel.show is show_figure]
+                with st.spinner("Rendering..."), tracer.span("compare image formats"):
+                    st.markdown(compare_image_formats(figure_names), unsafe_allow_html=True)
+    if not script_running:
+        finish_trace()
+
+
+interactive_panels()
+script_running = False
+
+# Release the outputs of panels that were hidden in this rerun
+shown_panels = {panel.name for panel in panels.enabled(panel_inputs)}
+for panel_name in set(panel_outputs) - shown_panels:
+    del panel_outputs[panel_name]
+
+# Measure what this session keeps and drop its largest panel outputs while it is over its budget; they
+# are rendered again on the next rerun. Images that the shared figure cache holds are not the session's
+session_memory.enforce(st.session_state.to_dict(), panel_outputs, shared_arrays,
+                       {id(image) for image in figure_cache.values()})
+
+# Display the figure cache counters at the bottom of the sidebar
+cache_stats = figure_cache.stats()
+st.sidebar.caption(
+    f"Figure cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+    f"{cache_stats['evictions']} evictions, {cache_stats['entries']} entries "
+    f"({cache_stats['bytes'] / 1024**2:.1f} MB)"
+)
+if metrics_index is not None and not metrics_index.complete:
+    st.sidebar.caption(f"Metrics index: {metrics_index.rows_done} of {len(metrics_index.done)} values of a filled")
+
+# Add a debug panel with the switch for tracing, the files the traces are exported to and the latest traces
+with st.sidebar.expander("Debug"):
+    st.checkbox("Trace reruns", key='trace_reruns')
+    # The export files are set on the server only, as visitors must not choose files for it to write
+    st.caption(f"Traces appended to: {TRACE_JSONL_PATH or 'unset (DASHBOARD_TRACE_JSONL)'}. "
+               f"Prometheus metrics written to: {TRACE_PROMETHEUS_PATH or 'unset (DASHBOARD_TRACE_PROMETHEUS)'}.")
+    st.checkbox("Report memory", key='memory_report')
+    finish_trace()
+
+    # Resident memory of the process, what every session shares and what each live session keeps of its own.
+    # Sizing the shared figures walks their artists, so the report is only made when asked for
+    if st.session_state['memory_report']:
+        session_sizes = sorted((record.nbytes for record in get_session_registry().records()), reverse=True)
+        memory_rows = [
+            ("Process (resident)", resident_bytes()),
+            ("Shared arrays: datasets, statistics, MAE curves", shared_arrays.nbytes()),
+            (f"Shared figures ({len(get_panel_cache())})", sum(deep_nbytes(panel, shared_arrays)
+                                                              for panel in get_panel_cache().panels())),
+            ("Rendered figure cache", figure_cache.nbytes),
+            (f"All sessions ({len(session_sizes)}, largest {session_sizes[0] / 1024:.0f} KB)", sum(session_sizes)),
+            (f"This session (budget {session_memory.budget / 1024**2:.3g} MB, {session_memory.evictions} outputs dropped)",
+             session_memory.nbytes),
+        ]
+        st.markdown("<table style='width:100%'><tr><th>Memory</th><th>MB</th></tr>"
+                    + "".join(f"<tr><td>{name}</td><td>{nbytes / 1024**2:.1f}</td></tr>" for name, nbytes in memory_rows)
+                    + "</table>", unsafe_allow_html=True)
+        st.caption("This session: " + ", ".join(f"{name} {nbytes / 1024:.0f} KB" for name, nbytes in sorted(
+            session_memory.breakdown.items(), key=lambda item: -item[1])[:5]))
+
+    if st.session_state['trace_reruns'] and session_traces:
+        # The latest run in full; the fragment reruns in between show up when the script runs again
+        latest = session_traces[-1]
+        st.caption(f"Latest {latest.kind} run: {latest.duration * 1e3:.1f} ms. Updated on full runs of the script.")
+        st.markdown("<table style='width:100%'><tr><th>Stage</th><th>Start (ms)</th><th>Duration (ms)</th></tr>"
+                    + "".join(f"<tr><td>{span.name}</td><td>{span.start * 1e3:.1f}</td><td>{span.duration * 1e3:.1f}</td></tr>"
+                              for span in sorted(latest.spans, key=lambda span: span.start))
+                    + "</table>", unsafe_allow_html=True)
+        st.markdown("<table style='width:100%'><tr><th>Panel</th><th>Payload (KB)</th></tr>"
+                    + "".join(f"<tr><td>{name}</td><td>{nbytes / 1024:.1f}</td></tr>"
+                              for name, nbytes in latest.payload_bytes.items())
+                    + "</table>", unsafe_allow_html=True)
+        st.caption(", ".join(f"{name.replace('_', ' ')}: {value}" for name, value in latest.gauges.items()))
+        st.caption("Recent runs: " + ", ".join(f"{trace.kind} {trace.duration * 1e3:.0f} ms"
+                                               for trace in reversed(session_traces)))
@@ -0,0 +1,116 @@
+"""Check the fused metrics against a direct reference.
+
+``python -m benchmarks.check_metrics`` scores lines with
+:func:`src.metrics.compute_metrics` and :func:`src.metrics.compute_metrics_batch`
+and compares R², adjusted R², MAE and RMSE with a direct computation from
+the full residual array, which follows sklearn's ``r2_score``,
+``mean_absolute_error`` and ``mean_squared_error``. When scikit-learn is
+installed it is checked against as well. The cases cover chunk sizes that
+do not divide n, y far from zero, constant y and an offset added to the
+predictions. Exits with status 1 if any value differs by more than
+``--tolerance`` (relative). The default allows for y near 1e8, where the
+residuals themselves keep only about eight significant digits, so any
+two ways of summing them differ in the ninth.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from src.datasets import generate_train_test
+from src.metrics import compute_metrics, compute_metrics_batch
+
+FIELDS = ("r2", "adj_r2", "mae", "rmse")
+
+
+def reference(x, y, a, b, predictors=1, offset=None):
+    """Return ``{field: value}`` computed directly from the residual array."""
+    prediction = a + b * np.asarray(x, dtype=float) + (0.0 if offset is None else offset)
+    residuals = y - prediction
+    n = len(y)
+    ssr = float(residuals @ residuals)
+    sst = float(((y - y.mean()) ** 2).sum())
+    # As sklearn's r2_score: a constant y scores 1 for a perfect fit and 0 otherwise
+    r2 = 1 - ssr / sst if sst > 0 else float(ssr == 0)
+    return {
+        "r2": r2,
+        "adj_r2": 1 - (1 - r2) * (n - 1) / (n - predictors - 1),
+        "mae": float(np.abs(residuals).mean()),
+        "rmse": float(np.sqrt(ssr / n)),
+    }
+
+
+def sklearn_reference(x, y, a, b, predictors=1, offset=None):
+    """Return the same fields from scikit-learn, or None if it is not installed."""
+    try:
+        from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    except ImportError:
+        return None
+    prediction = a + b * np.asarray(x, dtype=float) + (0.0 if offset is None else offset)
+    n = len(y)
+    r2 = r2_score(y, prediction)
+    return {
+        "r2": r2,
+        "adj_r2": 1 - (1 - r2) * (n - 1) / (n - predictors - 1),
+        "mae": mean_absolute_error(y, prediction),
+        "rmse": np.sqrt(mean_squared_error(y, prediction)),
+    }
+
+
+def cases():
+    """Yield ``(name, x, y, a, b, keyword arguments of compute_metrics)`` for every check."""
+    for n in (30, 10**3, 10**5):
+        train_x, train_y, _, _ = generate_train_test(n, 1.0, 1.0, 1.0, 2.0, 42)
+        yield f"n={n}", train_x[0], train_y, -2.0, 1.0, {}
+    train_x, train_y, _, _ = generate_train_test(1000, 1.0, 1.0, 1.0, 2.0, 42)
+    x, y = train_x[0], train_y
+    yield "chunk_size=7", x, y, -2.0, 1.0, {"chunk_size": 7}
+    yield "y + 1e8", x, y + 1e8, 1e8 - 2.0, 1.0, {}
+    yield "y + 1e8, chunk_size=7", x, y + 1e8, 1e8 - 2.0, 1.0, {"chunk_size": 7}
+    yield "constant y, perfect fit", x, np.full_like(y, 3.0), 3.0, 0.0, {}
+    yield "constant y", x, np.full_like(y, 3.0), -2.0, 1.0, {}
+    yield "offset", x, y, -2.0, 1.0, {"offset": np.sin(x)}
+    yield "predictors=3", x, y, -2.0, 1.0, {"predictors": 3}
+
+
+def _difference(value, expected):
+    return abs(value - expected) / max(abs(expected), 1.0)
+
+
+def check(tolerance):
+    """Print every case and return the names of those that differ by more than ``tolerance``."""
+    failures = []
+    print(f"{'case':<28} {'fused':>10} {'batch':>10} {'sklearn':>10}")
+    for name, x, y, a, b, options in cases():
+        predictors, offset = options.get("predictors", 1), options.get("offset")
+        expected = reference(x, y, a, b, predictors, offset)
+        fused = compute_metrics(x, y, a, b, **options)
+        batch = compute_metrics_batch(x, y, [a], [b], predictors=predictors, offset=offset)
+        fused_error = max(_difference(getattr(fused, field), expected[field]) for field in FIELDS)
+        batch_error = max(_difference(getattr(batch, field)[0], expected[field]) for field in FIELDS)
+        external = sklearn_reference(x, y, a, b, predictors, offset)
+        sklearn_error = None if external is None else max(
+            _difference(getattr(fused, field), external[field]) for field in FIELDS)
+        print(f"{name:<28} {fused_error:>10.1e} {batch_error:>10.1e} "
+              f"{'-' if sklearn_error is None else f'{sklearn_error:.1e}':>10}")
+        if max(fused_error, batch_error, sklearn_error or 0.0) > tolerance:
+            failures.append(name)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tolerance", type=float, default=1e-8,
+                        help="largest relative difference accepted (default: 1e-8)")
+    args = parser.parse_args(argv)
+    failures = check(args.tolerance)
+    if failures:
+        print(f"\n{len(failures)} case(s) differ by more than {args.tolerance:g}: {', '.join(failures)}")
+        return 1
+    print(f"\nAll cases agree within {args.tolerance:g}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Benchmarks of the dashboard's hot paths against a saved baseline.
+
+``python -m benchmarks.suite`` times data generation, the sufficient
+statistics, the fused metrics pass, the SSR and MAE curves and the
+matplotlib panels for n in {30, 10³, 10⁵, 10⁷} points and curve resolutions
+from 100 to 10⁴ samples, and compares every case with
+``benchmarks/baseline.json``. It exits with status 1 if a case got slower
+than the baseline by more than ``--threshold``. ``--save`` records the
+current timings as the new baseline; baselines are only comparable on the
+machine they were saved on.
+
+Each case is timed as the best of ``--repeat`` rounds. Fast cases are run
+in loops long enough to be measurable and reported per call.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+import numpy as np
+
+from src.datasets import generate_train_test
+from src.figures import MAEvsBPlot, MainPlot, PlotData, SSRSurfacePlot, SSRvsBPlot, render_png
+from src.mae_curve import MAECurve
+from src.metrics import compute_metrics
+from src.sufficient_stats import SufficientStats
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+SIZES = (30, 10**3, 10**5, 10**7)
+RESOLUTIONS = (100, 10**3, 10**4)
+SURFACE_RESOLUTIONS = (100, 500, 1000)
+
+# The slider defaults of the app and the density threshold above which the panels bin the points
+A, B = -2.0, 1.0
+DENSITY_THRESHOLD = 50_000
+
+# Timings below this many seconds are looped until a round takes at least this long
+MIN_ROUND = 0.05
+
+
+_datasets = {}
+
+
+def _dataset(n):
+    # The synthetic train and test sets of the app's defaults with n points each, generated once per n
+    if n not in _datasets:
+        train_x, train_y, test_x, test_y = generate_train_test(n, 1.0, 1.0, 1.0, 2.0, 42)
+        stats = SufficientStats.from_arrays(train_x[0], train_y)
+        _datasets[n] = PlotData(train_x[0], train_y, test_x[0], test_y, stats, "train", "test")
+    return _datasets[n]
+
+
+def _render(panel_class, data, *options):
+    # Build the panel once, then time the slider path: move its artists and rasterize it
+    panel = panel_class(data, *options)
+    return lambda: render_png(panel, A, B)
+
+
+def _mae_samples(data, resolution):
+    # Sort the breakpoints once, then time sampling the curve
+    curve = MAECurve(data.train_x, data.train_y, A)
+    return lambda: curve.curve(-10, 10, resolution)
+
+
+def cases(sizes=SIZES, resolutions=RESOLUTIONS):
+    """Yield ``(name, setup)`` for every benchmark; ``setup()`` returns the function to time."""
+    for n in sizes:
+        yield f"datasets.generate_train_test[n={n}]", lambda n=n: lambda: generate_train_test(n, 1.0, 1.0, 1.0, 2.0, 42)
+        yield f"sufficient_stats.from_arrays[n={n}]", lambda n=n: lambda: SufficientStats.from_arrays(
+            _dataset(n).train_x, _dataset(n).train_y)
+        yield f"metrics.compute_metrics[n={n}]", lambda n=n: lambda: compute_metrics(
+            _dataset(n).train_x, _dataset(n).train_y, A, B)
+        yield f"mae_curve.build[n={n}]", lambda n=n: lambda: MAECurve(_dataset(n).train_x, _dataset(n).train_y, A)
+        yield f"figures.main_plot.build[n={n}]", lambda n=n: lambda: MainPlot(
+            _dataset(n), True, True, True, DENSITY_THRESHOLD)
+        yield f"figures.main_plot.render[n={n}]", lambda n=n: _render(MainPlot, _dataset(n), True, True, True,
+                                                                      DENSITY_THRESHOLD)
+
+    # The curves cost the same for any n once the statistics or the MAE breakpoints exist
+    n = 10**5
+    for resolution in resolutions:
+        grid = np.linspace(-10, 10, resolution)
+        yield f"sufficient_stats.ssr_curve[r={resolution}]", lambda grid=grid: lambda: _dataset(n).stats.ssr(A, grid)
+        yield f"mae_curve.curve[n={n},r={resolution}]", lambda resolution=resolution: _mae_samples(
+            _dataset(n), resolution)
+        yield f"figures.ssr_vs_b.render[r={resolution}]", lambda resolution=resolution: _render(
+            SSRvsBPlot, _dataset(n), resolution)
+        yield f"figures.mae_vs_b.render[n={n},r={resolution}]", lambda resolution=resolution: _render(
+            MAEvsBPlot, _dataset(n), resolution)
+    for resolution in SURFACE_RESOLUTIONS:
+        yield f"figures.ssr_surface.build[r={resolution}]", lambda resolution=resolution: lambda: SSRSurfacePlot(
+            _dataset(n), resolution)
+
+
+def time_case(function, repeat=5):
+    """Return the best seconds per call of ``function`` over ``repeat`` rounds."""
+    start = time.perf_counter()
+    function()
+    first = time.perf_counter() - start
+    number = max(1, int(MIN_ROUND / first)) if first > 0 else 1000
+    best = first if number == 1 else float("inf")
+    for _ in range(repeat - (number == 1)):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run(pattern="", repeat=5, sizes=SIZES):
+    """Time every case whose name contains ``pattern`` and return ``{name: seconds}``."""
+    results = {}
+    for name, setup in cases(sizes):
+        if pattern in name:
+            results[name] = time_case(setup(), repeat)
+            print(f"{name:<48} {_format(results[name])}", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Return the names of the cases slower than the baseline by more than ``threshold`` (and ``min_delta`` seconds)."""
+    regressions = []
+    print(f"\n{'case':<48} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<48} {'-':>10} {_format(seconds)} {'new':>7}")
+            continue
+        ratio = seconds / before
+        regressed = ratio > 1 + threshold and seconds - before > min_delta
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<48} {_format(before)} {_format(seconds)} {ratio:>6.2f}x{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def _format(seconds):
+    return f"{seconds * 1e3:>8.3f}ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pattern", nargs="?", default="", help="only run the cases whose name contains this")
+    parser.add_argument("--save", action="store_true", help=f"save the timings as the baseline ({BASELINE_PATH.name})")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="baseline file to compare with or save to")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="fail if a case is slower than its baseline by more than this fraction (default: 0.5)")
+    parser.add_argument("--min-delta", type=float, default=1e-4,
+                        help="ignore slowdowns of fewer seconds than this, which are noise (default: 0.0001)")
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per case, the best is kept (default: 5)")
+    parser.add_argument("--quick", action="store_true", help="skip n = 10⁷")
+    args = parser.parse_args(argv)
+
+    results = run(args.pattern, args.repeat, SIZES[:-1] if args.quick else SIZES)
+    if args.save:
+        saved = json.loads(args.baseline.read_text())["results"] if args.baseline.exists() else {}
+        saved.update(results)
+        args.baseline.write_text(json.dumps({
+            "machine": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "results": dict(sorted(saved.items())),
+        }, indent=2) + "\n")
+        print(f"\nSaved {len(results)} timings to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save first")
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text())["results"], args.threshold, args.min_delta)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo case regressed by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
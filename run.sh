@@ -1 +1,4 @@
-poetry run streamlit run app.py
\ No newline at end of file
+# Build the font cache and compile the src package before the server takes its first request
+export MPLBACKEND=Agg
+poetry run python -m src.warmup
+poetry run streamlit run app.py
@@ -0,0 +1,12 @@
+"""Compute core of the linear regression dashboard.
+
+Everything ``app.py`` draws is computed here and can be imported without a
+Streamlit server: :mod:`src.datasets` and :mod:`src.data_sources` produce
+the data, :mod:`src.sufficient_stats`, :mod:`src.mae_curve` and
+:mod:`src.metrics` evaluate the losses and metrics, :mod:`src.metrics_index`
+precomputes them over the slider lattice, and :mod:`src.figures` builds and
+rasterizes the matplotlib panels. ``benchmarks/suite.py`` times
+them, and :mod:`src.batch_eval` scores files of candidate lines without
+the UI. The submodules are imported on demand, so importing this package
+does not load matplotlib.
+"""
@@ -0,0 +1,151 @@
+"""Score a file of candidate lines on the dashboard's train and test sets.
+
+``python -m src.batch_eval candidates.csv results.parquet`` reads (a, b)
+pairs from a CSV, Parquet or .npy file and writes, for every pair, the
+SSR, R², adjusted R², MAE and RMSE of the line ``a + b * x`` on the train
+and on the test set, computed by :func:`src.metrics.compute_metrics_batch`
+with the same definitions as the dashboard's metrics table.
+
+The train and test sets are the dashboard's: the synthetic sets of its
+sidebar defaults, or, with ``--data``, the same split of a data file that
+the dashboard makes for the same columns, test fraction and seed. Only one
+predictor is supported, as a candidate has one slope.
+
+Candidates are read as memory-mapped columns (see
+:mod:`src.data_sources`) and scored and written ``CANDIDATE_BLOCK`` at a
+time, so memory does not grow with the number of candidates. The results
+are written as CSV or Parquet, chosen by the suffix of the output file.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.data_sources import content_key, load_columns, split_train_test
+from src.datasets import generate_train_test
+from src.metrics import compute_metrics_batch
+
+# Candidates scored and written per block
+CANDIDATE_BLOCK = 1 << 16
+
+OUTPUT_SUFFIXES = (".csv", ".parquet")
+
+# The metrics written per split, as fields of src.metrics.RegressionMetrics
+METRICS = ("ssr", "r2", "adj_r2", "mae", "rmse")
+
+
+def load_synthetic(n, intercept, slope, train_noise, test_noise, seed):
+    """Return ``(train_x, train_y, test_x, test_y)`` of the dashboard's synthetic data with one predictor."""
+    train_columns, train_y, test_columns, test_y = generate_train_test(n, intercept, slope, train_noise, test_noise, seed)
+    return train_columns[0], train_y, test_columns[0], test_y
+
+
+def load_file(path, x_column, y_column, test_fraction, seed):
+    """Return ``(train_x, train_y, test_x, test_y)`` split from a data file as the dashboard splits it.
+
+    The split is keyed like the dashboard's, so a split made by either is
+    reused by the other.
+    """
+    columns_key = content_key(path)
+    columns = load_columns(path, Path(path).name, columns_key)
+    names = list(columns)
+    x_column = x_column or names[0]
+    y_column = y_column or names[1]
+    for name in (x_column, y_column):
+        if name not in columns:
+            raise ValueError(f"{path} has no numeric column {name!r}; found {', '.join(names)}")
+    key = content_key(repr((columns_key, (x_column,), y_column, test_fraction, seed)).encode())
+    (train_x,), train_y, (test_x,), test_y = split_train_test(
+        [columns[x_column]], columns[y_column], test_fraction, seed, key)
+    return train_x, train_y, test_x, test_y
+
+
+def evaluate(a, b, train_x, train_y, test_x, test_y):
+    """Return ``{column: array}`` of the candidates and their train and test metrics."""
+    results = {"a": np.asarray(a, dtype=float), "b": np.asarray(b, dtype=float)}
+    for split, x, y in (("train", train_x, train_y), ("test", test_x, test_y)):
+        metrics = compute_metrics_batch(x, y, a, b)
+        results.update({f"{split}_{name}": getattr(metrics, name) for name in METRICS})
+    return results
+
+
+def _writer(path, schema):
+    # A writer of pyarrow tables in the format of the file's suffix
+    if path.suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq
+
+        # Metrics rarely repeat, so dictionary encoding would only cost time
+        return pq.ParquetWriter(path, schema, use_dictionary=False)
+    import pyarrow.csv as csv
+
+    return csv.CSVWriter(path, schema)
+
+
+def evaluate_file(candidates, output, data, a_column="a", b_column="b"):
+    """Score every (a, b) pair of the ``candidates`` file on ``data`` and write the results to ``output``.
+
+    ``data`` is ``(train_x, train_y, test_x, test_y)``. Returns the number
+    of candidates.
+    """
+    import pyarrow as pa
+
+    output = Path(output)
+    if output.suffix.lower() not in OUTPUT_SUFFIXES:
+        raise ValueError(f"Unsupported output type {output.suffix!r}, expected one of {', '.join(OUTPUT_SUFFIXES)}")
+    columns = load_columns(candidates, Path(candidates).name)
+    for name in (a_column, b_column):
+        if name not in columns:
+            raise ValueError(f"{candidates} has no numeric column {name!r}; found {', '.join(columns)}")
+    a, b = columns[a_column], columns[b_column]
+
+    schema = pa.schema([(name, pa.float64()) for name in ("a", "b")] +
+                       [(f"{split}_{name}", pa.float64()) for split in ("train", "test") for name in METRICS])
+    with _writer(output, schema) as writer:
+        for start in range(0, len(a), CANDIDATE_BLOCK):
+            stop = start + CANDIDATE_BLOCK
+            writer.write_table(pa.table(evaluate(a[start:stop], b[start:stop], *data), schema=schema))
+    return len(a)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("candidates", help="CSV, Parquet or .npy file with a column of intercepts and one of slopes")
+    parser.add_argument("output", help="results file, .csv or .parquet")
+    parser.add_argument("--a-column", default="a", help="column of the intercepts (default: a)")
+    parser.add_argument("--b-column", default="b", help="column of the slopes (default: b)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed of the data or the split (default: 42)")
+
+    synthetic = parser.add_argument_group("synthetic data (the dashboard's sidebar defaults)")
+    synthetic.add_argument("--n", type=int, default=30, help="points per set (default: 30)")
+    synthetic.add_argument("--intercept", type=float, default=1.0, help="true intercept (default: 1.0)")
+    synthetic.add_argument("--slope", type=float, default=1.0, help="true slope (default: 1.0)")
+    synthetic.add_argument("--train-noise", type=float, default=1.0, help="train set noise σ (default: 1.0)")
+    synthetic.add_argument("--test-noise", type=float, default=2.0, help="test set noise σ (default: 2.0)")
+
+    file = parser.add_argument_group("data file")
+    file.add_argument("--data", help="CSV, Parquet or .npy file to split instead of the synthetic data")
+    file.add_argument("--x-column", help="x column (default: the first)")
+    file.add_argument("--y-column", help="y column (default: the second)")
+    file.add_argument("--test-fraction", type=float, default=0.2, help="test set fraction (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        if args.data:
+            data = load_file(args.data, args.x_column, args.y_column, args.test_fraction, args.seed)
+        else:
+            data = load_synthetic(args.n, args.intercept, args.slope, args.train_noise, args.test_noise, args.seed)
+        loaded = time.perf_counter()
+        count = evaluate_file(args.candidates, args.output, data, args.a_column, args.b_column)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"Scored {count} candidates on {len(data[1])} train and {len(data[3])} test points "
+          f"in {time.perf_counter() - loaded:.2f} s (data loaded in {loaded - start:.2f} s); wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Vectorized binning for level-of-detail rendering of large datasets.
+
+Above a few tens of thousands of points a scatter plot is mostly
+overplotting and its rasterization cost grows with the number of points.
+These helpers aggregate the data onto a regular grid in fixed-size chunks,
+so the figure only ever draws one value per bin and memory stays bounded
+regardless of the dataset size.
+"""
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 20
+
+
+def _bin_index(values, lo, hi, bins):
+    # Regular bins over [lo, hi]; the upper edge belongs to the last bin
+    inside = (values >= lo) & (values <= hi)
+    index = np.floor((values - lo) * (bins / (hi - lo))).astype(np.intp)
+    np.clip(index, 0, bins - 1, out=index)
+    return index, inside
+
+
+def histogram2d(x, y, extent, bins):
+    """Count points on a ``bins`` x ``bins`` grid over ``extent = (x0, x1, y0, y1)``.
+
+    Rows are y bins and columns are x bins, matching ``imshow(origin='lower')``.
+    Points outside the extent are ignored.
+    """
+    x0, x1, y0, y1 = extent
+    counts = np.zeros(bins * bins, dtype=np.int64)
+    for start in range(0, len(x), CHUNK_SIZE):
+        ix, inside_x = _bin_index(x[start:start + CHUNK_SIZE], x0, x1, bins)
+        iy, inside_y = _bin_index(y[start:start + CHUNK_SIZE], y0, y1, bins)
+        inside = inside_x & inside_y
+        counts += np.bincount(iy[inside] * bins + ix[inside], minlength=bins * bins)
+    return counts.reshape(bins, bins)
+
+
+def binned_means(x, y, lo, hi, bins):
+    """Return the bin centers, the mean of y in each x bin and the bin counts.
+
+    Empty bins have a NaN mean.
+    """
+    counts = np.zeros(bins, dtype=np.int64)
+    sums = np.zeros(bins)
+    for start in range(0, len(x), CHUNK_SIZE):
+        ix, inside = _bin_index(x[start:start + CHUNK_SIZE], lo, hi, bins)
+        counts += np.bincount(ix[inside], minlength=bins)
+        sums += np.bincount(ix[inside], weights=y[start:start + CHUNK_SIZE][inside], minlength=bins)
+    edges = np.linspace(lo, hi, bins + 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    return centers, means, counts
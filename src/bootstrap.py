@@ -0,0 +1,174 @@
+"""Bootstrap confidence bands of the fitted line and intervals of its metrics.
+
+Each resample draws n points with replacement from the train set and refits
+the least-squares line on them. The resamples are drawn as index matrices,
+a batch of rows at a time, and every batch is reduced with row-wise array
+operations, so there is no Python loop over resamples. Every refitted line
+is scored on its own train resample and on a resample of the test set. The
+result only depends on the data and the seed, never on the sliders, so the
+app computes it once per dataset.
+
+The cost is capped at ``MAX_DRAWS`` drawn points. When ``resamples * n``
+exceeds it, each resample draws only m < n points (an m-out-of-n
+bootstrap), the same fraction of each set, and the spread of the refits
+around the fit on all the data is scaled by sqrt(m / n) to stand for
+resamples of size n.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+RESAMPLES = 1000
+
+# Values per batch of resamples; the resamples per batch shrink as n grows
+CHUNK_VALUES = 1 << 20
+
+# Points drawn over all resamples of the train set above which the resamples are drawn m out of n; about
+# a second of work
+MAX_DRAWS = 1 << 24
+
+
+def resample_indices(n, resamples, rng, size=None):
+    """Yield index matrices of ``resamples`` draws with replacement of ``size`` (default ``n``) of ``range(n)``.
+
+    The matrices hold a batch of resamples (rows) at a time.
+    """
+    size = n if size is None else size
+    rows = max(CHUNK_VALUES // max(size, 1), 1)
+    for start in range(0, resamples, rows):
+        yield rng.integers(0, n, size=(min(rows, resamples - start), size))
+
+
+def _centered_sums(u, v):
+    # Row-wise sum((u - mean(u)) * (v - mean(v))), overwriting neither input
+    return np.einsum("ij,ij->i", u - u.mean(axis=1, keepdims=True), v)
+
+
+def _metrics(x, y, target, intercept, slope):
+    # R², MAE and RMSE of one line per row of (x, y). The residuals are built in one buffer; the SST is
+    # taken over target, which differs from y when y are partial residuals
+    residuals = np.multiply(x, slope[:, np.newaxis])
+    residuals += intercept[:, np.newaxis]
+    np.subtract(y, residuals, out=residuals)
+    ssr = np.einsum("ij,ij->i", residuals, residuals)
+    mae = np.abs(residuals, out=residuals).mean(axis=1)
+    sst = _centered_sums(target, target)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Constant y: a perfect fit scores 1, anything else 0, as in src.metrics
+        r2 = np.where(sst > 0, 1 - ssr / sst, (ssr == 0).astype(float))
+    return r2, mae, np.sqrt(ssr / x.shape[1])
+
+
+def _gather(values, target, index):
+    # The resampled values and targets; the target is not gathered a second time when it is the values
+    gathered = np.asarray(values)[index]
+    return gathered, gathered if target is None or target is values else np.asarray(target)[index]
+
+
+@dataclass(frozen=True)
+class BootstrapFits:
+    """Intercepts and slopes refitted on bootstrap resamples, and the metrics of each refit.
+
+    ``train`` and ``test`` map "R-squared", "MAE" and "RMSE" to one value
+    per resample. ``size`` is the points drawn per train resample; when it
+    is below n, ``scale`` is sqrt(size / n) and ``center`` holds the fit on
+    all the data as ``(intercept, slope, train, test)``, around which the
+    percentiles are scaled.
+    """
+
+    intercept: np.ndarray
+    slope: np.ndarray
+    train: dict
+    test: dict
+    size: int = 0
+    scale: float = 1.0
+    center: tuple = None
+
+    def _rescale(self, percentiles, center):
+        # Shrink the spread of an m-out-of-n bootstrap around the full-data value to that of size n
+        return percentiles if self.center is None else center + self.scale * (percentiles - center)
+
+    def band(self, x, level=0.95):
+        """Return the lower and upper percentile band of the refitted lines at ``x``."""
+        x = np.asarray(x, dtype=float)
+        lines = self.intercept[:, np.newaxis] + self.slope[:, np.newaxis] * x
+        tail = (1 - level) / 2 * 100
+        center = None if self.center is None else self.center[0] + self.center[1] * x
+        return self._rescale(np.percentile(lines, [tail, 100 - tail], axis=0), center)
+
+    def intervals(self, split, level=0.95):
+        """Return ``{metric: (lower, upper)}`` percentile intervals of the metrics on ``split`` ("train" or "test")."""
+        tail = (1 - level) / 2 * 100
+        centers = None if self.center is None else self.center[2 if split == "train" else 3]
+        return {name: tuple(self._rescale(np.percentile(values, [tail, 100 - tail]), centers and centers[name]))
+                for name, values in getattr(self, split).items()}
+
+
+def _fit(x, y):
+    # Least-squares intercepts and slopes of each row of (x, y)
+    sxx = _centered_sums(x, x)
+    sxy = _centered_sums(x, y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+    return y.mean(axis=1) - slope * x.mean(axis=1), slope
+
+
+def bootstrap_fits(train_x, train_y, test_x, test_y, resamples=RESAMPLES, seed=0, train_target=None, test_target=None,
+                   max_draws=MAX_DRAWS):
+    """Refit the line ``a + b * x`` on ``resamples`` bootstrap resamples of the train set.
+
+    ``train_target`` and ``test_target`` are the values whose spread the
+    R² is relative to, if not y itself; with other predictors held fixed, y
+    are the partial residuals and the targets the full response. When
+    ``resamples * len(train_x)`` exceeds ``max_draws``, the resamples are
+    drawn m out of n.
+    """
+    train_rng, test_rng = (np.random.default_rng(stream) for stream in np.random.SeedSequence(seed).spawn(2))
+    intercepts, slopes, train_metrics, test_metrics = [], [], [], []
+    fraction = min(1.0, max_draws / (resamples * max(len(train_x), 1)))
+    train_size = max(round(len(train_x) * fraction), 2)
+    test_size = max(round(len(test_x) * fraction), 1)
+
+    for index in resample_indices(len(train_x), resamples, train_rng, train_size):
+        x = np.asarray(train_x)[index]
+        y, target = _gather(train_y, train_target, index)
+        intercept, slope = _fit(x, y)
+        intercepts.append(intercept)
+        slopes.append(slope)
+        train_metrics.append(_metrics(x, y, target, intercept, slope))
+    intercept = np.concatenate(intercepts)
+    slope = np.concatenate(slopes)
+
+    # Score the refits on resamples of the test set, in batches sized for the test set
+    start = 0
+    for index in resample_indices(len(test_x), resamples, test_rng, test_size):
+        stop = start + len(index)
+        y, target = _gather(test_y, test_target, index)
+        test_metrics.append(_metrics(np.asarray(test_x)[index], y, target, intercept[start:stop], slope[start:stop]))
+        start = stop
+
+    names = ("R-squared", "MAE", "RMSE")
+    center = None
+    if train_size < len(train_x):
+        # The fit on all the data and its metrics, around which the m-out-of-n spread is scaled
+        def full(values):
+            return np.asarray(values, dtype=float)[np.newaxis, :]
+
+        x, y = full(train_x), full(train_y)
+        train_all = y if train_target is None else full(train_target)
+        test_all = full(test_y) if test_target is None else full(test_target)
+        full_intercept, full_slope = _fit(x, y)
+        center = (float(full_intercept[0]), float(full_slope[0]),
+                  dict(zip(names, (float(value[0]) for value in _metrics(x, y, train_all, full_intercept, full_slope)))),
+                  dict(zip(names, (float(value[0]) for value in _metrics(full(test_x), full(test_y), test_all,
+                                                                         full_intercept, full_slope)))))
+    return BootstrapFits(
+        intercept=intercept,
+        slope=slope,
+        train={name: np.concatenate(values) for name, values in zip(names, zip(*train_metrics))},
+        test={name: np.concatenate(values) for name, values in zip(names, zip(*test_metrics))},
+        size=train_size,
+        scale=float(np.sqrt(train_size / len(train_x))),
+        center=center,
+    )
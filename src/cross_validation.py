@@ -0,0 +1,129 @@
+"""k-fold and leave-one-out cross-validation from per-fold sufficient statistics.
+
+Every row is assigned to one of k folds and a single chunked pass adds up
+each fold's count and sums of x, y and their products with ``np.bincount``.
+The training part of a fold is everything else, so its sums are the
+dataset totals minus the fold's own; no fold is ever refitted from the raw
+arrays. SSR of any line on a held-out fold, and the least-squares line of
+each training part, then follow in closed form as in
+:mod:`src.sufficient_stats`. Leave-one-out is the case k = n and costs the
+same single pass, but its statistics hold a few hundred bytes per row, so
+it is limited to ``MAX_LEAVE_ONE_OUT`` rows.
+
+The sums are taken around the first x and y values, as in
+:mod:`src.metrics`, which keeps them from cancelling catastrophically when
+the data is far from the origin.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.sufficient_stats import SufficientStats
+
+# Rows per chunk of the pass over the data
+CHUNK_SIZE = 1 << 16
+
+# Rows above which leave-one-out is refused: its per-fold statistics take about 250 bytes per row, some
+# 64 MB at this size
+MAX_LEAVE_ONE_OUT = 1 << 18
+
+
+def _moments(count, sum_x, sum_y, sum_xx, sum_xy, sum_yy, shift_x, shift_y):
+    # Centered moments from sums of shifted values; the arrays hold one entry per fold
+    return SufficientStats(
+        n=count,
+        mean_x=shift_x + sum_x / count,
+        mean_y=shift_y + sum_y / count,
+        sxx=np.maximum(sum_xx - sum_x**2 / count, 0.0),
+        sxy=sum_xy - sum_x * sum_y / count,
+        syy=np.maximum(sum_yy - sum_y**2 / count, 0.0),
+    )
+
+
+@dataclass(frozen=True)
+class FoldStats:
+    """Sufficient statistics of each held-out fold and of its training part.
+
+    The fields of ``held_out`` and ``training`` are arrays with one entry
+    per fold. ``sst`` is the total sum of squares of the target in each
+    held-out fold and ``total_sst`` that of the whole dataset.
+    """
+
+    held_out: SufficientStats
+    training: SufficientStats
+    sst: np.ndarray
+    total_sst: float
+
+    @property
+    def folds(self):
+        return len(self.sst)
+
+    def ols(self):
+        """Return the least-squares intercepts and slopes ``(a, b)`` fitted on each training part."""
+        training = self.training
+        with np.errstate(divide="ignore", invalid="ignore"):
+            b = np.where(training.sxx > 0, training.sxy / training.sxx, 0.0)
+        return training.mean_y - b * training.mean_x, b
+
+    def scores(self, a, b):
+        """Return ``{"SSR", "RMSE", "R-squared"}`` arrays of the line ``a + b * x`` on each held-out fold.
+
+        ``a`` and ``b`` are scalars or arrays with one entry per fold. R² is
+        NaN for folds whose target is constant, e.g. every leave-one-out fold.
+        """
+        ssr = self.held_out.ssr(a, b)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r2 = np.where(self.sst > 0, 1 - ssr / self.sst, np.nan)
+        return {"SSR": ssr, "RMSE": np.sqrt(ssr / self.held_out.n), "R-squared": r2}
+
+    def pooled(self, a, b):
+        """Return the SSR, RMSE and R² of the predictions of all held-out folds taken together."""
+        ssr = float(np.sum(self.held_out.ssr(a, b)))
+        n = int(np.sum(self.held_out.n))
+        r2 = 1 - ssr / self.total_sst if self.total_sst > 0 else float("nan")
+        return {"SSR": ssr, "RMSE": float(np.sqrt(ssr / n)), "R-squared": r2}
+
+
+def fold_stats(x, y, folds, seed=0, target=None, chunk_size=CHUNK_SIZE):
+    """Assign the rows of ``(x, y)`` to ``folds`` random folds of (almost) equal size and return their :class:`FoldStats`.
+
+    ``folds`` equal to ``len(y)`` is leave-one-out. ``target`` is the
+    response whose spread the R² is relative to, if not y itself; with other
+    predictors held fixed, y are the partial residuals and the target the
+    full response. Raises ValueError for more than ``MAX_LEAVE_ONE_OUT``
+    folds.
+    """
+    n = len(y)
+    if not 2 <= folds <= n:
+        raise ValueError(f"folds must be between 2 and the number of rows ({n}), got {folds}")
+    if folds > MAX_LEAVE_ONE_OUT:
+        raise ValueError(f"at most {MAX_LEAVE_ONE_OUT:,} folds are supported, got {folds:,}")
+    fold = np.random.default_rng(seed).permutation(n) % folds
+    target = y if target is None else target
+    shift_x, shift_y, shift_target = float(x[0]), float(y[0]), float(target[0])
+
+    # count, x, y, xx, xy, yy, target, target². Every chunk's bincounts are as long as there are folds,
+    # so the chunks are made at least that long; leave-one-out is then a single chunk
+    sums = np.zeros((8, folds))
+    chunk_size = max(chunk_size, folds)
+    for start in range(0, n, chunk_size):
+        stop = start + chunk_size
+        chunk_fold = fold[start:stop]
+        dx = np.asarray(x[start:stop], dtype=float) - shift_x
+        dy = np.asarray(y[start:stop], dtype=float) - shift_y
+        dt = dy if target is y else np.asarray(target[start:stop], dtype=float) - shift_target
+        sums[0] += np.bincount(chunk_fold, minlength=folds)
+        for row, weights in enumerate((dx, dy, dx * dx, dx * dy, dy * dy, dt, dt * dt), start=1):
+            sums[row] += np.bincount(chunk_fold, weights=weights, minlength=folds)
+
+    totals = sums.sum(axis=1, keepdims=True)
+    held_out = _moments(*sums[:6], shift_x, shift_y)
+    training = _moments(*(totals - sums)[:6], shift_x, shift_y)
+    count, sum_target, sum_target2 = sums[0], sums[6], sums[7]
+    return FoldStats(
+        held_out=held_out,
+        training=training,
+        sst=np.maximum(sum_target2 - sum_target**2 / count, 0.0),
+        total_sst=max(float(totals[7, 0] - totals[6, 0]**2 / n), 0.0),
+    )
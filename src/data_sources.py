@@ -0,0 +1,282 @@
+"""Load regression data from CSV, Parquet or .npy files.
+
+A file is converted once into one contiguous float64 file per numeric
+column. Every later rerun and every session opens those columns as
+read-only memory maps, so the data is paged in by the operating system on
+demand instead of being parsed or copied into each process. Train/test
+splits are materialized the same way, and so are columns derived from
+them, such as partial residuals, which would otherwise be held in memory
+whole.
+
+Conversions are stored under ``DATA_CACHE_DIR`` (overridable with the
+``DASHBOARD_DATA_CACHE`` environment variable), keyed by a hash of the
+file contents, so re-uploading the same file reuses the columns. Every
+entry is touched when it is used, and :func:`evict` deletes the least
+recently used entries once the cache exceeds ``DATA_CACHE_BYTES``
+(``DASHBOARD_DATA_CACHE_MB``, default 2048).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+DATA_CACHE_DIR = Path(os.environ.get("DASHBOARD_DATA_CACHE", Path(tempfile.gettempdir()) / "linear_regression_dashboard"))
+
+# Directory the dashboard may open data files from by path, from DASHBOARD_DATA_DIR; unset, no path is opened
+DATA_DIR = os.environ.get("DASHBOARD_DATA_DIR")
+
+# Size of the data cache above which the least recently used entries are deleted
+DATA_CACHE_BYTES = int(float(os.environ.get("DASHBOARD_DATA_CACHE_MB", 2048)) * 1024**2)
+
+# Kinds of entries in the cache, one directory each
+CACHE_KINDS = ("columns", "splits", "derived", "metrics_index")
+
+SUPPORTED_SUFFIXES = (".csv", ".parquet", ".npy")
+
+CHUNK_ROWS = 1 << 20
+
+
+def content_key(source):
+    """Return a hex digest of a file path's or a bytes object's contents."""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        with open(source, "rb") as file:
+            for block in iter(lambda: file.read(1 << 24), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def resolve_data_path(name, data_dir=DATA_DIR):
+    """Return the path of the data file ``name`` inside ``data_dir``.
+
+    Raises ValueError if no data directory is configured or the path
+    leads outside it, e.g. through ``..`` or a symbolic link.
+    """
+    if not data_dir:
+        raise ValueError("No data directory is configured (DASHBOARD_DATA_DIR)")
+    root = Path(data_dir).resolve()
+    path = (root / name).resolve()
+    if not path.is_relative_to(root):
+        raise ValueError(f"{name} is outside the data directory")
+    return path
+
+
+def _directory_bytes(directory):
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def touch(directory):
+    """Mark a cache entry as used just now, so :func:`evict` deletes it last."""
+    try:
+        os.utime(directory)
+    except OSError:
+        pass
+
+
+def evict(cache_dir=DATA_CACHE_DIR, max_bytes=DATA_CACHE_BYTES, keep=()):
+    """Delete the least recently used cache entries until the cache holds at most ``max_bytes``.
+
+    The directories in ``keep`` and entries changed in the last minute,
+    which another process may still be writing, are never deleted. Entries
+    that are still memory-mapped stay readable by the processes that have
+    them open. Returns the number of entries deleted.
+    """
+    keep = {Path(directory).resolve() for directory in keep}
+    entries = []
+    for kind in CACHE_KINDS:
+        root = Path(cache_dir) / kind
+        if root.is_dir():
+            entries += [(entry.stat().st_mtime, entry, _directory_bytes(entry)) for entry in root.iterdir()
+                        if entry.is_dir() and not entry.name.startswith("tmp")]
+    total = sum(nbytes for _, _, nbytes in entries)
+    deleted = 0
+    for _, entry, nbytes in sorted(entries, key=lambda item: item[0]):
+        if total <= max_bytes:
+            break
+        if entry.resolve() in keep or time.time() - entry.stat().st_mtime < 60:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= nbytes
+        deleted += 1
+    return deleted
+
+
+def remove_stale_scratch(cache_dir=DATA_CACHE_DIR, max_age=3600):
+    """Delete scratch directories older than ``max_age`` seconds, left behind by processes that exited mid-write."""
+    for kind in CACHE_KINDS:
+        root = Path(cache_dir) / kind
+        if root.is_dir():
+            for entry in root.glob("tmp*"):
+                if entry.is_dir() and time.time() - entry.stat().st_mtime > max_age:
+                    shutil.rmtree(entry, ignore_errors=True)
+
+
+def _csv_chunks(file):
+    import pandas as pd
+
+    for frame in pd.read_csv(file, chunksize=CHUNK_ROWS):
+        yield {name: frame[name].to_numpy() for name in frame.columns}
+
+
+def _parquet_chunks(file):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(file).iter_batches(batch_size=CHUNK_ROWS):
+        yield {name: column.to_numpy(zero_copy_only=False) for name, column in zip(batch.schema.names, batch.columns)}
+
+
+def _npy_chunks(file):
+    array = np.load(file, mmap_mode="r") if isinstance(file, (str, Path)) else np.load(file)
+    if array.dtype.names:
+        columns = {name: array[name] for name in array.dtype.names}
+    elif array.ndim == 1:
+        columns = {"value": array}
+    elif array.ndim == 2:
+        columns = {f"column_{i}": array[:, i] for i in range(array.shape[1])}
+    else:
+        raise ValueError(f"Expected a 1-D, 2-D or structured array, got shape {array.shape}")
+    length = len(next(iter(columns.values())))
+    for start in range(0, length, CHUNK_ROWS):
+        yield {name: column[start:start + CHUNK_ROWS] for name, column in columns.items()}
+
+
+def _numeric(values):
+    # Non-numeric entries become NaN; columns with no numeric entry at all are dropped by the caller
+    if values.dtype.kind in "biuf":
+        return values.astype(np.float64, copy=False)
+    import pandas as pd
+
+    return pd.to_numeric(values, errors="coerce").astype(np.float64)
+
+
+def _open_columns(directory):
+    meta = json.loads((directory / "columns.json").read_text())
+    if not meta["rows"]:
+        return {name: np.empty(0) for name in meta["columns"]}
+    return {
+        name: np.memmap(directory / f"{index}.f64", dtype=np.float64, mode="r", shape=(meta["rows"],))
+        for name, index in zip(meta["columns"], meta["files"])
+    }
+
+
+def _write_columns(directory, chunks):
+    # Write into a scratch directory first so a crash never leaves a half-converted cache entry behind
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    scratch = Path(tempfile.mkdtemp(dir=directory.parent))
+    try:
+        names, files, numeric, rows = [], [], [], 0
+        for chunk in chunks:
+            if not files:
+                names = list(chunk)
+                files = [open(scratch / f"{index}.f64", "wb") for index in range(len(names))]
+                numeric = [False] * len(names)
+            for index, name in enumerate(names):
+                values = np.ascontiguousarray(_numeric(np.asarray(chunk[name])), dtype="<f8")
+                numeric[index] |= bool(len(values)) and not np.isnan(values).all()
+                files[index].write(values.tobytes())
+            rows += len(chunk[names[0]]) if names else 0
+        for file in files:
+            file.close()
+
+        # Keep only columns with at least one numeric value
+        kept = [index for index, is_numeric in enumerate(numeric) if is_numeric or not rows]
+        for index in set(range(len(names))) - set(kept):
+            (scratch / f"{index}.f64").unlink()
+        meta = {"columns": [names[index] for index in kept], "files": kept, "rows": rows}
+        (scratch / "columns.json").write_text(json.dumps(meta))
+
+        try:
+            scratch.rename(directory)
+        except OSError:
+            # Another session finished the same conversion first
+            shutil.rmtree(scratch)
+    except BaseException:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+
+
+def load_columns(source, name, key=None, cache_dir=DATA_CACHE_DIR):
+    """Convert a data file into float64 columns once and return them as read-only memory maps.
+
+    ``source`` is a path or the raw bytes of an uploaded file and ``name``
+    its file name, whose suffix selects the format. ``key`` identifies the
+    contents and defaults to :func:`content_key` of the source. Returns a
+    dict mapping column names to 1-D arrays; non-numeric entries are NaN.
+    """
+    suffix = Path(name).suffix.lower()
+    if suffix not in SUPPORTED_SUFFIXES:
+        raise ValueError(f"Unsupported file type {suffix!r}, expected one of {', '.join(SUPPORTED_SUFFIXES)}")
+
+    directory = Path(cache_dir) / "columns" / (key or content_key(source))
+    if not (directory / "columns.json").exists():
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            import io
+
+            source = io.BytesIO(source)
+        chunks = {".csv": _csv_chunks, ".parquet": _parquet_chunks, ".npy": _npy_chunks}[suffix](source)
+        _write_columns(directory, chunks)
+        evict(cache_dir, keep=[directory])
+    touch(directory)
+    return _open_columns(directory)
+
+
+def split_train_test(x, y, test_fraction, seed, key, cache_dir=DATA_CACHE_DIR):
+    """Randomly split paired columns into train and test sets stored as memory maps.
+
+    ``x`` is one column or a list of predictor columns. Rows with a NaN in
+    any of them or in y are dropped. The split is materialized once per
+    ``key`` (which must identify x, y, ``test_fraction`` and ``seed``) and
+    returned as ``(train_x, train_y, test_x, test_y)``, where the x parts
+    are lists of columns if ``x`` was a list.
+    """
+    columns = list(x) if isinstance(x, (list, tuple)) else [x]
+    names = [f"x{index}" for index in range(len(columns))]
+    directory = Path(cache_dir) / "splits" / key
+    if not (directory / "columns.json").exists():
+        def chunks(part):
+            # Both parts draw the same random numbers from the seed, so they partition the rows
+            rng = np.random.default_rng(seed)
+            for start in range(0, len(y), CHUNK_ROWS):
+                x_chunks = [np.asarray(column[start:start + CHUNK_ROWS]) for column in columns]
+                y_chunk = np.asarray(y[start:start + CHUNK_ROWS])
+                is_test = rng.random(len(y_chunk)) < test_fraction
+                rows = (is_test if part == "test" else ~is_test) & ~np.isnan(y_chunk)
+                for x_chunk in x_chunks:
+                    rows &= ~np.isnan(x_chunk)
+                yield {**{name: x_chunk[rows] for name, x_chunk in zip(names, x_chunks)}, "y": y_chunk[rows]}
+
+        # Each split is written as columns of its own
+        for part in ("train", "test"):
+            _write_columns(directory / part, chunks(part))
+        (directory / "columns.json").write_text(json.dumps({"columns": [], "files": [], "rows": 0}))
+        evict(cache_dir, keep=[directory])
+    touch(directory)
+
+    split = []
+    for part in ("train", "test"):
+        opened = _open_columns(directory / part)
+        part_x = [opened.get(name, np.empty(0)) for name in names]
+        split += [part_x if isinstance(x, (list, tuple)) else part_x[0], opened.get("y", np.empty(0))]
+    return tuple(split)
+
+
+def store_columns(chunks, key, cache_dir=DATA_CACHE_DIR):
+    """Write the columns computed by ``chunks`` once per ``key`` and return them as read-only memory maps.
+
+    ``chunks`` is an iterable of dicts mapping column names to consecutive
+    1-D chunks; it is only consumed when nothing is stored for ``key`` yet.
+    """
+    directory = Path(cache_dir) / "derived" / key
+    if not (directory / "columns.json").exists():
+        _write_columns(directory, chunks)
+        evict(cache_dir, keep=[directory])
+    touch(directory)
+    return _open_columns(directory)
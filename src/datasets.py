@@ -0,0 +1,53 @@
+"""Synthetic train and test sets for the dashboard.
+
+Both sets are drawn around the same true model from independent
+``np.random.Generator`` streams spawned from one seed, so generating them
+never touches NumPy's global random state and the test noise does not
+depend on the size of the train set. The predictors have streams of their
+own, so the design only depends on n, the number of predictors and the
+seed, and can be reused while the true coefficients or the noise change.
+"""
+
+import numpy as np
+
+
+def train_test_streams(seed):
+    """Return the generators ``(train_noise, test_noise, train_design, test_design)`` spawned from ``seed``."""
+    return tuple(np.random.default_rng(stream) for stream in np.random.SeedSequence(seed).spawn(4))
+
+
+def generate_design(n, predictors, rng, x_range=(-8, 8)):
+    """Return ``predictors`` read-only columns of ``n`` values over ``x_range``.
+
+    The first column is evenly spaced; the others are drawn uniformly from ``rng``.
+    """
+    columns = [np.linspace(*x_range, n)]
+    columns += [rng.uniform(*x_range, n) for _ in range(predictors - 1)]
+    for column in columns:
+        column.setflags(write=False)
+    return columns
+
+
+def generate_target(columns, intercept, slope, noise, rng):
+    """Return y = intercept + slope * sum(columns) + N(0, noise²) as a read-only array."""
+    # Build y in place to avoid full-size temporaries for large n
+    y = rng.standard_normal(len(columns[0]))
+    y *= noise
+    for column in columns:
+        y += slope * column
+    y += intercept
+    y.setflags(write=False)
+    return y
+
+
+def generate_train_test(n, intercept, slope, train_noise, test_noise, seed, predictors=1):
+    """Return ``(train_columns, train_y, test_columns, test_y)`` drawn from independent streams of ``seed``.
+
+    Every one of the ``predictors`` columns has the true coefficient ``slope``.
+    """
+    train_rng, test_rng, train_design_rng, test_design_rng = train_test_streams(seed)
+    train_columns = generate_design(n, predictors, train_design_rng)
+    test_columns = generate_design(n, predictors, test_design_rng)
+    train_y = generate_target(train_columns, intercept, slope, train_noise, train_rng)
+    test_y = generate_target(test_columns, intercept, slope, test_noise, test_rng)
+    return train_columns, train_y, test_columns, test_y
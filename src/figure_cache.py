@@ -0,0 +1,157 @@
+"""Bounded LRU caches for rendered figure bytes and for built panels.
+
+Rendering a matplotlib figure dominates the cost of a rerun, and users tend
+to revisit the same slider positions while dragging back and forth. The
+cache maps a panel key (panel name, slider values, the toggles that affect
+that panel and a dataset fingerprint) to the encoded image, so a hit skips
+matplotlib entirely. The same cache can hold other immutable artifacts
+sized by a function of their own, such as MAE curves.
+
+Building a panel draws its static layers, which only depend on the data
+and the toggles. :class:`PanelCache` keeps one built panel per such key for
+the whole server, so sessions looking at the same data share the figure
+and its layers instead of each building a copy.
+
+Both caches drop their least recently used entries once they hold more
+than their limits, in entries and, for :class:`FigureCache`, in bytes.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def dataset_fingerprint(*arrays):
+    """Return a short hex digest identifying the contents of the given arrays."""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype, array.shape)).encode())
+        digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Least-recently-used cache of encoded figures capped by entries and bytes.
+
+    ``sizeof`` returns the bytes of a cached value; the default suits bytes.
+    """
+
+    def __init__(self, max_bytes=64 * 1024**2, max_entries=512, sizeof=len):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached bytes for ``key`` or None, updating the counters."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        """Store ``data`` under ``key``, evicting the oldest entries to stay within the caps."""
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self.sizeof(self._entries.pop(key))
+            # Entries larger than the whole budget are never kept
+            size = self.sizeof(data)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = data
+            self.nbytes += size
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= self.sizeof(evicted)
+                self.evictions += 1
+
+    def get_or_render(self, key, render):
+        """Return the cached bytes for ``key``, calling ``render()`` to produce them on a miss."""
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def values(self):
+        """Return the cached values, least recently used first."""
+        with self._lock:
+            return list(self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+            }
+
+
+class PanelCache:
+    """Least-recently-used cache of built panels, each with the lock that serializes its renders.
+
+    A render moves the panel's artists before rasterizing the figure, so
+    renders of one panel take its lock; different panels render
+    concurrently.
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_build(self, key, build):
+        """Return ``(lock, panel)`` for ``key``, calling ``build()`` to create the panel on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        # Built outside the lock so other panels are served meanwhile; if two sessions build the same
+        # panel at once, the first one stored is kept
+        panel = build()
+        with self._lock:
+            self.builds += 1
+            entry = self._entries.setdefault(key, (threading.Lock(), panel))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return entry
+
+    def panels(self):
+        """Return the cached panels, most recently used last."""
+        with self._lock:
+            return [panel for _, panel in self._entries.values()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
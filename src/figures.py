@@ -0,0 +1,435 @@
+"""Matplotlib figures of the dashboard panels.
+
+Every panel is a class that builds its figure and the layers that do not
+depend on the sliders once, and whose ``update(a, b)`` only moves the
+artists that do. :func:`render_image` encodes a panel for one (a, b) as
+PNG, WebP or SVG. The static data layers (points, densities, bands and the
+SSR surface image) are marked rasterized, so an SVG embeds them as images
+while the moving line, markers and labels stay vector. matplotlib
+rasterizes those layers again on every save, so panels whose axes never
+change list their ``moving`` artists instead: for PNG and WebP the layers
+drawn below them are rasterized once per resolution and kept as the
+panel's background, and each render draws only the rest on top of it. The data a panel
+draws comes in a :class:`PlotData`, so the figures can be built, reused and
+benchmarked without a Streamlit server. The figures are created with
+``Figure`` directly and never touch pyplot's global state, so
+different panels can be rendered from different threads.
+"""
+
+import io
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any
+
+import numpy as np
+from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from PIL import Image
+
+from src.binning import binned_means, histogram2d
+from src.mae_curve import MAECurve
+
+# Datasets larger than the density threshold are drawn as binned density on this many bins per axis
+DENSITY_BINS = 200
+
+# Number of x bins whose mean y stands in for the individual residuals in density mode
+RESIDUAL_BINS = 40
+
+
+# Samples of the SSR and MAE curves over the slider domain
+CURVE_POINTS = 100
+
+# Samples per axis of the SSR surface
+SURFACE_POINTS = 500
+
+# Size of every panel's figure in inches
+FIGURE_SIZE = (8, 6)
+
+# Formats render_image encodes to, and the extra savefig options of each; WebP is lossless, which keeps
+# lines and text sharp and is still smaller than PNG
+IMAGE_FORMATS = {
+    "png": {},
+    "webp": {"pil_kwargs": {"lossless": True}},
+    "svg": {},
+}
+
+
+@dataclass(frozen=True)
+class PlotData:
+    """The train and test sets the panels draw, with what is derived from them once per dataset.
+
+    ``stats`` are the :class:`~src.sufficient_stats.SufficientStats` of the
+    train set and ``bootstrap`` the optional
+    :class:`~src.bootstrap.BootstrapFits` behind the main plot's band.
+    ``mae_curves`` optionally returns the :class:`~src.mae_curve.MAECurve`
+    of the train set for an intercept, e.g. from a cache shared with other
+    panels; by default every panel sorts its own. ``index`` is an optional
+    :class:`~src.metrics_index.MetricsIndex` of the data, whose rows and
+    columns are used as the loss curves for (a, b) on the slider lattice.
+    """
+
+    train_x: Any
+    train_y: Any
+    test_x: Any
+    test_y: Any
+    stats: Any
+    train_description: str = ""
+    test_description: str = ""
+    bootstrap: Any = None
+    mae_curves: Any = None
+    index: Any = None
+
+    def ssr_vs_b(self, a, b_values):
+        """Return ``(b, SSR)`` of the train set for the intercept ``a``: a row of the index, or at ``b_values``."""
+        curve = self.index.ssr_vs_b(a) if self.index is not None else None
+        return curve if curve is not None else (b_values, self.stats.ssr(a, b_values))
+
+    def ssr_vs_a(self, b, a_values):
+        """Return ``(a, SSR)`` of the train set for the slope ``b``: a column of the index, or at ``a_values``."""
+        curve = self.index.ssr_vs_a(b) if self.index is not None else None
+        return curve if curve is not None else (a_values, self.stats.ssr(a_values, b))
+
+    def mae_curve(self, a):
+        """Return the MAE vs. slope curve of the train set for the intercept ``a``.
+
+        The curve is a row of the index when it has one, otherwise the exact
+        :class:`~src.mae_curve.MAECurve`.
+        """
+        curve = self.index.mae_curve(a) if self.index is not None else None
+        if curve is not None:
+            return curve
+        if self.mae_curves is not None:
+            return self.mae_curves(a)
+        return MAECurve(self.train_x, self.train_y, a)
+
+
+class MainPlot:
+    # The regression line over the data; the toggles decide which static layers are drawn
+
+    def __init__(self, data, show_data_points, show_ssr, show_test_set, density_threshold, bootstrap_resamples=0):
+        self.stats = data.stats
+        self.show_ssr = show_ssr
+        self.figure = Figure(figsize=FIGURE_SIZE)
+        self.ax = ax = self.figure.subplots()
+        self.background = None
+
+        # Generate x values for the line
+        self.line_x = np.linspace(-10, 10, 100)
+
+        # Shade the bootstrap band of the least-squares line; it does not depend on the sliders
+        if bootstrap_resamples:
+            ax.fill_between(self.line_x, *data.bootstrap.band(self.line_x), color='blue', alpha=0.15, linewidth=0,
+                            label=f'95% Bootstrap Band of the OLS Line ({bootstrap_resamples} resamples)',
+                            rasterized=True)
+
+        # Plot the line (its y values are set in update)
+        self.line, = ax.plot(self.line_x, np.zeros_like(self.line_x), 'b-', linewidth=2, label='Interactive Line')
+
+        # Plot the scatter points only if the checkbox is checked
+        self.residuals = None
+        if show_data_points:
+            train_x, train_y, train_description = data.train_x, data.train_y, data.train_description
+            if len(train_x) > density_threshold:
+                # Too many points to scatter: draw the binned density of the train set instead
+                self.draw_density(train_x, train_y, 'Reds', 'red', f'Train Set Density ({train_description})')
+
+                # Summarize the residuals by the mean y of each x bin
+                if show_ssr:
+                    bin_x, bin_means, _ = binned_means(train_x, train_y, -10, 10, RESIDUAL_BINS)
+                    ax.plot(bin_x, bin_means, 'o', color='darkgreen', markersize=4, label='Train Set Bin Means',
+                            rasterized=True)
+                    self.draw_residuals(bin_x, bin_means)
+            else:
+                ax.scatter(train_x, train_y, color='red', alpha=0.7, label=f'Train Set Points ({train_description})',
+                           rasterized=True)
+
+                # Plot residuals as vertical lines if SSR is being shown
+                if show_ssr:
+                    self.draw_residuals(train_x, train_y)
+
+        # Plot the test set points only if the checkbox is checked
+        if show_test_set:
+            test_x, test_y, test_description = data.test_x, data.test_y, data.test_description
+            if len(test_x) > density_threshold:
+                self.draw_density(test_x, test_y, 'Purples', 'purple', f'Test Set Density ({test_description})')
+            else:
+                ax.scatter(test_x, test_y, color='purple', alpha=0.7, label=f'Test Set Points ({test_description})',
+                           rasterized=True)
+
+        # Add gridlines
+        ax.grid(True, linestyle='--', alpha=0.7)
+
+        # Set fixed axis limits
+        ax.set_xlim(-10, 10)
+        ax.set_ylim(-10, 10)
+
+        # Add the x and y axes
+        ax.axhline(y=0, color='k', linestyle='-', alpha=0.3)
+        ax.axvline(x=0, color='k', linestyle='-', alpha=0.3)
+
+        # Add a legend
+        ax.legend()
+
+        # The axis limits are fixed, so everything drawn below the line is a background that never changes
+        self.moving = [artist for artist in (self.line, self.residuals, ax.title) if artist is not None]
+
+    def draw_density(self, x, y, cmap, color, label):
+        # Count the points per bin in one vectorized pass; the image cost depends on the bins, not the points
+        counts = histogram2d(x, y, (-10, 10, -10, 10), DENSITY_BINS)
+        if counts.any():
+            self.ax.imshow(np.ma.masked_equal(counts, 0), extent=(-10, 10, -10, 10), origin='lower', aspect='auto',
+                           cmap=cmap, norm=LogNorm(), alpha=0.8, interpolation='nearest', rasterized=True)
+
+        # Images have no legend entry, so add an empty marker of the same color
+        self.ax.scatter([], [], color=color, marker='s', alpha=0.7, label=label)
+
+    def draw_residuals(self, x, y):
+        # All residuals are drawn as a single line with a NaN gap after each (x, y) -> (x, predicted y)
+        # segment, so no per-point artists are created
+        self.residual_source_x = x
+        residual_x = np.repeat(x[:, np.newaxis], 3, axis=1)
+        residual_x[:, 2] = np.nan
+        self.residual_y = np.full_like(residual_x, np.nan)
+        self.residual_y[:, 0] = y
+        self.residuals, = self.ax.plot(residual_x.ravel(), self.residual_y.ravel(), 'g-', alpha=0.5)
+
+    def update(self, a, b):
+        # Calculate y values based on the linear equation
+        self.line.set_ydata(a + b * self.line_x)
+
+        # Move the lower end of each residual onto the line
+        if self.residuals is not None:
+            np.add(a, b * self.residual_source_x, out=self.residual_y[:, 1])
+            self.residuals.set_ydata(self.residual_y.ravel())
+
+        # Add labels and title
+        plot_title = f'Linear Equation: y = {a:.1f} + {b:.1f}x'
+        if self.show_ssr:
+            plot_title += f' with SSR = {float(self.stats.ssr(a, b)):.2f}'
+        self.ax.set_title(plot_title)
+
+
+class SSRvsBPlot:
+    # SSR as a function of b for the current a
+
+    def __init__(self, data, resolution=CURVE_POINTS):
+        self.data = data
+        self.stats = data.stats
+        self.figure = Figure(figsize=FIGURE_SIZE)
+        self.ax = ax = self.figure.subplots()
+        self.b_range = np.linspace(-10, 10, resolution)
+
+        # Create the SSR vs. b plot (its values are set in update)
+        self.curve, = ax.plot(self.b_range, np.zeros_like(self.b_range), 'r-', linewidth=2)
+
+        # Highlight the current b value
+        self.current_line = ax.axvline(x=0, color='g', linestyle='--', label='Current b')
+        self.marker, = ax.plot([0], [0], 'go', markersize=8)
+
+        # Add gridlines
+        ax.grid(True, linestyle='--', alpha=0.7)
+
+        # Add labels and title
+        ax.set_xlabel('Parameter b (slope)')
+        ax.set_ylabel('Sum of Squared Residuals (SSR)')
+        ax.set_title('SSR vs. Parameter b (with fixed a)')
+
+        # Add a legend
+        self.legend = ax.legend()
+
+    def update(self, a, b):
+        # Read SSR for different values of b from the index, or calculate it in closed form
+        self.curve.set_data(*self.data.ssr_vs_b(a, self.b_range))
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+        # Move the highlight to the current b value
+        self.current_line.set_xdata([b, b])
+        self.marker.set_data([b], [self.stats.ssr(a, b)])
+        self.legend.get_texts()[0].set_text(f'Current b = {b:.1f}')
+
+
+class SSRvsAPlot:
+    # SSR as a function of a for the current b
+
+    def __init__(self, data, resolution=CURVE_POINTS):
+        self.data = data
+        self.stats = data.stats
+        self.figure = Figure(figsize=FIGURE_SIZE)
+        self.ax = ax = self.figure.subplots()
+        self.a_range = np.linspace(-10, 10, resolution)
+
+        # Create the SSR vs. a plot (its values are set in update)
+        self.curve, = ax.plot(self.a_range, np.zeros_like(self.a_range), 'b-', linewidth=2)
+
+        # Highlight the current a value
+        self.current_line = ax.axvline(x=0, color='r', linestyle='--', label='Current a')
+        self.marker, = ax.plot([0], [0], 'ro', markersize=8)
+
+        # Add gridlines
+        ax.grid(True, linestyle='--', alpha=0.7)
+
+        # Add labels and title
+        ax.set_xlabel('Parameter a (y-intercept)')
+        ax.set_ylabel('Sum of Squared Residuals (SSR)')
+        ax.set_title('SSR vs. Parameter a (with fixed b)')
+
+        # Add a legend
+        self.legend = ax.legend()
+
+    def update(self, a, b):
+        # Read SSR for different values of a from the index, or calculate it in closed form
+        self.curve.set_data(*self.data.ssr_vs_a(b, self.a_range))
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+        # Move the highlight to the current a value
+        self.current_line.set_xdata([a, a])
+        self.marker.set_data([a], [self.stats.ssr(a, b)])
+        self.legend.get_texts()[0].set_text(f'Current a = {a:.1f}')
+
+
+class MAEvsBPlot:
+    # MAE as a function of b for the current a
+
+    def __init__(self, data, resolution=CURVE_POINTS):
+        self.data = data
+        self.resolution = resolution
+        self.figure = Figure(figsize=FIGURE_SIZE)
+        self.ax = ax = self.figure.subplots()
+        self.mae_curve = None
+
+        # Create the MAE vs. b plot (its values are set in update)
+        self.curve, = ax.plot([], [], 'g-', linewidth=2)
+
+        # Highlight the current b value
+        self.current_line = ax.axvline(x=0, color='r', linestyle='--', label='Current b')
+        self.marker, = ax.plot([0], [0], 'ro', markersize=8)
+
+        # Add gridlines
+        ax.grid(True, linestyle='--', alpha=0.7)
+
+        # Add labels and title
+        ax.set_xlabel('Parameter b (slope)')
+        ax.set_ylabel('Mean Absolute Error (MAE)')
+        ax.set_title('MAE vs. Parameter b (with fixed a)')
+
+        # Add a legend
+        self.legend = ax.legend()
+
+    def update(self, a, b):
+        # Read the MAE curve for different values of b from the index, or calculate it exactly, sorting the
+        # breakpoints only when a changes
+        if self.mae_curve is None or self.mae_curve_a != a:
+            self.mae_curve = self.data.mae_curve(a)
+            self.mae_curve_a = a
+            self.curve.set_data(*self.mae_curve.curve(-10, 10, self.resolution))
+            self.ax.relim()
+            self.ax.autoscale_view()
+
+        # Move the highlight to the current b value
+        self.current_line.set_xdata([b, b])
+        self.marker.set_data([b], [self.mae_curve(b)])
+        self.legend.get_texts()[0].set_text(f'Current b = {b:.1f}')
+
+
+class SSRSurfacePlot:
+    # SSR over the whole slider domain; only the marker for the current (a, b) moves
+
+    def __init__(self, data, resolution=SURFACE_POINTS):
+        self.figure = Figure(figsize=FIGURE_SIZE)
+        self.ax = ax = self.figure.subplots()
+        self.background = None
+
+        # Evaluate SSR on the whole (a, b) grid in one broadcast
+        a_grid = np.linspace(-10, 10, resolution)
+        b_grid = np.linspace(-10, 10, resolution)
+        ssr_surface = data.stats.ssr(a_grid[np.newaxis, :], b_grid[:, np.newaxis])
+
+        # Create the SSR surface plot on a log color scale
+        norm = LogNorm(vmin=max(ssr_surface.min(), 1e-12), vmax=ssr_surface.max())
+        image = ax.imshow(ssr_surface, extent=(-10, 10, -10, 10), origin='lower', aspect='auto', cmap='viridis', norm=norm,
+                          rasterized=True)
+        ax.contour(a_grid, b_grid, ssr_surface, levels=np.geomspace(norm.vmin, norm.vmax, 12), colors='white', linewidths=0.8, alpha=0.6)
+        self.figure.colorbar(image, ax=ax, label='Sum of Squared Residuals (SSR)')
+
+        # Highlight the current (a, b) values
+        self.marker, = ax.plot([0], [0], 'ro', markersize=8, label='Current (a, b)')
+
+        # Add labels and title
+        ax.set_xlabel('Parameter a (y-intercept)')
+        ax.set_ylabel('Parameter b (slope)')
+        ax.set_title('SSR Surface over Parameters a and b')
+
+        # Add a legend
+        self.legend = ax.legend()
+        self.moving = [self.marker, self.legend]
+
+    def update(self, a, b):
+        # Move the marker to the current (a, b) values
+        self.marker.set_data([a], [b])
+        self.legend.get_texts()[0].set_text(f'Current (a, b) = ({a:.1f}, {b:.1f})')
+
+
+def render_image(panel, a, b, format='png', dpi=200, bbox_inches='tight'):
+    """Move the panel's changing artists to ``(a, b)`` and return the figure encoded in ``format``.
+
+    ``format`` is a key of :data:`IMAGE_FORMATS`; SVG is returned as text,
+    the raster formats as bytes. In an SVG, ``dpi`` is the resolution of
+    the rasterized layers.
+    """
+    panel.update(a, b)
+    buffer = io.BytesIO()
+    if format != 'svg' and bbox_inches in ('tight', None) and getattr(panel, 'moving', None):
+        image = _composite(panel, dpi, tight=bbox_inches == 'tight')
+        Image.fromarray(image).save(buffer, format=format, **IMAGE_FORMATS[format].get('pil_kwargs', {}))
+        return buffer.getvalue()
+    panel.figure.savefig(buffer, format=format, dpi=dpi, bbox_inches=bbox_inches, **IMAGE_FORMATS[format])
+    return buffer.getvalue().decode() if format == 'svg' else buffer.getvalue()
+
+
+def _front(panel):
+    # The artists of the panel's axes drawn from its first moving artist on, in the order Axes.draw uses;
+    # everything drawn before them is the background
+    ax = panel.moving[0].axes
+    artists = sorted((artist for artist in ax.get_children() if artist is not ax.patch), key=attrgetter('zorder'))
+    return artists[min(artists.index(artist) for artist in panel.moving):]
+
+
+def _composite(panel, dpi, tight=True):
+    # Draw the front artists over the panel's background at dpi and return the RGBA pixels of the whole
+    # figure, or cropped as savefig(bbox_inches='tight') would
+    figure = panel.figure
+    if panel.background is None or panel.background[0] != dpi:
+        canvas = FigureCanvasAgg(figure)
+        figure.set_dpi(dpi)
+        front = _front(panel)
+        for artist in front:
+            artist.set_animated(True)
+        try:
+            canvas.draw()
+        finally:
+            for artist in front:
+                artist.set_animated(False)
+        panel.background = (dpi, np.array(canvas.buffer_rgba()), front)
+    _, background, front = panel.background
+    canvas = figure.canvas
+    renderer = canvas.get_renderer()
+    pixels = np.asarray(canvas.buffer_rgba())
+    np.copyto(pixels, background)
+    for artist in front:
+        artist.draw(renderer)
+    if not tight:
+        return pixels
+
+    # Crop to the drawn extent padded by savefig.pad_inches, with the origin at the top
+    x0, y0, x1, y1 = figure.get_tightbbox(renderer).padded(rcParams['savefig.pad_inches']).extents * dpi
+    left, top = max(round(x0), 0), max(round(pixels.shape[0] - y1), 0)
+    return pixels[top:top + int(y1 - y0), left:left + int(x1 - x0)]
+
+
+def render_png(panel, a, b, dpi=200, bbox_inches='tight'):
+    """Move the panel's changing artists to ``(a, b)`` and return the figure as PNG bytes, as st.pyplot would."""
+    return render_image(panel, a, b, 'png', dpi, bbox_inches)
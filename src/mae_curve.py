@@ -0,0 +1,104 @@
+"""Exact MAE vs. slope curve for a fixed intercept.
+
+For a fixed intercept ``a`` the mean absolute error of the line ``a + b * x``
+
+    MAE(b) = 1/n * sum(|y_i - a - b * x_i|)
+           = 1/n * (sum(|x_i| * |c_i - b|) + sum over x_i == 0 of |y_i - a|)
+
+is piecewise linear in ``b`` with breakpoints ``c_i = (y_i - a) / x_i``.
+With W(b) and WC(b) the sums of the weights ``|x_i|`` and ``|x_i| * c_i``
+over the breakpoints ``c_i <= b``, and W and WC their totals,
+
+    sum(|x_i| * |c_i - b|) = b * (2 * W(b) - W) - 2 * WC(b) + WC,
+
+which :func:`mae_from_sums` evaluates. Sorting the breakpoints once and
+keeping prefix sums of the weights lets every evaluation be answered with
+a binary search instead of a full pass over the data.
+
+:func:`cached_curves` looks the curves of one dataset up in a cache shared
+by many callers, so each intercept is sorted once.
+"""
+
+import numpy as np
+
+
+def breakpoints(x, y, a):
+    """Return the breakpoints and weights of the points off the y-axis, and the constant part of the error sum.
+
+    The breakpoints are ``(y - a) / x`` and the weights ``|x|``; points on
+    the y-axis do not depend on b and only add ``sum(|y - a|)``.
+    """
+    x = np.asarray(x, dtype=float)
+    offset = np.asarray(y, dtype=float) - a
+    on_axis = x == 0
+    off_axis = ~on_axis
+    return offset[off_axis] / x[off_axis], np.abs(x[off_axis]), float(np.abs(offset[on_axis]).sum())
+
+
+def mae_from_sums(b, weight_below, weighted_below, weight, weighted, constant, n):
+    """Return the MAE at slopes ``b`` from the sums of the weights and weighted breakpoints at or below each.
+
+    ``weight`` and ``weighted`` are the totals over all breakpoints and
+    ``constant`` the error of the points on the y-axis.
+    """
+    return (b * (2 * weight_below - weight) - 2 * weighted_below + weighted + constant) / n
+
+
+class MAECurve:
+    """MAE of the line ``a + b * x`` as an exact function of the slope ``b``.
+
+    Construction costs O(n log n); each evaluation then costs O(log n),
+    so the curve can be sampled at any resolution.
+    """
+
+    def __init__(self, x, y, a):
+        self.n = len(x)
+        values, weights, self._constant = breakpoints(x, y, a)
+
+        # Sort the breakpoints once and keep prefix sums for the lookups
+        order = np.argsort(values, kind="stable")
+        self.breakpoints = values[order]
+        weights = weights[order]
+        self._cum_w = np.concatenate(([0.0], np.cumsum(weights)))
+        self._cum_wc = np.concatenate(([0.0], np.cumsum(weights * self.breakpoints)))
+
+    @property
+    def nbytes(self):
+        """Bytes held by the sorted breakpoints and their prefix sums."""
+        return self.breakpoints.nbytes + self._cum_w.nbytes + self._cum_wc.nbytes
+
+    def __call__(self, b):
+        """Evaluate the MAE at one or more slopes."""
+        b = np.asarray(b, dtype=float)
+        k = np.searchsorted(self.breakpoints, b, side="right")
+        return mae_from_sums(b, self._cum_w[k], self._cum_wc[k], self._cum_w[-1], self._cum_wc[-1], self._constant,
+                             self.n)
+
+    def curve(self, lo, hi, num=100):
+        """Return ``(b_values, mae_values)`` for plotting the curve on ``[lo, hi]``.
+
+        The ``num`` evenly spaced samples are merged with the breakpoints inside
+        the interval when there are at most ``num`` of them, so the polyline is
+        exact; otherwise only the samples are returned.
+        """
+        b_values = np.linspace(lo, hi, num)
+        start, stop = np.searchsorted(self.breakpoints, [lo, hi])
+        if stop - start <= num:
+            b_values = np.union1d(b_values, self.breakpoints[start:stop])
+        return b_values, self(b_values)
+
+
+def cached_curves(cache, key, x, y, prepare=None):
+    """Return a function of the intercept that gets the :class:`MAECurve` of ``(x, y)`` from ``cache``.
+
+    The curves are stored under ``(key, a)`` by ``cache.get_or_render``;
+    ``prepare``, if given, is applied to each new curve before it is
+    stored. The function references only its arguments, so it can be held
+    by shared objects that outlive its caller.
+    """
+    def mae_curve(a):
+        def render():
+            curve = MAECurve(x, y, a)
+            return curve if prepare is None else prepare(curve)
+        return cache.get_or_render((key, a), render)
+    return mae_curve
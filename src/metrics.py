@@ -0,0 +1,190 @@
+"""Evaluation metrics of the line ``a + b * x`` computed in one fused pass.
+
+The data is walked once in chunks of ``CHUNK_SIZE`` rows. For each chunk
+the residuals and then the shifted y values are written into one
+preallocated scratch buffer, from which the sum of squared residuals, the sum of
+absolute errors and the mean and total sum of squares of y are read off,
+so no full-size temporary is ever allocated. The chunk moments are merged
+with the parallel form of Welford's algorithm (Chan et al.), which stays
+accurate when y is far from zero. Peak memory depends on the chunk size
+only, so memory-mapped inputs larger than RAM work.
+
+:func:`compute_metrics_batch` scores many lines at once with the same
+definitions: the residuals of a block of lines on a chunk of points are
+written into one scratch matrix, so memory is bounded by the block size
+however many lines there are.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# Small enough for both scratch buffers to stay in the CPU cache
+CHUNK_SIZE = 1 << 16
+
+# Values in the lines-by-points scratch matrix of compute_metrics_batch
+BLOCK_VALUES = 1 << 16
+
+
+@dataclass(frozen=True)
+class RegressionMetrics:
+    n: int
+    ssr: float
+    sst: float
+    r2: float
+    adj_r2: float
+    mae: float
+    rmse: float
+
+
+@dataclass
+class MetricsAccumulator:
+    """Running SSR, absolute-error sum, count, mean and sum of squares of y."""
+
+    count: int = 0
+    mean_y: float = 0.0
+    sst: float = 0.0
+    ssr: float = 0.0
+    abs_error: float = 0.0
+
+    def update(self, x, y, a, b, scratch=None, offset=None):
+        """Add one chunk of points to the accumulators.
+
+        ``scratch`` is an optional float buffer at least ``len(y)`` long that
+        is overwritten instead of allocating temporaries. ``offset`` is an
+        optional chunk of values added to the predictions, e.g. the
+        contribution of other predictors held fixed.
+        """
+        chunk_count = len(y)
+        if chunk_count == 0:
+            return
+        buffer = np.empty(chunk_count) if scratch is None else scratch[:chunk_count]
+
+        # residuals = y - (a + b * x + offset)
+        residuals = np.multiply(x, b, out=buffer)
+        residuals += a
+        if offset is not None:
+            residuals += offset
+        np.subtract(y, residuals, out=residuals)
+        self.ssr += float(residuals @ residuals)
+        self.abs_error += float(np.abs(residuals, out=residuals).sum())
+        self.update_moments(y, buffer)
+
+    def update_moments(self, y, scratch=None):
+        """Add one chunk of y values to the mean and sum of squares only."""
+        chunk_count = len(y)
+        if chunk_count == 0:
+            return
+        buffer = np.empty(chunk_count) if scratch is None else scratch[:chunk_count]
+
+        # Mean and sum of squares of y from sums shifted by the chunk's first value
+        shift = float(y[0])
+        deviations = np.subtract(y, shift, out=buffer)
+        total = float(deviations.sum())
+        chunk_mean = total / chunk_count
+        chunk_sst = max(float(deviations @ deviations) - total * chunk_mean, 0.0)
+        self.merge_moments(chunk_count, shift + chunk_mean, chunk_sst)
+
+    def merge_moments(self, count, mean_y, sst):
+        # Combine the mean and sum of squares of y with those of another batch of points
+        total = self.count + count
+        delta = mean_y - self.mean_y
+        self.sst += sst + delta**2 * self.count * count / total
+        self.mean_y += delta * count / total
+        self.count = total
+
+    def merge(self, other):
+        """Add the points summarized by another accumulator."""
+        if other.count:
+            self.ssr += other.ssr
+            self.abs_error += other.abs_error
+            self.merge_moments(other.count, other.mean_y, other.sst)
+
+    def result(self, predictors=1):
+        """Return the metrics for a model with ``predictors`` predictors (besides the intercept)."""
+        r2, adj_r2, mae, rmse = _scores(self.count, self.ssr, self.sst, self.abs_error, predictors)
+        return RegressionMetrics(
+            n=self.count,
+            ssr=self.ssr,
+            sst=self.sst,
+            r2=float(r2),
+            adj_r2=float(adj_r2),
+            mae=float(mae),
+            rmse=float(rmse),
+        )
+
+
+def _scores(n, ssr, sst, abs_error, predictors):
+    # R², adjusted R², MAE and RMSE from the sums; ssr and abs_error may hold one entry per line
+    ssr = np.asarray(ssr, dtype=float)
+    if sst > 0:
+        r2 = 1 - ssr / sst
+    else:
+        # Constant y: a perfect fit scores 1, anything else 0, as in sklearn's r2_score
+        r2 = (ssr == 0).astype(float)
+    dof = n - predictors - 1
+    adj_r2 = 1 - (1 - r2) * (n - 1) / dof if dof > 0 else np.full_like(r2, np.nan)
+    if not n:
+        return r2, adj_r2, np.full_like(ssr, np.nan), np.full_like(ssr, np.nan)
+    return r2, adj_r2, np.asarray(abs_error) / n, np.sqrt(ssr / n)
+
+
+def compute_metrics(x, y, a, b, predictors=1, chunk_size=CHUNK_SIZE, offset=None):
+    """Return R², adjusted R², MAE and RMSE of ``a + b * x + offset`` on ``(x, y)`` in a single pass.
+
+    ``predictors`` is the number of predictors besides the intercept used
+    by the adjusted R². ``offset`` is an optional array of values added to
+    the predictions, such as the contribution of the other predictors of a
+    multiple regression held fixed.
+    """
+    accumulator = MetricsAccumulator()
+    scratch = np.empty(min(chunk_size, len(y)))
+    for start in range(0, len(y), chunk_size):
+        stop = start + chunk_size
+        accumulator.update(np.asarray(x[start:stop], dtype=float), np.asarray(y[start:stop], dtype=float), a, b, scratch,
+                           None if offset is None else offset[start:stop])
+    return accumulator.result(predictors)
+
+
+def compute_metrics_batch(x, y, a, b, predictors=1, offset=None, block_values=BLOCK_VALUES):
+    """Return the metrics of every line ``a[i] + b[i] * x + offset`` on ``(x, y)``, as :func:`compute_metrics` would.
+
+    ``a`` and ``b`` are arrays of candidate intercepts and slopes. The
+    fields of the returned :class:`RegressionMetrics` other than ``n`` and
+    ``sst`` are arrays with one entry per line. The lines are scored a block
+    at a time on chunks of the points, so at most ``block_values`` residuals
+    are held at once.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    n = len(y)
+    points = max(min(n, CHUNK_SIZE), 1)
+    lines = max(block_values // points, 1)
+    scratch = np.empty((min(lines, len(a)), points))
+
+    accumulator = MetricsAccumulator()
+    for start in range(0, n, points):
+        accumulator.update_moments(np.asarray(y[start:start + points], dtype=float), scratch[0] if len(a) else None)
+
+    ssr = np.zeros(len(a))
+    abs_error = np.zeros(len(a))
+    for line_start in range(0, len(a), lines):
+        line_stop = line_start + lines
+        block_a = a[line_start:line_stop, np.newaxis]
+        block_b = b[line_start:line_stop, np.newaxis]
+        for start in range(0, n, points):
+            stop = start + points
+            chunk_y = np.asarray(y[start:stop], dtype=float)
+
+            # residuals = y - (a + b * x + offset), one row per line
+            residuals = np.multiply(block_b, np.asarray(x[start:stop], dtype=float),
+                                    out=scratch[:len(block_b), :len(chunk_y)])
+            residuals += block_a
+            if offset is not None:
+                residuals += np.asarray(offset[start:stop], dtype=float)
+            np.subtract(chunk_y, residuals, out=residuals)
+            ssr[line_start:line_stop] += np.einsum("ij,ij->i", residuals, residuals)
+            abs_error[line_start:line_stop] += np.abs(residuals, out=residuals).sum(axis=1)
+
+    r2, adj_r2, mae, rmse = _scores(n, ssr, accumulator.sst, abs_error, predictors)
+    return RegressionMetrics(n=n, ssr=ssr, sst=accumulator.sst, r2=r2, adj_r2=adj_r2, mae=mae, rmse=rmse)
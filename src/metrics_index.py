@@ -0,0 +1,242 @@
+"""Metrics of every line the sliders can select, precomputed once per dataset.
+
+The sliders move a and b over -10 … 10 in steps of 0.1, so only 201 × 201
+lines can ever be scored. :class:`MetricsIndex` holds the SSR and MAE of
+each on the train and test sets in one float64 array of shape
+``(split, metric, a, b)``. R², adjusted R² and RMSE follow from the SSR, n
+and the total sum of squares in O(1), so they are not stored. A lookup is
+then an array index, and the loss curves of the panels for an a or b on
+the lattice are rows and columns of the array.
+
+The index is filled one a (one row) at a time: the SSR row in closed form
+from the split's :class:`~src.sufficient_stats.SufficientStats` and the
+MAE row with the prefix sums of :class:`~src.mae_curve.MAECurve`, except
+that the breakpoints are counted into the intervals between the lattice
+slopes instead of sorted, so a row costs one O(n) pass over each split.
+:meth:`MetricsIndex.build` fills the rows in a background thread, nearest
+to the current a first; every row can be read as soon as it is done, and
+lookups on rows that are not return None, so callers compute the value
+directly until then.
+
+The finished index is stored under the data cache (see
+:mod:`src.data_sources`), keyed by the dataset, and every later process
+opens it as a read-only memory map; it is evicted with the cache's other
+entries. A build stops, and deletes its scratch files, when
+:meth:`MetricsIndex.stop` is called or the index is no longer referenced,
+e.g. once it is evicted from the app's caches.
+"""
+
+import json
+import shutil
+import tempfile
+import threading
+import weakref
+from pathlib import Path
+
+import numpy as np
+
+from src.data_sources import DATA_CACHE_DIR, evict, touch
+from src.mae_curve import breakpoints, mae_from_sums
+from src.metrics import CHUNK_SIZE, MetricsAccumulator
+from src.sufficient_stats import SufficientStats
+
+# The values each slider can take
+STEP = 0.1
+LATTICE = np.round(np.arange(-100, 101) * STEP, 1)
+
+SPLITS = ("train", "test")
+METRICS = ("ssr", "mae")
+SHAPE = (len(SPLITS), len(METRICS), len(LATTICE), len(LATTICE))
+
+# Points per split above which no index is built: every row is a pass over each split, so building would
+# keep a core busy for a minute or more
+MAX_POINTS = 1 << 20
+
+
+def lattice_position(value):
+    """Return the position of a slider value on the lattice, or None if ``value`` is not on it."""
+    position = round((value - LATTICE[0]) / STEP)
+    if 0 <= position < len(LATTICE) and abs(LATTICE[position] - value) < 1e-9:
+        return position
+    return None
+
+
+def _moments(y):
+    # Count and total sum of squares of y, accumulated in chunks as compute_metrics does
+    accumulator = MetricsAccumulator()
+    scratch = np.empty(min(CHUNK_SIZE, len(y)))
+    for start in range(0, len(y), CHUNK_SIZE):
+        accumulator.update_moments(np.asarray(y[start:start + CHUNK_SIZE], dtype=float), scratch)
+    return accumulator.count, accumulator.sst
+
+
+def _mae_row(x, y, a):
+    # MAE(b) at every lattice slope of the line a + b * x, from the sums of mae_curve. Counting each
+    # breakpoint into the interval (b_{k-1}, b_k] it falls in gives the sums at or below every lattice slope
+    # by a cumulative sum, without sorting
+    weights = np.zeros(len(LATTICE) + 1)
+    weighted = np.zeros(len(LATTICE) + 1)
+    constant = 0.0
+    for start in range(0, len(y), CHUNK_SIZE):
+        values, chunk_weights, chunk_constant = breakpoints(x[start:start + CHUNK_SIZE], y[start:start + CHUNK_SIZE], a)
+        constant += chunk_constant
+        interval = np.clip(np.ceil((values - LATTICE[0]) / STEP - 1e-9), 0, len(LATTICE)).astype(np.intp)
+        weights += np.bincount(interval, chunk_weights, minlength=len(weights))
+        weighted += np.bincount(interval, chunk_weights * values, minlength=len(weights))
+    return mae_from_sums(LATTICE, np.cumsum(weights)[:-1], np.cumsum(weighted)[:-1], weights.sum(), weighted.sum(),
+                         constant, len(y))
+
+
+class LatticeCurve:
+    """MAE vs. slope for an intercept on the lattice, read from a row of the index.
+
+    Answers the calls the panels make of a :class:`~src.mae_curve.MAECurve`:
+    exact at every slope on the lattice and linearly interpolated between.
+    """
+
+    def __init__(self, values):
+        self.values = values
+
+    def __call__(self, b):
+        return np.interp(b, LATTICE, self.values)
+
+    def curve(self, lo, hi, num=100):
+        """Return ``(b_values, mae_values)`` at the lattice slopes in ``[lo, hi]``; ``num`` is ignored."""
+        inside = (LATTICE >= lo - 1e-9) & (LATTICE <= hi + 1e-9)
+        return LATTICE[inside], self.values[inside]
+
+
+class MetricsIndex:
+    """SSR and MAE of the train and test sets at every (a, b) of the slider lattice.
+
+    ``values[split, metric, i, j]`` is the metric of the line
+    ``LATTICE[i] + LATTICE[j] * x`` and ``done[i]`` tells whether row ``i``
+    is filled. ``moments`` holds the count and total sum of squares of each
+    split's target, from which the other metrics are derived. ``stopping``
+    is set to stop a build in progress.
+    """
+
+    def __init__(self, values, moments, done, stopping=None):
+        self.values = values
+        self.moments = moments
+        self.done = done
+        self.stopping = stopping or threading.Event()
+
+    @property
+    def rows_done(self):
+        return int(self.done.sum())
+
+    @property
+    def complete(self):
+        return bool(self.done.all())
+
+    @classmethod
+    def open(cls, key, cache_dir=DATA_CACHE_DIR):
+        """Return the finished index stored for ``key`` as a read-only memory map, or None if there is none."""
+        directory = Path(cache_dir) / "metrics_index" / key
+        if not (directory / "index.json").exists():
+            return None
+        touch(directory)
+        meta = json.loads((directory / "index.json").read_text())
+        values = np.memmap(directory / "values.f64", dtype="<f8", mode="r", shape=SHAPE)
+        return cls(values, [tuple(moments) for moments in meta["moments"]], np.ones(len(LATTICE), dtype=bool))
+
+    @classmethod
+    def build(cls, key, train, test, start_a=0.0, cache_dir=DATA_CACHE_DIR, background=True):
+        """Return the index stored for ``key``, or start filling a new one and return it right away.
+
+        ``train`` and ``test`` are ``(x, y, target)``: the residuals are
+        those of ``y`` and R² is scored against the spread of ``target``,
+        as for :func:`~src.metrics.compute_metrics` with an offset of
+        ``target - y``. The rows are filled nearest to ``start_a`` first,
+        in a daemon thread unless ``background`` is false, and the index is
+        stored once every row is done. A build that is stopped first keeps
+        the rows it filled readable but stores nothing.
+        """
+        index = cls.open(key, cache_dir)
+        if index is not None:
+            return index
+
+        # Fill a scratch directory so a crash never leaves a half-built index behind
+        directory = Path(cache_dir) / "metrics_index" / key
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        scratch = Path(tempfile.mkdtemp(dir=directory.parent))
+        values = np.memmap(scratch / "values.f64", dtype="<f8", mode="w+", shape=SHAPE)
+        splits = [(SufficientStats.from_arrays(x, y), x, y) for x, y, _ in (train, test)]
+        moments = [_moments(target) for _, _, target in (train, test)]
+        done = np.zeros(len(LATTICE), dtype=bool)
+        stopping = threading.Event()
+        index = cls(values, moments, done, stopping)
+        rows = np.argsort(np.abs(LATTICE - start_a), kind="stable")
+
+        # The filling thread does not reference the index, so it stops once nothing else does
+        weakref.finalize(index, stopping.set)
+
+        def fill():
+            try:
+                for row in rows:
+                    if stopping.is_set():
+                        shutil.rmtree(scratch, ignore_errors=True)
+                        return
+                    a = LATTICE[row]
+                    for split, (stats, x, y) in enumerate(splits):
+                        values[split, 0, row] = stats.ssr(a, LATTICE)
+                        values[split, 1, row] = _mae_row(x, y, a)
+                    done[row] = True
+                values.flush()
+                (scratch / "index.json").write_text(json.dumps({"moments": moments}))
+                try:
+                    scratch.rename(directory)
+                except OSError:
+                    # Another process finished the same index first
+                    shutil.rmtree(scratch)
+                else:
+                    evict(cache_dir, keep=[directory])
+            except BaseException:
+                shutil.rmtree(scratch, ignore_errors=True)
+                raise
+
+        if background:
+            threading.Thread(target=fill, name=f"metrics-index-{key[:8]}", daemon=True).start()
+        else:
+            fill()
+        return index
+
+    def stop(self):
+        """Stop filling the index if it is being built."""
+        self.stopping.set()
+
+    def metrics(self, split, a, b, predictors=1):
+        """Return the :class:`~src.metrics.RegressionMetrics` of ``a + b * x`` on ``split``.
+
+        Returns None if (a, b) is not on the lattice or its row is not
+        filled yet.
+        """
+        row, column = lattice_position(a), lattice_position(b)
+        if row is None or column is None or not self.done[row]:
+            return None
+        split = SPLITS.index(split)
+        count, sst = self.moments[split]
+        ssr, mae = self.values[split, :, row, column]
+        return MetricsAccumulator(count=count, sst=sst, ssr=float(ssr), abs_error=float(mae) * count).result(predictors)
+
+    def ssr_vs_b(self, a, split="train"):
+        """Return ``(b_values, ssr_values)`` along the lattice for the intercept ``a``, or None if its row is not available."""
+        row = lattice_position(a)
+        if row is None or not self.done[row]:
+            return None
+        return LATTICE, self.values[SPLITS.index(split), 0, row]
+
+    def ssr_vs_a(self, b, split="train"):
+        """Return ``(a_values, ssr_values)`` along the lattice for the slope ``b``, or None until every row is filled."""
+        column = lattice_position(b)
+        if column is None or not self.complete:
+            return None
+        return LATTICE, self.values[SPLITS.index(split), 0, :, column]
+
+    def mae_curve(self, a, split="train"):
+        """Return the MAE vs. slope :class:`LatticeCurve` for the intercept ``a``, or None if its row is not available."""
+        row = lattice_position(a)
+        if row is None or not self.done[row]:
+            return None
+        return LatticeCurve(self.values[SPLITS.index(split), 1, row])
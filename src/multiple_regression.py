@@ -0,0 +1,175 @@
+"""Least squares with several predictors from accumulated Gram statistics.
+
+An OLS fit only needs the count, the means and the centered cross-products
+of the predictors and the target. They are accumulated in one chunked pass
+over the columns, merging chunks with the matrix form of Chan's update as
+in :mod:`src.metrics`, so the design matrix is never materialized. The
+p x p cross-product matrix of the predictors is factorized once and the
+factor is reused to refit any target on the same design, and for the R²
+and adjusted R² of the fit.
+
+With the other coefficients held fixed, the model is a simple regression
+of the partial residuals ``y - sum(coef[k] * x[k] for k != j)`` on one
+predictor ``x[j]``; :meth:`GramStats.partial` derives its sufficient
+statistics in closed form so the single-predictor panels work unchanged.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.sufficient_stats import SufficientStats
+
+# Values per chunk; the rows per chunk shrink as the number of predictors grows
+CHUNK_VALUES = 1 << 20
+
+
+def _chunk_rows(predictors):
+    return max(CHUNK_VALUES // max(predictors, 1), 1)
+
+
+def _design_chunk(columns, start, stop):
+    return np.column_stack([np.asarray(column[start:stop], dtype=float) for column in columns])
+
+
+@dataclass(frozen=True)
+class GramStats:
+    """Count, means and centered cross-products of p predictors and a target.
+
+    ``sxx`` is the p x p matrix of sum((x[i] - mean_x[i]) * (x[k] - mean_x[k])),
+    ``sxy`` the vector of cross-products with y and ``syy`` the sum of
+    squares of y, all centered.
+    """
+
+    n: int
+    mean_x: np.ndarray
+    mean_y: float
+    sxx: np.ndarray
+    sxy: np.ndarray
+    syy: float
+
+    @property
+    def predictors(self):
+        return len(self.mean_x)
+
+    @classmethod
+    def from_columns(cls, columns, y=None, design=None):
+        """Accumulate the statistics of ``columns`` (a sequence of 1-D arrays) and ``y`` in chunks.
+
+        Without ``y`` only the predictor moments are meaningful, e.g. to
+        factorize a design before any target is drawn on it. ``design`` may be the statistics of another target on the same
+        columns; its predictor moments are reused, which skips the O(n p²)
+        cross-products of the predictors and leaves an O(n p) pass.
+        """
+        p = len(columns)
+        count, mean_x, mean_y = 0, np.zeros(p), 0.0
+        sxx, sxy, syy = np.zeros((p, p)), np.zeros(p), 0.0
+        rows = _chunk_rows(p)
+        for start in range(0, len(columns[0]), rows):
+            x_chunk = _design_chunk(columns, start, start + rows)
+            y_chunk = np.zeros(len(x_chunk)) if y is None else np.asarray(y[start:start + rows], dtype=float)
+            chunk_count = len(y_chunk)
+            chunk_mean_x = x_chunk.mean(axis=0)
+            chunk_mean_y = float(y_chunk.mean())
+            x_chunk -= chunk_mean_x
+            deviations = y_chunk - chunk_mean_y
+
+            # Combine with the previous chunks (Chan et al.)
+            total = count + chunk_count
+            weight = count * chunk_count / total
+            delta_x = chunk_mean_x - mean_x
+            delta_y = chunk_mean_y - mean_y
+            if design is None:
+                sxx += x_chunk.T @ x_chunk + weight * np.outer(delta_x, delta_x)
+            sxy += x_chunk.T @ deviations + weight * delta_x * delta_y
+            syy += float(deviations @ deviations) + weight * delta_y**2
+            mean_x += delta_x * chunk_count / total
+            mean_y += delta_y * chunk_count / total
+            count = total
+
+        if design is not None:
+            mean_x, sxx = design.mean_x, design.sxx
+        return cls(n=count, mean_x=mean_x, mean_y=mean_y, sxx=sxx, sxy=sxy, syy=syy)
+
+    def ssr(self, intercept, coef):
+        """Return SSR of ``intercept + sum(coef[k] * x[k])`` in closed form."""
+        coef = np.asarray(coef, dtype=float)
+        offset = self.mean_y - intercept - self.mean_x @ coef
+        return self.syy - 2 * coef @ self.sxy + coef @ self.sxx @ coef + self.n * offset**2
+
+    def partial(self, j, coef):
+        """Return the :class:`SufficientStats` of ``x[j]`` and the partial residuals of y without predictor j.
+
+        The partial residuals are ``y - sum(coef[k] * x[k] for k != j)``.
+        """
+        others = np.array(coef, dtype=float)
+        others[j] = 0.0
+        return SufficientStats(
+            n=self.n,
+            mean_x=float(self.mean_x[j]),
+            mean_y=float(self.mean_y - self.mean_x @ others),
+            sxx=float(self.sxx[j, j]),
+            sxy=float(self.sxy[j] - self.sxx[j] @ others),
+            syy=float(self.syy - 2 * others @ self.sxy + others @ self.sxx @ others),
+        )
+
+
+class GramFactor:
+    """Factorization of the predictors' cross-product matrix, computed once and reused for every solve.
+
+    A Cholesky factor is used when the matrix is positive definite. Collinear
+    predictors make it singular; then an eigendecomposition gives the
+    minimum-norm solution instead.
+    """
+
+    def __init__(self, sxx):
+        p = len(sxx)
+        try:
+            # Keep the inverse of the triangular factor so that each solve is two matrix-vector products
+            self.method = "cholesky"
+            self._inverse_factor = np.linalg.solve(np.linalg.cholesky(sxx), np.eye(p))
+        except np.linalg.LinAlgError:
+            self.method = "eigh"
+            values, vectors = np.linalg.eigh(sxx)
+            keep = values > values.max(initial=0.0) * p * np.finfo(float).eps
+            self._inverse_factor = (vectors[:, keep] / np.sqrt(values[keep])).T
+
+    def solve(self, rhs):
+        """Return the (minimum-norm) solution x of ``sxx @ x = rhs``."""
+        return self._inverse_factor.T @ (self._inverse_factor @ rhs)
+
+
+@dataclass(frozen=True)
+class OLSFit:
+    intercept: float
+    coef: np.ndarray
+    ssr: float
+    r2: float
+    adj_r2: float
+
+
+def fit_ols(stats, factor=None):
+    """Return the least-squares fit for ``stats``, reusing ``factor`` of the same design if given."""
+    factor = factor or GramFactor(stats.sxx)
+    coef = factor.solve(stats.sxy)
+    intercept = float(stats.mean_y - stats.mean_x @ coef)
+    ssr = max(float(stats.syy - coef @ stats.sxy), 0.0)
+    r2 = 1 - ssr / stats.syy if stats.syy > 0 else 1.0
+    dof = stats.n - stats.predictors - 1
+    adj_r2 = 1 - (1 - r2) * (stats.n - 1) / dof if dof > 0 else float("nan")
+    return OLSFit(intercept=intercept, coef=coef, ssr=ssr, r2=r2, adj_r2=adj_r2)
+
+
+def predict_chunks(columns, intercept, coef):
+    """Yield ``(start, prediction)`` of :func:`predict` for consecutive chunks of rows, ``start`` being the first row."""
+    rows = _chunk_rows(len(columns))
+    for start in range(0, len(columns[0]), rows):
+        yield start, _design_chunk(columns, start, start + rows) @ coef + intercept
+
+
+def predict(columns, intercept, coef):
+    """Return ``intercept + sum(coef[k] * columns[k])``, computed in chunks of rows."""
+    prediction = np.empty(len(columns[0]))
+    for start, chunk in predict_chunks(columns, intercept, coef):
+        prediction[start:start + len(chunk)] = chunk
+    return prediction
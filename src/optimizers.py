@@ -0,0 +1,76 @@
+"""Gradient-based fits of the line to the train set, for playback in the dashboard.
+
+The optimizers minimize the mean squared error SSR(a, b) / n. Its gradient
+only depends on the count, the means and the centered second moments of
+the points it is taken over, so a full-batch step costs O(1) whatever the
+dataset size. Mini-batch SGD draws the batches of a block of steps in one
+vectorized gather and reduces each to the same moments, which leaves only
+a loop of scalar updates; the blocks keep the gathered values within
+``BLOCK_VALUES`` whatever the steps and batch size.
+"""
+
+import numpy as np
+
+OPTIMIZERS = ("Gradient descent", "Mini-batch SGD", "Momentum")
+
+# Batch values gathered at once by mini-batch SGD; the steps per block shrink as the batches grow
+BLOCK_VALUES = 1 << 20
+
+
+def _descend(n, mean_x, mean_y, sxx, sxy, a, b, learning_rate, steps, momentum):
+    # Heavy-ball updates from per-step moments (scalars for full batches); momentum=0 is plain descent
+    moments = np.column_stack([np.broadcast_to(value, steps) for value in (n, mean_x, mean_y, sxx, sxy)]).tolist()
+    path = [(a, b)]
+    velocity_a = velocity_b = 0.0
+    for count, step_mean_x, step_mean_y, step_sxx, step_sxy in moments:
+        mean_residual = step_mean_y - a - b * step_mean_x
+        grad_a = -2 * mean_residual
+        grad_b = -2 * ((step_sxy - b * step_sxx) / count + step_mean_x * mean_residual)
+        velocity_a = momentum * velocity_a - learning_rate * grad_a
+        velocity_b = momentum * velocity_b - learning_rate * grad_b
+        a += velocity_a
+        b += velocity_b
+        # Stop at the first diverged step; a too large learning rate would only add overflowing values
+        if not (np.isfinite(a) and np.isfinite(b)):
+            break
+        path.append((a, b))
+    return np.array(path)
+
+
+def gradient_descent(stats, a, b, learning_rate, steps, momentum=0.0):
+    """Return the ``(steps + 1, 2)`` path of (a, b) of full-batch gradient descent from ``(a, b)``.
+
+    ``stats`` are the :class:`~src.sufficient_stats.SufficientStats` of the
+    train set. With ``momentum`` > 0 the steps use heavy-ball momentum. The
+    path ends early if the iterates diverge.
+    """
+    return _descend(stats.n, stats.mean_x, stats.mean_y, stats.sxx, stats.sxy, a, b, learning_rate, steps, momentum)
+
+
+def minibatch_sgd(x, y, a, b, learning_rate, steps, batch_size, seed, momentum=0.0):
+    """Return the path of (a, b) of mini-batch SGD with batches drawn with replacement from ``(x, y)``."""
+    rng = np.random.default_rng(seed)
+    batch_size = min(batch_size, len(x))
+    rows = max(BLOCK_VALUES // batch_size, 1)
+    moments = np.empty((4, steps))
+    for start in range(0, steps, rows):
+        index = rng.integers(0, len(x), size=(min(rows, steps - start), batch_size))
+        index.sort(axis=1)  # gathers from memory-mapped columns read in file order
+        batch_x = np.asarray(x)[index]
+        batch_y = np.asarray(y)[index]
+
+        mean_x = batch_x.mean(axis=1)
+        mean_y = batch_y.mean(axis=1)
+        batch_x -= mean_x[:, np.newaxis]
+        batch_y -= mean_y[:, np.newaxis]
+        block = moments[:, start:start + len(index)]
+        block[0], block[1] = mean_x, mean_y
+        block[2] = np.einsum("ij,ij->i", batch_x, batch_x)
+        block[3] = np.einsum("ij,ij->i", batch_x, batch_y)
+    return _descend(batch_size, *moments, a, b, learning_rate, steps, momentum)
+
+
+def sample_frames(path, frames):
+    """Return at most ``frames`` points of ``path`` evenly spaced in steps, always including both ends."""
+    index = np.unique(np.linspace(0, len(path) - 1, min(frames, len(path))).round().astype(int))
+    return path[index]
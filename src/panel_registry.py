@@ -0,0 +1,72 @@
+"""Registry of the dashboard panels and the layout computed from them.
+
+Each panel declares the toggle that shows it, the inputs its output depends
+on and the row it is placed in. The app lays out only the enabled panels
+and memoizes every panel's output on its own inputs, so changing one input
+re-renders just the panels that declare it.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass(frozen=True)
+class Panel:
+    name: str
+    render: Callable[[], Any]  # produces the panel's output from the current inputs
+    show: Callable[[Any], None]  # displays an output in the current container
+    inputs: tuple = ()  # names of the inputs the output depends on
+    toggle: str | None = None  # name of the input that shows the panel; always shown if None
+    row: int = 0
+    width: float = 1
+
+
+class PanelRegistry:
+    """Panels in registration order, laid out in rows of columns.
+
+    ``row_widths`` maps a row to its total width. A row whose panels are
+    narrower is padded with an empty column, so its panels keep their width
+    when the others in the row are hidden. Rows without an entry are split
+    evenly between their panels.
+    """
+
+    def __init__(self, row_widths=None):
+        self.panels = []
+        self.row_widths = row_widths or {}
+
+    def register(self, name, render, show, inputs=(), toggle=None, row=0, width=1):
+        panel = Panel(name, render, show, tuple(inputs), toggle, row, width)
+        self.panels.append(panel)
+        return panel
+
+    def enabled(self, values):
+        """Return the panels whose toggle is on in ``values``."""
+        return [panel for panel in self.panels if panel.toggle is None or values[panel.toggle]]
+
+    def layout(self, values):
+        """Return ``(panels, column_widths)`` for each non-empty row of enabled panels, top to bottom.
+
+        ``column_widths`` has one entry more than ``panels`` when the row is padded.
+        """
+        rows = {}
+        for panel in self.enabled(values):
+            rows.setdefault(panel.row, []).append(panel)
+
+        layout = []
+        for row in sorted(rows):
+            widths = [panel.width for panel in rows[row]]
+            padding = self.row_widths.get(row, 0) - sum(widths)
+            if padding > 0:
+                widths.append(padding)
+            layout.append((rows[row], widths))
+        return layout
+
+    def column_fractions(self, values):
+        """Return ``{name: fraction of the row width}`` of the column of each enabled panel."""
+        return {panel.name: width / sum(widths)
+                for row, widths in self.layout(values) for panel, width in zip(row, widths)}
+
+    @staticmethod
+    def key(panel, values):
+        """Return the memoization key of ``panel``: its name and the values of its declared inputs."""
+        return (panel.name, *(values[name] for name in panel.inputs))
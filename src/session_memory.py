@@ -0,0 +1,202 @@
+"""Memory held by each session and by the data every session shares.
+
+The datasets, sufficient statistics, loss curves and figures the app
+derives are held once per server process in caches shared by all
+sessions. :func:`freeze` makes the arrays of such an artifact read-only, so
+no session can change them under another, and registers their buffers in
+:class:`SharedArrays`, which reports the bytes they hold while they are
+alive.
+
+A session keeps only small values of its own, such as the last output of
+each panel. :func:`deep_nbytes` measures them and :class:`SessionMemory`,
+stored in the session's state, records the measurement and drops cached
+outputs once the session exceeds its budget. :class:`SessionRegistry`
+references the records weakly, so closed sessions drop out of the report
+by themselves. Memory-mapped arrays count as zero everywhere: their pages
+belong to the operating system's page cache, not to a session.
+"""
+
+import mmap
+import os
+import sys
+import threading
+import types
+import weakref
+from collections import deque
+
+import numpy as np
+
+# Default budget of the values a session keeps of its own, overridable with DASHBOARD_SESSION_BUDGET_MB
+SESSION_BUDGET_BYTES = int(float(os.environ.get("DASHBOARD_SESSION_BUDGET_MB", 8)) * 1024**2)
+
+# Objects that are shared by construction and never counted, however they are referenced
+_UNCOUNTED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def _owner(array):
+    # The array that owns the buffer behind a view
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def _memory_mapped(owner):
+    return isinstance(owner.base, mmap.mmap)
+
+
+class SharedArrays:
+    """Weak registry of the array buffers held by shared artifacts."""
+
+    def __init__(self):
+        self._owners = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def add(self, array):
+        owner = _owner(array)
+        with self._lock:
+            self._owners[id(owner)] = owner
+
+    def __contains__(self, array):
+        owner = _owner(array)
+        with self._lock:
+            return self._owners.get(id(owner)) is owner
+
+    def nbytes(self):
+        """Return the bytes of the live registered buffers, not counting memory-mapped files."""
+        with self._lock:
+            owners = list(self._owners.values())
+        return sum(owner.nbytes for owner in owners if not _memory_mapped(owner))
+
+
+def _children(value):
+    # The values a container or an object references
+    if isinstance(value, dict):
+        return [*value.keys(), *value.values()]
+    if isinstance(value, (list, tuple, set, frozenset, deque)):
+        return value
+    children = list(getattr(value, "__dict__", {}).values())
+    children += [getattr(value, name) for name in getattr(type(value), "__slots__", ()) if hasattr(value, name)]
+    return children
+
+
+def freeze(value, shared=None):
+    """Make every array reachable from ``value`` read-only, register it in ``shared`` and return ``value``.
+
+    Containers, dataclasses and plain objects are walked; the buffers that
+    views are taken of are made read-only as well.
+    """
+    seen = set()
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _UNCOUNTED):
+            continue
+        seen.add(id(item))
+        if isinstance(item, np.ndarray):
+            owner = _owner(item)
+            for array in (item, owner):
+                if array.flags.writeable:
+                    array.setflags(write=False)
+            if shared is not None:
+                shared.add(owner)
+        elif not isinstance(item, (str, bytes, bytearray, int, float, complex, bool)):
+            stack.extend(_children(item))
+    return value
+
+
+def deep_nbytes(value, shared=None, exclude=()):
+    """Return the approximate bytes held by ``value`` and everything it references.
+
+    Every object counts once. Arrays count the buffer they view once,
+    however many views share it; buffers registered in ``shared`` and
+    memory-mapped files count nothing, and neither do the objects whose ids
+    are in ``exclude``, e.g. values held by a shared cache.
+    """
+    seen = set(exclude)
+    total = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _UNCOUNTED):
+            continue
+        seen.add(id(item))
+        if isinstance(item, np.ndarray):
+            owner = _owner(item)
+            total += sys.getsizeof(item) - (item.nbytes if item is owner and item.base is None else 0)
+            if id(owner) not in seen and not _memory_mapped(owner) and (shared is None or owner not in shared):
+                seen.add(id(owner))
+                total += owner.nbytes
+        else:
+            total += sys.getsizeof(item)
+            if not isinstance(item, (str, bytes, bytearray, memoryview, int, float, complex, bool)):
+                stack.extend(_children(item))
+    return total
+
+
+def resident_bytes():
+    """Return the resident set size of this process, or its peak where the current size is not available."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        try:
+            import resource
+        except ImportError:
+            # Neither is available on Windows
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class SessionMemory:
+    """The bytes a session keeps of its own, measured after each full run, and its budget."""
+
+    def __init__(self, budget=SESSION_BUDGET_BYTES):
+        self.budget = budget
+        self.nbytes = 0
+        self.breakdown = {}
+        self.evictions = 0
+
+    def enforce(self, state, evictable, shared=None, exclude=()):
+        """Measure ``state`` (a mapping of names to values) and drop entries of ``evictable`` until it fits the budget.
+
+        ``evictable`` is a dict inside ``state`` whose entries can be
+        recomputed, such as cached outputs; the largest go first. ``shared``
+        and ``exclude`` are passed to :func:`deep_nbytes`. Returns the
+        dropped keys.
+        """
+        def measure():
+            self.breakdown = {name: deep_nbytes(value, shared, exclude) for name, value in state.items()}
+            self.nbytes = sum(self.breakdown.values())
+
+        measure()
+        dropped = []
+        if self.nbytes > self.budget:
+            excess = self.nbytes - self.budget
+            sizes = sorted(((deep_nbytes(value, shared, exclude), key) for key, value in evictable.items()),
+                           reverse=True)
+            for size, key in sizes:
+                if excess <= 0:
+                    break
+                del evictable[key]
+                excess -= size
+                dropped.append(key)
+            self.evictions += len(dropped)
+            measure()
+        return dropped
+
+
+class SessionRegistry:
+    """Weak set of the :class:`SessionMemory` records of the live sessions."""
+
+    def __init__(self):
+        self._records = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self._records.add(record)
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
@@ -0,0 +1,88 @@
+"""Sufficient statistics of a simple linear regression dataset.
+
+Everything the dashboard needs to know about SSR is contained in n and the
+first and second moments of x and y. They are computed once per dataset and
+then SSR(a, b) is evaluated in closed form, so a whole grid of (a, b) values
+costs one broadcast regardless of how many points the dataset has.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class SufficientStats:
+    """Count, means and centered second moments of a dataset.
+
+    The moments are kept centered (sxx = sum((x - mean_x)**2) and so on)
+    rather than as raw power sums, which avoids catastrophic cancellation
+    when the data is far from the origin. The raw sums are available as
+    properties.
+    """
+
+    n: int
+    mean_x: float
+    mean_y: float
+    sxx: float
+    sxy: float
+    syy: float
+
+    @classmethod
+    def from_arrays(cls, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        mean_x = x.mean()
+        mean_y = y.mean()
+        dx = x - mean_x
+        dy = y - mean_y
+        return cls(
+            n=len(x),
+            mean_x=float(mean_x),
+            mean_y=float(mean_y),
+            sxx=float(dx @ dx),
+            sxy=float(dx @ dy),
+            syy=float(dy @ dy),
+        )
+
+    @property
+    def sum_x(self):
+        return self.n * self.mean_x
+
+    @property
+    def sum_y(self):
+        return self.n * self.mean_y
+
+    @property
+    def sum_xx(self):
+        return self.sxx + self.n * self.mean_x**2
+
+    @property
+    def sum_xy(self):
+        return self.sxy + self.n * self.mean_x * self.mean_y
+
+    @property
+    def sum_yy(self):
+        return self.syy + self.n * self.mean_y**2
+
+    def ssr(self, a, b):
+        """Sum of squared residuals of the line ``a + b * x``.
+
+        ``a`` and ``b`` may be scalars or arrays; they are broadcast against
+        each other, e.g. ``ssr(a_grid[np.newaxis, :], b_grid[:, np.newaxis])``.
+        """
+        a = np.asarray(a, dtype=float)
+        b = np.asarray(b, dtype=float)
+        # The cross terms vanish around the means, leaving the spread around the
+        # line through the centroid plus the offset of the line at the centroid
+        offset = self.mean_y - a - b * self.mean_x
+        return self.syy - 2 * b * self.sxy + b**2 * self.sxx + self.n * offset**2
+
+    def sst(self):
+        """Total sum of squares of y."""
+        return self.syy
+
+    def ols(self):
+        """Return the least-squares intercept and slope ``(a, b)``."""
+        b = self.sxy / self.sxx if self.sxx > 0 else 0.0
+        return self.mean_y - b * self.mean_x, b
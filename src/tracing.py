@@ -0,0 +1,203 @@
+"""Timed spans of the stages of a rerun, and their export for monitoring.
+
+The app creates one :class:`Tracer` per rerun (a full run of the script or
+a rerun of the panel fragment). Every stage it wants to see is wrapped in
+``with tracer.span(name):``, and sizes such as the bytes sent per panel are
+recorded next to the spans. Spans may be recorded from several threads, as
+the panels are rendered in a pool.
+
+When tracing is switched off the app uses :data:`NULL_TRACER` instead,
+whose ``span()`` returns one shared context manager that does nothing, so
+an instrumented stage costs a method call and nothing is allocated.
+
+Finished traces can be appended to a JSON-lines file, one line per rerun,
+and summed up per span in :class:`TraceTotals`, which renders them in the
+Prometheus text exposition format for a node-exporter textfile collector.
+The files are set on the server, in the ``DASHBOARD_TRACE_JSONL`` and
+``DASHBOARD_TRACE_PROMETHEUS`` environment variables; nothing is exported
+when they are unset.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+# Prefix of the exported Prometheus metric names
+METRIC_PREFIX = "regression_dashboard"
+
+# Files the finished traces are appended to and the totals written to, if set
+TRACE_JSONL_PATH = os.environ.get("DASHBOARD_TRACE_JSONL")
+TRACE_PROMETHEUS_PATH = os.environ.get("DASHBOARD_TRACE_PROMETHEUS")
+
+
+@dataclass(frozen=True)
+class Span:
+    name: str
+    start: float  # seconds since the start of the rerun
+    duration: float
+    thread: str
+
+
+class Tracer:
+    """Spans, per-panel payload sizes and gauges of one rerun."""
+
+    enabled = True
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.timestamp = time.time()
+        self.duration = None
+        self.spans = []
+        self.payload_bytes = {}
+        self.gauges = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """Time the body of the ``with`` block as a span called ``name``, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            span = Span(name, start - self._origin, time.perf_counter() - start, threading.current_thread().name)
+            with self._lock:
+                self.spans.append(span)
+
+    def payload(self, panel, nbytes):
+        """Add ``nbytes`` to the bytes sent to the browser for ``panel`` in this rerun."""
+        with self._lock:
+            self.payload_bytes[panel] = self.payload_bytes.get(panel, 0) + nbytes
+
+    def gauge(self, name, value):
+        """Record the value of ``name`` at the end of this rerun, e.g. the number of open figures."""
+        with self._lock:
+            self.gauges[name] = value
+
+    def finish(self):
+        """Stop the clock of the rerun and return the tracer."""
+        self.duration = time.perf_counter() - self._origin
+        return self
+
+    def to_dict(self):
+        return {
+            "timestamp": self.timestamp,
+            "kind": self.kind,
+            "duration": self.duration,
+            "spans": [asdict(span) for span in self.spans],
+            "payload_bytes": dict(self.payload_bytes),
+            "gauges": dict(self.gauges),
+        }
+
+
+class NullTracer:
+    """A tracer that records nothing, used when tracing is switched off."""
+
+    enabled = False
+    _span = contextlib.nullcontext()
+
+    def span(self, name):
+        return self._span
+
+    def payload(self, panel, nbytes):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+    def finish(self):
+        return self
+
+
+NULL_TRACER = NullTracer()
+
+
+def payload_bytes(output):
+    """Return the approximate bytes of a panel output as sent to the browser.
+
+    Images and HTML count their encoded length. In chart specs the arrays
+    count their raw size and everything else its JSON length.
+    """
+    if isinstance(output, (bytes, bytearray)):
+        return len(output)
+    if isinstance(output, str):
+        return len(output.encode())
+    arrays = 0
+
+    def strip(value):
+        nonlocal arrays
+        arrays += value.nbytes
+        return None
+
+    text = json.dumps(output, default=lambda value: strip(value) if isinstance(value, np.ndarray) else str(value))
+    return len(text) + arrays
+
+
+def append_jsonl(path, tracer):
+    """Append the finished trace as one JSON line to ``path``."""
+    line = json.dumps(tracer.to_dict()) + "\n"
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(line)
+
+
+class TraceTotals:
+    """Counts and total seconds of every span name over many reruns, and the latest sizes and gauges."""
+
+    def __init__(self):
+        self.reruns = {}
+        self.rerun_seconds = {}
+        self.span_count = {}
+        self.span_seconds = {}
+        self.payload_bytes = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def add(self, tracer):
+        with self._lock:
+            self.reruns[tracer.kind] = self.reruns.get(tracer.kind, 0) + 1
+            self.rerun_seconds[tracer.kind] = self.rerun_seconds.get(tracer.kind, 0.0) + tracer.duration
+            for span in tracer.spans:
+                self.span_count[span.name] = self.span_count.get(span.name, 0) + 1
+                self.span_seconds[span.name] = self.span_seconds.get(span.name, 0.0) + span.duration
+            self.payload_bytes.update(tracer.payload_bytes)
+            self.gauges.update(tracer.gauges)
+
+    def prometheus(self):
+        """Return the totals in the Prometheus text exposition format."""
+        def label(value):
+            return json.dumps(str(value))  # a quoted string with backslashes and quotes escaped
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            lines.extend(f"{METRIC_PREFIX}_{name}{labels} {value!r}" for labels, value in samples)
+
+        with self._lock:
+            metric("reruns_total", "counter", "Reruns of the app by kind (full script or panel fragment).",
+                   [(f"{{kind={label(kind)}}}", count) for kind, count in sorted(self.reruns.items())])
+            metric("rerun_seconds_total", "counter", "Total seconds of the reruns by kind.",
+                   [(f"{{kind={label(kind)}}}", seconds) for kind, seconds in sorted(self.rerun_seconds.items())])
+            metric("span_seconds_total", "counter", "Total seconds spent in each traced stage.",
+                   [(f"{{span={label(name)}}}", seconds) for name, seconds in sorted(self.span_seconds.items())])
+            metric("span_count_total", "counter", "Number of times each traced stage ran.",
+                   [(f"{{span={label(name)}}}", count) for name, count in sorted(self.span_count.items())])
+            metric("panel_payload_bytes", "gauge", "Bytes sent to the browser for each panel in its latest rerun.",
+                   [(f"{{panel={label(name)}}}", nbytes) for name, nbytes in sorted(self.payload_bytes.items())])
+            for name, value in sorted(self.gauges.items()):
+                metric(name, "gauge", f"Latest value of {name.replace('_', ' ')}.", [("", value)])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the totals to ``path`` atomically, so a collector never reads a half-written file."""
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False, encoding="utf-8") as file:
+            file.write(self.prometheus())
+        os.replace(file.name, path)
@@ -0,0 +1,302 @@
+"""Vega-Lite specs for rendering the panels in the browser.
+
+The matplotlib panels rasterize a PNG on the server for every slider tick.
+These specs describe the same panels with the slider values as Vega-Lite
+parameters: the line, the residuals and the SSR curves are calculated by
+the browser from ``a``, ``b`` and a handful of sufficient statistics, so a
+rerun only builds a small dict and ships the raw points (or their binned
+density for large datasets) alongside it.
+"""
+
+import json
+
+import numpy as np
+
+from src.binning import binned_means, histogram2d
+
+HEIGHT = 400
+DOMAIN = [-10, 10]
+
+
+def _params(a, b):
+    return [{"name": "a", "value": a}, {"name": "b", "value": b}]
+
+
+def with_params(spec, a, b):
+    """Return ``spec`` with new values of the a and b parameters, sharing everything else."""
+    return {**spec, "params": _params(a, b)}
+
+
+def _ssr_expr(stats, a, b):
+    # SSR(a, b) in closed form from the sufficient statistics, see SufficientStats.ssr
+    offset = f"({stats.mean_y!r} - {a} - {b} * {stats.mean_x!r})"
+    return f"{stats.syy!r} - 2 * {b} * {stats.sxy!r} + pow({b}, 2) * {stats.sxx!r} + {stats.n} * pow({offset}, 2)"
+
+
+def _points(x, y):
+    return {"x": np.asarray(x), "y": np.asarray(y)}
+
+
+def _density(x, y, bins):
+    # Only the non-empty cells are shipped, so the payload is bounded by the number of bins
+    counts = histogram2d(x, y, (*DOMAIN, *DOMAIN), bins)
+    iy, ix = np.nonzero(counts)
+    width = (DOMAIN[1] - DOMAIN[0]) / bins
+    return {
+        "x": DOMAIN[0] + ix * width,
+        "x2": DOMAIN[0] + (ix + 1) * width,
+        "y": DOMAIN[0] + iy * width,
+        "y2": DOMAIN[0] + (iy + 1) * width,
+        "count": counts[iy, ix],
+    }
+
+
+def _series(label, labels, colors):
+    # Tag the layer's rows with its label; one shared color scale over all labels gives the same legend
+    # as the matplotlib panels
+    transform = {"calculate": json.dumps(label), "as": "series"}
+    color = {"field": "series", "type": "nominal", "scale": {"domain": labels, "range": colors},
+             "legend": {"title": None, "orient": "top-left", "labelLimit": 400}}
+    return transform, color
+
+
+def _density_layer(name, label, labels, colors, x_scale, y_scale):
+    # Binned counts as rectangles whose opacity follows the count on a log scale
+    transform, color = _series(label, labels, colors)
+    return {
+        "data": {"name": name},
+        "transform": [transform],
+        "mark": {"type": "rect", "clip": True},
+        "encoding": {
+            "x": {"field": "x", "type": "quantitative", "scale": x_scale}, "x2": {"field": "x2"},
+            "y": {"field": "y", "type": "quantitative", "scale": y_scale}, "y2": {"field": "y2"},
+            "color": color,
+            "opacity": {"field": "count", "type": "quantitative", "scale": {"type": "log", "range": [0.15, 0.9]}, "legend": None},
+        },
+    }
+
+
+def _points_layer(name, label, labels, colors, x_scale, y_scale):
+    transform, color = _series(label, labels, colors)
+    return {
+        "data": {"name": name},
+        "transform": [transform],
+        "mark": {"type": "circle", "size": 50, "opacity": 0.7, "clip": True},
+        "encoding": {
+            "x": {"field": "x", "type": "quantitative", "scale": x_scale},
+            "y": {"field": "y", "type": "quantitative", "scale": y_scale},
+            "color": color,
+        },
+    }
+
+
+def main_plot(train_x, train_y, test_x, test_y, stats, show_data_points, show_ssr, show_test_set, density_threshold,
+              a, b, train_description, test_description, band=None, density_bins=200, residual_bins=40):
+    """The regression line over the data, with the same toggles as the matplotlib main plot.
+
+    ``band`` is an optional ``(x, lower, upper, resamples)`` bootstrap band
+    of the least-squares line, drawn as a shaded area.
+    """
+    x_scale = {"domain": DOMAIN}
+    y_scale = {"domain": DOMAIN}
+    datasets = {}
+    labels = ["Interactive Line"]
+    colors = ["blue"]
+    layers = []
+
+    if band is not None:
+        band_x, lower, upper, resamples = band
+        datasets["band"] = {"x": np.asarray(band_x), "lower": np.asarray(lower), "upper": np.asarray(upper)}
+        labels.append(f"95% Bootstrap Band of the OLS Line ({resamples} resamples)")
+        colors.append("blue")
+        transform, color = _series(labels[-1], labels, colors)
+        layers.append({
+            "data": {"name": "band"},
+            "transform": [transform],
+            "mark": {"type": "area", "opacity": 0.15, "clip": True},
+            "encoding": {
+                "x": {"field": "x", "type": "quantitative", "scale": x_scale},
+                "y": {"field": "lower", "type": "quantitative", "scale": y_scale},
+                "y2": {"field": "upper"},
+                "color": color,
+            },
+        })
+
+    if show_data_points:
+        if len(train_x) > density_threshold:
+            datasets["train_density"] = _density(train_x, train_y, density_bins)
+            labels.append(f"Train Set Density ({train_description})")
+            colors.append("red")
+            layers.append(_density_layer("train_density", labels[-1], labels, colors, x_scale, y_scale))
+            if show_ssr:
+                # Summarize the residuals by the mean y of each x bin
+                bin_x, bin_means, _ = binned_means(train_x, train_y, *DOMAIN, residual_bins)
+                keep = ~np.isnan(bin_means)
+                datasets["bin_means"] = _points(bin_x[keep], bin_means[keep])
+        else:
+            datasets["train"] = _points(train_x, train_y)
+            labels.append(f"Train Set Points ({train_description})")
+            colors.append("red")
+            layers.append(_points_layer("train", labels[-1], labels, colors, x_scale, y_scale))
+
+        # Plot residuals as vertical rules from each point (or bin mean) to the line
+        if show_ssr:
+            layers.append({
+                "data": {"name": "bin_means" if "bin_means" in datasets else "train"},
+                "transform": [{"calculate": "a + b * datum.x", "as": "predicted"}],
+                "mark": {"type": "rule", "color": "green", "opacity": 0.5, "clip": True},
+                "encoding": {
+                    "x": {"field": "x", "type": "quantitative", "scale": x_scale},
+                    "y": {"field": "y", "type": "quantitative", "scale": y_scale},
+                    "y2": {"field": "predicted"},
+                },
+            })
+
+    if show_test_set:
+        if len(test_x) > density_threshold:
+            datasets["test_density"] = _density(test_x, test_y, density_bins)
+            labels.append(f"Test Set Density ({test_description})")
+            colors.append("purple")
+            layers.append(_density_layer("test_density", labels[-1], labels, colors, x_scale, y_scale))
+        else:
+            datasets["test"] = _points(test_x, test_y)
+            labels.append(f"Test Set Points ({test_description})")
+            colors.append("purple")
+            layers.append(_points_layer("test", labels[-1], labels, colors, x_scale, y_scale))
+
+    # The line is calculated by the browser from the a and b parameters
+    transform, color = _series("Interactive Line", labels, colors)
+    layers.append({
+        "data": {"values": [{"x": DOMAIN[0]}, {"x": DOMAIN[1]}]},
+        "transform": [{"calculate": "a + b * datum.x", "as": "y"}, transform],
+        "mark": {"type": "line", "strokeWidth": 2, "clip": True},
+        "encoding": {
+            "x": {"field": "x", "type": "quantitative", "scale": x_scale},
+            "y": {"field": "y", "type": "quantitative", "scale": y_scale},
+            "color": color,
+        },
+    })
+
+    title = "'Linear Equation: y = ' + format(a, '.1f') + ' + ' + format(b, '.1f') + 'x'"
+    if show_ssr:
+        title += f" + ' with SSR = ' + format({_ssr_expr(stats, 'a', 'b')}, '.2f')"
+    return {
+        "params": _params(a, b),
+        "datasets": datasets,
+        "title": {"text": {"expr": title}},
+        "height": HEIGHT,
+        "layer": layers,
+        "config": {"axis": {"title": None}},
+    }
+
+
+def _loss_curve(stats, a, b, parameter, label, curve_color, marker_color):
+    # SSR against one parameter with the other held fixed, sampled by the browser
+    if parameter == "a":
+        expr = _ssr_expr(stats, "datum.value", "b")
+        title = "SSR vs. Parameter a (with fixed b)"
+    else:
+        expr = _ssr_expr(stats, "a", "datum.value")
+        title = "SSR vs. Parameter b (with fixed a)"
+    x = {"field": "value", "type": "quantitative", "title": label}
+    y = {"field": "ssr", "type": "quantitative", "title": "Sum of Squared Residuals (SSR)"}
+    return {
+        "params": _params(a, b),
+        "title": title,
+        "height": HEIGHT,
+        "layer": [
+            {
+                "data": {"sequence": {"start": DOMAIN[0], "stop": DOMAIN[1] + 0.1, "step": 0.2, "as": "value"}},
+                "transform": [{"calculate": expr, "as": "ssr"}],
+                "mark": {"type": "line", "color": curve_color, "strokeWidth": 2},
+                "encoding": {"x": x, "y": y},
+            },
+            {
+                # Highlight the current value of the parameter
+                "data": {"values": [{}]},
+                "transform": [
+                    {"calculate": parameter, "as": "value"},
+                    {"calculate": expr, "as": "ssr"},
+                    {"calculate": f"'Current {parameter} = ' + format({parameter}, '.1f')", "as": "label"},
+                ],
+                "layer": [
+                    {"mark": {"type": "rule", "color": marker_color, "strokeDash": [6, 4]}, "encoding": {"x": x}},
+                    {"mark": {"type": "point", "filled": True, "size": 80, "color": marker_color},
+                     "encoding": {"x": x, "y": y, "tooltip": [{"field": "label"}, {"field": "ssr", "format": ".2f"}]}},
+                ],
+            },
+        ],
+    }
+
+
+def ssr_vs_b(stats, a, b):
+    """SSR as a function of b for the current a."""
+    return _loss_curve(stats, a, b, "b", "Parameter b (slope)", "red", "green")
+
+
+def ssr_vs_a(stats, a, b):
+    """SSR as a function of a for the current b."""
+    return _loss_curve(stats, a, b, "a", "Parameter a (y-intercept)", "blue", "red")
+
+
+def mae_vs_b(mae_curve, a, b):
+    """MAE as a function of b; the curve depends on the data, so it is sampled on the server."""
+    b_values, mae_values = mae_curve.curve(*DOMAIN)
+    x = {"field": "b_value", "type": "quantitative", "title": "Parameter b (slope)"}
+    y = {"field": "mae", "type": "quantitative", "title": "Mean Absolute Error (MAE)"}
+    return {
+        "params": _params(a, b),
+        "datasets": {"mae_curve": {"b_value": b_values, "mae": mae_values}},
+        "title": "MAE vs. Parameter b (with fixed a)",
+        "height": HEIGHT,
+        "layer": [
+            {"data": {"name": "mae_curve"}, "mark": {"type": "line", "color": "green", "strokeWidth": 2},
+             "encoding": {"x": x, "y": y}},
+            {
+                # Highlight the current b value
+                "data": {"values": [{"b_value": b, "mae": float(mae_curve(b))}]},
+                "layer": [
+                    {"mark": {"type": "rule", "color": "red", "strokeDash": [6, 4]}, "encoding": {"x": x}},
+                    {"mark": {"type": "point", "filled": True, "size": 80, "color": "red"}, "encoding": {"x": x, "y": y}},
+                ],
+            },
+        ],
+    }
+
+
+def ssr_surface(stats, a, b, resolution=100):
+    """SSR over the whole slider domain, evaluated cell by cell in the browser."""
+    step = (DOMAIN[1] - DOMAIN[0]) / resolution
+    expr = _ssr_expr(stats, "(datum.a_lo + datum.a_hi) / 2", "(datum.b_lo + datum.b_hi) / 2")
+    return {
+        "params": _params(a, b),
+        "title": "SSR Surface over Parameters a and b",
+        "height": HEIGHT,
+        "layer": [
+            {
+                "data": {"sequence": {"start": 0, "stop": resolution * resolution, "as": "cell"}},
+                "transform": [
+                    {"calculate": f"{DOMAIN[0]} + (datum.cell % {resolution}) * {step}", "as": "a_lo"},
+                    {"calculate": f"datum.a_lo + {step}", "as": "a_hi"},
+                    {"calculate": f"{DOMAIN[0]} + floor(datum.cell / {resolution}) * {step}", "as": "b_lo"},
+                    {"calculate": f"datum.b_lo + {step}", "as": "b_hi"},
+                    {"calculate": expr, "as": "ssr"},
+                ],
+                "mark": "rect",
+                "encoding": {
+                    "x": {"field": "a_lo", "type": "quantitative", "title": "Parameter a (y-intercept)", "scale": {"domain": DOMAIN}},
+                    "x2": {"field": "a_hi"},
+                    "y": {"field": "b_lo", "type": "quantitative", "title": "Parameter b (slope)", "scale": {"domain": DOMAIN}},
+                    "y2": {"field": "b_hi"},
+                    "color": {"field": "ssr", "type": "quantitative", "title": "SSR", "scale": {"type": "log", "scheme": "viridis"}},
+                },
+            },
+            {
+                # Highlight the current (a, b) values
+                "data": {"values": [{}]},
+                "transform": [{"calculate": "a", "as": "a_lo"}, {"calculate": "b", "as": "b_lo"}],
+                "mark": {"type": "point", "filled": True, "size": 80, "color": "red"},
+                "encoding": {"x": {"field": "a_lo", "type": "quantitative"}, "y": {"field": "b_lo", "type": "quantitative"}},
+            },
+        ],
+    }
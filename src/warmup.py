@@ -0,0 +1,129 @@
+"""Warm up a fresh replica of the dashboard and measure its cold start.
+
+``python -m src.warmup`` is meant to run once on a new replica before the
+Streamlit server starts (see ``run.sh``). It runs in a process of its own,
+so only what it leaves on disk carries over to the server: the bytecode of
+the ``src`` package and matplotlib's font cache, which it builds by
+rendering one figure with the same artists as the panels. The server
+process still imports the modules and draws its first figure itself;
+app.py is not compiled here, since Streamlit compiles the script from
+source on every run.
+
+``python -m src.warmup --measure`` reports how long a fresh interpreter
+takes to import the app's dependencies and to run the script up to its
+first complete paint. Every probe runs in a new process with its own
+matplotlib config directory, once starting from an empty font cache (a
+new replica) and once after the warm-up, and the medians are printed.
+"""
+
+import argparse
+import compileall
+import importlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+APP_PATH = APP_DIR / "app.py"
+
+# The modules app.py imports at the top, in order
+APP_IMPORTS = (
+    "streamlit", "numpy", "src.bootstrap", "src.cross_validation", "src.data_sources", "src.datasets",
+    "src.figure_cache", "src.figures", "src.mae_curve", "src.panel_registry", "src.metrics", "src.metrics_index",
+    "src.multiple_regression", "src.optimizers", "src.session_memory", "src.tracing", "src.vega_specs",
+)
+
+
+def warm_up():
+    """Compile the src package and build the font cache by rendering a figure; return the elapsed seconds."""
+    start = time.perf_counter()
+    compileall.compile_dir(APP_DIR / "src", quiet=1)
+
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import numpy as np
+    from matplotlib.colors import LogNorm
+    from matplotlib.figure import Figure
+
+    # Draw text, markers, lines and a log-scaled image so every font, glyph and codec the panels use gets loaded
+    figure = Figure(figsize=(8, 6))
+    ax = figure.add_subplot()
+    x = np.linspace(-8, 8, 30)
+    ax.scatter(x, x, color="red", label="Points")
+    ax.plot(x, x, color="blue", linewidth=2, label="Line")
+    ax.imshow(np.arange(1, 101).reshape(10, 10), extent=(-10, 10, -10, 10), origin="lower", norm=LogNorm())
+    ax.set_title("Linear Equation: y = 0.0 + 1.0x with SSR = 0.00")
+    ax.set_xlabel("Parameter b (slope)")
+    ax.legend()
+    figure.savefig(io.BytesIO(), format="png", dpi=200, bbox_inches="tight")
+    return time.perf_counter() - start
+
+
+def _probe():
+    # Runs in a fresh interpreter: time the app's imports, then one run of the script
+    start = time.perf_counter()
+    for module in APP_IMPORTS:
+        importlib.import_module(module)
+    imported = time.perf_counter()
+
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(APP_PATH), default_timeout=600)
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    painted = time.perf_counter()
+    print(json.dumps({"import": imported - start, "first_paint": painted - start}))
+
+
+def _run(config_dir, *args):
+    # Run this module in a fresh interpreter with its own matplotlib config (and font cache) directory
+    env = dict(os.environ, MPLCONFIGDIR=str(config_dir), MPLBACKEND="Agg", PYTHONPATH=str(APP_DIR))
+    return subprocess.run([sys.executable, "-m", "src.warmup", *args], cwd=APP_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def _run_probe(config_dir):
+    result = _run(config_dir, "--probe")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(runs=5):
+    """Return the median import and first-paint seconds of fresh processes, before and after warming up."""
+    results = {}
+    for state in ("cold", "warm"):
+        probes = []
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as config_dir:
+                if state == "warm":
+                    _run(config_dir)
+                probes.append(_run_probe(config_dir))
+        results[state] = {key: statistics.median(probe[key] for probe in probes) for key in probes[0]}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--measure", action="store_true", help="measure import time and time to first paint")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement (default: 5)")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.probe:
+        _probe()
+    elif args.measure:
+        for state, timings in measure(args.runs).items():
+            print(f"{state}: import {timings['import'] * 1e3:.0f} ms, first paint {timings['first_paint'] * 1e3:.0f} ms")
+    else:
+        print(f"Warmed up in {warm_up() * 1e3:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()